@@ -0,0 +1,41 @@
+"""Gunicorn settings for production: uvicorn workers, one per CPU.
+
+    gunicorn -c gunicorn.conf.py server:app
+
+Workers share the response cache through Redis when ``REDIS_URL`` is set and
+the station catalog through the SQLite file at ``RADIO_CATALOG_DB``; only the
+worker holding ``RADIO_WRITER_LOCK`` syncs the catalog and probes streams.
+``/api/ready`` passes once every worker has warmed up (``RADIO_READY_DIR``).
+"""
+import multiprocessing
+import os
+import secrets
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8001')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+# The app is async: one worker per core keeps every core busy.
+workers = int(os.environ.get("RADIO_WORKERS", 0)) or multiprocessing.cpu_count()
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then to bound memory growth.
+max_requests = int(os.environ.get("RADIO_MAX_REQUESTS", 20000))
+max_requests_jitter = max_requests // 10
+
+# Inherited by the forked workers.
+os.environ.setdefault("RADIO_WRITER_LOCK", "/tmp/global-radio-writer.lock")
+# One cursor signing key for all workers, so a page cursor works on any of them.
+os.environ.setdefault("RADIO_CURSOR_SECRET", secrets.token_hex(16))
+
+# Each warm worker marks itself ready here; /api/ready waits for all of them.
+os.environ.setdefault("RADIO_READY_DIR", tempfile.mkdtemp(prefix="global-radio-ready-"))
+os.environ.setdefault("RADIO_READY_WORKERS", str(workers))
+
+
+def worker_exit(server, worker):
+    # A replacement worker starts cold and marks itself once warm.
+    try:
+        os.unlink(os.path.join(os.environ["RADIO_READY_DIR"], str(worker.pid)))
+    except FileNotFoundError:
+        pass
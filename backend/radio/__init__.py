@@ -0,0 +1 @@
+"""Building blocks for the Global Radio API backend."""
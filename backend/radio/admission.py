@@ -0,0 +1,417 @@
+"""Admission control: per-client rate limits, an upstream request budget and
+adaptive load shedding.
+
+* :class:`RateLimiter` keeps a token bucket per key: one per client (API key
+  or IP) for incoming requests, and the single ``"upstream"`` key for calls to
+  radio-browser. In shared mode the count lives in Redis instead, as a fixed
+  window of ``burst`` requests per ``burst / rate`` seconds, so every worker
+  draws on the same allowance. A Redis error falls back to the local bucket.
+* :class:`AdaptiveLimiter` bounds concurrent requests with an AIMD limit. While
+  the smoothed event-loop lag stays under ``lag_target`` the limit grows by
+  about one per limit's worth of completions; once the loop falls behind
+  (this worker is the bottleneck) it is cut by ``backoff``. Requests over the
+  limit wait up to ``queue_timeout`` for a slot and are then shed. It is
+  opt-in (RADIO_CONCURRENCY_MAX).
+* :class:`ClientIdentity` decides who a request is from: a configured API
+  key, else the client address as seen by us or by a trusted proxy.
+* :class:`AdmissionMiddleware` answers 429 (client over its rate) or 503 (shed)
+  with ``Retry-After`` before the request reaches the app.
+
+Everything is off when constructed with defaults; :meth:`Admission.from_env`
+turns on the rate limits.
+"""
+import asyncio
+import ipaddress
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Iterable, Optional, Tuple
+
+import orjson
+
+from radio.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Never limited: health checks and scrapes must see the real state.
+EXEMPT_PATHS = frozenset({"/api/ready", "/metrics", "/api/admission/status"})
+
+
+class RateLimiter:
+    """Token bucket per key; ``rate <= 0`` disables it."""
+
+    def __init__(
+        self,
+        rate: float = 0.0,
+        burst: float = 0.0,
+        max_keys: int = 10000,
+        redis=None,
+        prefix: str = "radio:rl:",
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+    ):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_keys = max_keys
+        self.redis = redis
+        self.prefix = prefix
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.window = self.burst / rate if rate > 0 else 0.0
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+        self.redis_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, self.clock)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    async def _shared(self, key: str) -> Tuple[bool, float]:
+        now = self.wall_clock()
+        window = int(now // self.window)
+        redis_key = f"{self.prefix}{key}:{window}"
+        count = await self.redis.incr(redis_key)
+        if count == 1:
+            await self.redis.expire(redis_key, max(1, math.ceil(self.window)) + 1)
+        if count <= self.burst:
+            return True, 0.0
+        return False, (window + 1) * self.window - now
+
+    async def allow(self, key: str) -> Tuple[bool, float]:
+        """``(allowed, retry_after_seconds)`` for one request by ``key``."""
+        if not self.enabled:
+            return True, 0.0
+        result = None
+        if self.redis is not None:
+            try:
+                result = await self._shared(key)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning("Shared rate limit unavailable, limiting locally: %s", e)
+        if result is None:
+            bucket = self._bucket(key)
+            result = (True, 0.0) if bucket.try_acquire() else (False, bucket.wait_time())
+        if result[0]:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        return result
+
+    async def acquire(self, key: str, max_wait: float) -> Tuple[bool, float]:
+        """Wait up to ``max_wait`` seconds for a token; ``(acquired, retry_after)``."""
+        deadline = self.clock() + max_wait
+        while True:
+            allowed, retry_after = await self.allow(key)
+            if allowed:
+                return True, 0.0
+            if self.clock() + retry_after > deadline:
+                return False, retry_after
+            # Waiting is not a rejection; only the final answer counts.
+            self.rejected -= 1
+            await asyncio.sleep(retry_after)
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "rate": self.rate,
+            "burst": self.burst,
+            "shared": self.redis is not None,
+            "tracked_keys": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "redis_errors": self.redis_errors,
+        }
+
+
+class AdaptiveLimiter:
+    """AIMD limit on concurrent requests; ``max_limit <= 0`` disables it.
+
+    Driven by event-loop lag (see :func:`radio.metrics.monitor_event_loop`),
+    not request latency, so a slow mirror holding requests open is not
+    mistaken for this worker being overloaded.
+    """
+
+    def __init__(
+        self,
+        initial: int = 100,
+        min_limit: int = 8,
+        max_limit: int = 0,
+        lag_target: float = 0.05,
+        backoff: float = 0.9,
+        smoothing: float = 0.3,
+        queue_timeout: float = 0.05,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial, min_limit), max_limit)) if max_limit > 0 else 0.0
+        self.lag_target = lag_target
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.queue_timeout = queue_timeout
+        self.inflight = 0
+        self.lag: Optional[float] = None
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_limit > 0
+
+    @property
+    def overloaded(self) -> bool:
+        return self.lag is not None and self.lag > self.lag_target
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting up to ``queue_timeout``; ``False`` means shed."""
+        if not self.enabled:
+            return True
+        if self.inflight < int(self.limit) and not self._waiters:
+            self.inflight += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= int(self.limit):
+            self.shed += 1
+            return False
+        self.queued += 1
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # Client gone or shutting down: hand back a slot we were given,
+            # or leave the queue so release() doesn't give us one.
+            if waiter.done():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+                waiter.cancel()
+            raise
+        if waiter.done():
+            # release() handed its slot over (and counted it in inflight).
+            self.admitted += 1
+            return True
+        self._waiters.remove(waiter)
+        waiter.cancel()
+        self.shed += 1
+        return False
+
+    def observe_lag(self, lag: float):
+        """Feed one event-loop lag sample (seconds); cuts the limit while
+        the smoothed lag is over ``lag_target``."""
+        if not self.enabled:
+            return
+        self.lag = lag if self.lag is None else self.lag + self.smoothing * (lag - self.lag)
+        if self.overloaded:
+            self.limit = max(float(self.min_limit), self.limit * self.backoff)
+
+    def release(self):
+        """Return a slot; a busy, healthy loop grows the limit by about one
+        per limit's worth of completions."""
+        if not self.enabled:
+            return
+        self.inflight -= 1
+        if not self.overloaded and self.inflight + 1 >= self.limit / 2:
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+        while self._waiters and self.inflight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.inflight += 1
+                waiter.set_result(None)
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "limit": round(self.limit, 1),
+            "inflight": self.inflight,
+            "waiting": len(self._waiters),
+            "loop_lag_ms": round(self.lag * 1000, 2) if self.lag is not None else None,
+            "lag_target_ms": round(self.lag_target * 1000, 2),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": self.shed,
+        }
+
+
+class UpstreamBudgetExhausted(Exception):
+    """No upstream token came within ``Admission.upstream_max_wait``."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Upstream request budget exhausted")
+        self.retry_after = retry_after
+
+
+class Admission:
+    """The limiters applied to incoming requests and to upstream calls."""
+
+    def __init__(
+        self,
+        clients: Optional[RateLimiter] = None,
+        concurrency: Optional[AdaptiveLimiter] = None,
+        upstream: Optional[RateLimiter] = None,
+        upstream_max_wait: float = 2.0,
+    ):
+        self.clients = clients or RateLimiter()
+        self.concurrency = concurrency or AdaptiveLimiter()
+        self.upstream = upstream or RateLimiter()
+        self.upstream_max_wait = upstream_max_wait
+
+    @classmethod
+    def from_env(cls, redis=None) -> "Admission":
+        """Limits from ``RADIO_*``; counts are shared through ``redis`` only
+        when RADIO_RATE_LIMIT_SHARED is set."""
+        if os.environ.get("RADIO_RATE_LIMIT_SHARED", "").lower() not in ("1", "true", "yes"):
+            redis = None
+        return cls(
+            clients=RateLimiter(
+                float(os.environ.get("RADIO_CLIENT_RATE", 20)),
+                float(os.environ.get("RADIO_CLIENT_BURST", 60)),
+                redis=redis,
+                prefix="radio:rl:client:",
+            ),
+            concurrency=AdaptiveLimiter(
+                initial=int(os.environ.get("RADIO_CONCURRENCY_INITIAL", 100)),
+                min_limit=int(os.environ.get("RADIO_CONCURRENCY_MIN", 8)),
+                # Opt-in: off unless RADIO_CONCURRENCY_MAX is set.
+                max_limit=int(os.environ.get("RADIO_CONCURRENCY_MAX", 0)),
+                lag_target=float(os.environ.get("RADIO_LOOP_LAG_TARGET", 0.05)),
+                queue_timeout=float(os.environ.get("RADIO_QUEUE_TIMEOUT", 0.05)),
+            ),
+            upstream=RateLimiter(
+                float(os.environ.get("RADIO_UPSTREAM_RATE", 50)),
+                float(os.environ.get("RADIO_UPSTREAM_BURST", 100)),
+                redis=redis,
+                prefix="radio:rl:upstream:",
+            ),
+            upstream_max_wait=float(os.environ.get("RADIO_UPSTREAM_MAX_WAIT", 2.0)),
+        )
+
+    async def admit_upstream(self):
+        """Spend one upstream token, waiting up to ``upstream_max_wait``;
+        raises :class:`UpstreamBudgetExhausted` otherwise."""
+        acquired, retry_after = await self.upstream.acquire("upstream", self.upstream_max_wait)
+        if not acquired:
+            raise UpstreamBudgetExhausted(retry_after)
+
+    def status(self) -> dict:
+        return {
+            "clients": self.clients.status(),
+            "concurrency": self.concurrency.status(),
+            "upstream": self.upstream.status(),
+        }
+
+
+class ClientIdentity:
+    """Who a request is from, for rate limits and click deduplication.
+
+    ``X-API-Key`` only counts when it is one of ``api_keys``; anyone can send
+    an arbitrary key. Otherwise the client is the peer address, unless the
+    peer is one of ``trusted_proxies`` (addresses or networks). Then
+    ``X-Forwarded-For`` is read from the right, skipping trusted proxies, and
+    the first other address wins. Entries further left were supplied by the
+    client and are ignored.
+    """
+
+    def __init__(self, api_keys: Iterable[str] = (), trusted_proxies: Iterable[str] = ()):
+        self.api_keys = frozenset(api_keys)
+        self.trusted_proxies = [ipaddress.ip_network(p, strict=False) for p in trusted_proxies]
+
+    @classmethod
+    def from_env(cls) -> "ClientIdentity":
+        """From comma-separated RADIO_API_KEYS and RADIO_TRUSTED_PROXIES."""
+        def listed(name: str) -> list:
+            return [v.strip() for v in os.environ.get(name, "").split(",") if v.strip()]
+        return cls(listed("RADIO_API_KEYS"), listed("RADIO_TRUSTED_PROXIES"))
+
+    def _trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def __call__(self, headers, peer: Optional[str]) -> str:
+        """Identity for a request with ``headers`` (Starlette ``Headers``)
+        arriving from ``peer``."""
+        api_key = headers.get("x-api-key")
+        if api_key and api_key in self.api_keys:
+            return f"key:{api_key}"
+        client = peer or "unknown"
+        if self.trusted_proxies and self._trusted(client):
+            hops = [h.strip() for value in headers.getlist("x-forwarded-for") for h in value.split(",")]
+            for hop in reversed([h for h in hops if h]):
+                client = hop
+                if not self._trusted(hop):
+                    break
+        return client
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+class AdmissionMiddleware:
+    """Rejects requests over their client's rate (429) or over the adaptive
+    concurrency limit (503), both with ``Retry-After``.
+
+    ``control`` returns the current :class:`Admission`, so swapped instances
+    are picked up; ``identify`` maps an ASGI scope to a client id.
+    """
+
+    def __init__(
+        self,
+        app,
+        control: Callable[[], Admission],
+        identify: Callable[[dict], str],
+        exempt: Iterable[str] = EXEMPT_PATHS,
+    ):
+        self.app = app
+        self.control = control
+        self.identify = identify
+        self.exempt = frozenset(exempt)
+
+    async def _reject(self, send, status: int, detail: str, retry_after: float):
+        body = orjson.dumps({"detail": detail})
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", retry_after_header(retry_after).encode()),
+                (b"cache-control", b"no-store"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt:
+            await self.app(scope, receive, send)
+            return
+        admission = self.control()
+        allowed, retry_after = await admission.clients.allow(self.identify(scope))
+        if not allowed:
+            await self._reject(send, 429, "Too many requests", retry_after)
+            return
+        limiter = admission.concurrency
+        if not await limiter.acquire():
+            await self._reject(send, 503, "Server busy, try again shortly", 1.0)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
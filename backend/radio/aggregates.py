@@ -0,0 +1,159 @@
+"""Materialized country/language/tag lists.
+
+The aggregates change slowly but are large (``tags`` has thousands of
+entries), so instead of fetching and sorting them per request a background
+task refreshes them, sorts them by station count once, and keeps a ready-made
+response body (plus its gzip encoding and ETag) for the full list and for
+recently requested top-Ns. Bodies for new limits are serialized and
+compressed in a worker thread, never on the event loop.
+"""
+import asyncio
+import gzip
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import orjson
+
+from radio.httpcache import digest, make_etag
+
+logger = logging.getLogger(__name__)
+
+AGGREGATES = ("countries", "languages", "tags")
+
+
+class PreparedBody:
+    """A serialized response body with its ETag and gzip encoding."""
+
+    __slots__ = ("body", "etag", "gzipped", "modified")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.modified = time.time()
+        self.etag = make_etag(digest(body))
+        self.gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+
+
+class Aggregate:
+    """One aggregate list, sorted by station count, with prepared bodies."""
+
+    # Prepared top-N bodies kept per aggregate, least recently used evicted.
+    max_bodies = 32
+
+    def __init__(self, name: str, items: List[dict], top_n: int):
+        self.name = name
+        self.items = sorted(items, key=lambda x: x.get("stationcount", 0), reverse=True)
+        self.refreshed_at = time.time()
+        self._full = self.prepare(None)
+        self._bodies: "OrderedDict[int, PreparedBody]" = OrderedDict()
+        self.body(top_n)
+
+    def _key(self, limit: Optional[int]) -> Optional[int]:
+        # Limits past the end all share the full body.
+        if limit is None or limit >= len(self.items):
+            return None
+        return max(0, limit)
+
+    def cached(self, limit: Optional[int] = None) -> Optional[PreparedBody]:
+        """Prepared body for ``limit`` if there is one; cheap enough for the loop."""
+        key = self._key(limit)
+        if key is None:
+            return self._full
+        prepared = self._bodies.get(key)
+        if prepared is not None:
+            self._bodies.move_to_end(key)
+        return prepared
+
+    def prepare(self, limit: Optional[int] = None) -> PreparedBody:
+        """Serialize and compress ``{name: items[:limit]}``; CPU-bound, no side effects."""
+        key = self._key(limit)
+        return PreparedBody(orjson.dumps({self.name: self.items if key is None else self.items[:key]}))
+
+    def store(self, limit: Optional[int], prepared: PreparedBody):
+        key = self._key(limit)
+        if key is None:
+            return
+        self._bodies[key] = prepared
+        self._bodies.move_to_end(key)
+        if len(self._bodies) > self.max_bodies:
+            self._bodies.popitem(last=False)
+
+    def body(self, limit: Optional[int] = None) -> PreparedBody:
+        """Prepared ``{name: items[:limit]}`` (whole list when ``limit`` is None)."""
+        prepared = self.cached(limit)
+        if prepared is None:
+            prepared = self.prepare(limit)
+            self.store(limit, prepared)
+        return prepared
+
+
+class AggregateStore:
+    """Keeps :data:`AGGREGATES` fresh in the background."""
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[List[dict]]],
+        interval: Optional[float] = None,
+        top_n: Optional[int] = None,
+    ):
+        self.fetch = fetch
+        self.interval = interval if interval is not None else float(os.environ.get("RADIO_AGGREGATE_INTERVAL", 900))
+        self.top_n = top_n if top_n is not None else int(os.environ.get("RADIO_AGGREGATE_TOP_N", 100))
+        self._aggregates: Dict[str, Aggregate] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    async def _load(self, name: str, force: bool) -> Aggregate:
+        async with self._locks.setdefault(name, asyncio.Lock()):
+            aggregate = self._aggregates.get(name)
+            if aggregate is not None and not force:
+                # Loaded by whoever held the lock before us.
+                return aggregate
+            items = await self.fetch(name)
+            aggregate = await asyncio.to_thread(Aggregate, name, items, self.top_n)
+            self._aggregates[name] = aggregate
+            self.refreshes += 1
+            return aggregate
+
+    async def refresh(self, name: str) -> Aggregate:
+        return await self._load(name, force=True)
+
+    async def get(self, name: str) -> Aggregate:
+        """Current aggregate, loading it on first use (single-flight)."""
+        aggregate = self._aggregates.get(name)
+        if aggregate is not None:
+            return aggregate
+        return await self._load(name, force=False)
+
+    async def body(self, name: str, limit: Optional[int] = None) -> PreparedBody:
+        aggregate = await self.get(name)
+        prepared = aggregate.cached(limit)
+        if prepared is None:
+            prepared = await asyncio.to_thread(aggregate.prepare, limit)
+            aggregate.store(limit, prepared)
+        return prepared
+
+    async def run(self):
+        """Refresh every aggregate now and then every ``interval`` seconds."""
+        while True:
+            for name in AGGREGATES:
+                try:
+                    await self.refresh(name)
+                except Exception as e:
+                    # Keep serving the previous list.
+                    self.refresh_errors += 1
+                    logger.warning("Refreshing %s failed: %s", name, e)
+            await asyncio.sleep(self.interval)
+
+    def status(self) -> dict:
+        return {
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "aggregates": {
+                name: {"entries": len(a.items), "refreshed_at": a.refreshed_at}
+                for name, a in self._aggregates.items()
+            },
+        }
@@ -0,0 +1,285 @@
+"""Tiered response cache for radio-browser calls.
+
+Tier 1 is a bounded in-process LRU; tier 2 is an optional Redis instance
+shared by every uvicorn worker. Keys are derived from the normalized upstream
+endpoint plus its sorted query parameters, and each endpoint family has its
+own TTL. Expired entries linger for a stale window so they can be served
+while a single background task revalidates them.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+from radio.responses import RawJSON
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "radio:v1:"
+
+# Seconds each upstream endpoint family stays fresh. Longest prefix wins.
+DEFAULT_TTLS: Dict[str, float] = {
+    "stations/search": 300.0,
+    "stations/byuuid": 600.0,
+    "countries": 3600.0,
+    "languages": 3600.0,
+    "tags": 3600.0,
+}
+
+_MISSING = object()
+
+
+def cache_key(endpoint: str, params: Optional[dict] = None) -> str:
+    """Normalized cache key: ``radio:v1:<endpoint>?<sorted params>``."""
+    endpoint = endpoint.strip("/").lower()
+    items = sorted((str(k), str(v)) for k, v in (params or {}).items() if v is not None)
+    return f"{KEY_PREFIX}{endpoint}?{urlencode(items)}"
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    refreshes: int = 0
+    refresh_errors: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    redis_hits: int = 0
+    redis_misses: int = 0
+    redis_errors: int = 0
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        # redis_hits is a breakdown of hits/stale_hits, not an extra lookup
+        served = self.hits + self.stale_hits
+        lookups = served + self.misses
+        data["hit_ratio"] = round(served / lookups, 4) if lookups else 0.0
+        return data
+
+
+class LRUCache:
+    """Bounded LRU mapping whose entries go fresh -> stale -> gone.
+
+    An entry is fresh for ``ttl`` seconds and may then be served stale for a
+    further ``stale_ttl`` seconds while it is being revalidated.
+    """
+
+    def __init__(self, maxsize: int, stats: CacheStats, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.stats = stats
+        self.clock = clock
+        # key -> (fresh_until, stale_until, value)
+        self._data: "OrderedDict[str, Tuple[float, float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Any:
+        """``(value, is_fresh)`` for ``key``, or ``_MISSING``."""
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        fresh_until, stale_until, value = entry
+        now = self.clock()
+        if stale_until <= now:
+            del self._data[key]
+            self.stats.expirations += 1
+            return _MISSING
+        self._data.move_to_end(key)
+        return value, fresh_until > now
+
+    def fresh_for(self, key: str) -> Optional[float]:
+        """Seconds ``key`` stays fresh (<= 0 once stale), or ``None`` if absent.
+        Does not count as a lookup or touch the LRU order."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        return entry[0] - self.clock()
+
+    def set(self, key: str, value: Any, ttl: float, stale_ttl: float = 0.0):
+        now = self.clock()
+        self._data[key] = (now + ttl, now + ttl + stale_ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    def clear(self):
+        self._data.clear()
+
+
+class TieredCache:
+    """LRU in front of an optional shared Redis tier.
+
+    :meth:`get_or_fetch` adds single-flight coalescing (concurrent misses for
+    one key share a single upstream fetch) and stale-while-revalidate (an
+    expired entry is returned immediately while one background task refreshes
+    it). Redis failures are counted and otherwise ignored so a flaky cache
+    never turns into a failed API request.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttls: Optional[Dict[str, float]] = None,
+        stale_ttl: float = 600.0,
+        redis=None,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+    ):
+        self.stats = CacheStats()
+        self.local = LRUCache(maxsize, self.stats, clock)
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.stale_ttl = stale_ttl
+        self.redis = redis
+        self.wall_clock = wall_clock
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @classmethod
+    def from_env(cls) -> "TieredCache":
+        redis = None
+        redis_url = os.environ.get("REDIS_URL")
+        if redis_url:
+            import redis.asyncio as redis_asyncio
+            redis = redis_asyncio.Redis.from_url(redis_url)
+        return cls(
+            maxsize=int(os.environ.get("RADIO_CACHE_MAXSIZE", 1024)),
+            stale_ttl=float(os.environ.get("RADIO_CACHE_STALE_TTL", 600)),
+            redis=redis,
+        )
+
+    def ttl_for(self, endpoint: str) -> Optional[float]:
+        """TTL for ``endpoint``, or ``None`` if it must not be cached."""
+        endpoint = endpoint.strip("/").lower()
+        best = None
+        for prefix in self.ttls:
+            if endpoint == prefix or endpoint.startswith(prefix + "/"):
+                if best is None or len(prefix) > len(best):
+                    best = prefix
+        return self.ttls[best] if best is not None else None
+
+    def fresh_for(self, key: str) -> Optional[float]:
+        """Seconds the local copy of ``key`` stays fresh, or ``None``."""
+        return self.local.fresh_for(key)
+
+    async def _lookup(self, key: str) -> Any:
+        """``(value, is_fresh)`` from the first tier that has ``key``."""
+        found = self.local.get(key)
+        if found is not _MISSING:
+            return found
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(key)
+            except Exception as e:
+                self.stats.redis_errors += 1
+                logger.warning("Redis get failed for %s: %s", key, e)
+                raw = None
+            if raw is not None:
+                envelope = json.loads(raw)
+                now = self.wall_clock()
+                if envelope["stale_until"] > now:
+                    self.stats.redis_hits += 1
+                    fresh_for = max(0.0, envelope["fresh_until"] - now)
+                    stale_for = envelope["stale_until"] - now - fresh_for
+                    if "raw" in envelope:
+                        value = RawJSON(envelope["raw"].encode())
+                    elif "text" in envelope:
+                        value = envelope["text"].encode()
+                    else:
+                        value = envelope["value"]
+                    self.local.set(key, value, fresh_for, stale_for)
+                    return value, fresh_for > 0
+            self.stats.redis_misses += 1
+        return _MISSING
+
+    async def get(self, key: str) -> Any:
+        """Cached value for ``key`` (fresh or stale) or ``None``."""
+        found = await self._lookup(key)
+        if found is _MISSING:
+            self.stats.misses += 1
+            return None
+        value, fresh = found
+        if fresh:
+            self.stats.hits += 1
+        else:
+            self.stats.stale_hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self.local.set(key, value, ttl, self.stale_ttl)
+        if self.redis is not None:
+            now = self.wall_clock()
+            envelope = {"fresh_until": now + ttl, "stale_until": now + ttl + self.stale_ttl}
+            # Raw upstream bodies are stored as text, not re-parsed.
+            if isinstance(value, RawJSON):
+                envelope["raw"] = value.data.decode()
+            elif isinstance(value, bytes):
+                envelope["text"] = value.decode()
+            else:
+                envelope["value"] = value
+            envelope = json.dumps(envelope)
+            try:
+                await self.redis.set(key, envelope, ex=max(1, int(ttl + self.stale_ttl)))
+            except Exception as e:
+                self.stats.redis_errors += 1
+                logger.warning("Redis set failed for %s: %s", key, e)
+
+    async def get_or_fetch(self, key: str, ttl: float, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Serve ``key`` from cache, coalescing and revalidating via ``fetch``."""
+        found = await self._lookup(key)
+        if found is not _MISSING:
+            value, fresh = found
+            if fresh:
+                self.stats.hits += 1
+            else:
+                self.stats.stale_hits += 1
+                if key not in self._inflight:
+                    self.stats.refreshes += 1
+                    self._start_fetch(key, ttl, fetch).add_done_callback(self._log_refresh_error)
+            return value
+        self.stats.misses += 1
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._start_fetch(key, ttl, fetch)
+        else:
+            self.stats.coalesced += 1
+        # Shielded so one caller being cancelled does not cancel the fetch
+        # every other waiter is sharing.
+        return await asyncio.shield(future)
+
+    def _start_fetch(self, key: str, ttl: float, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        async def run():
+            value = await fetch()
+            await self.set(key, value, ttl)
+            return value
+
+        future = asyncio.ensure_future(run())
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return future
+
+    def _log_refresh_error(self, future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            self.stats.refresh_errors += 1
+            logger.warning("Background cache refresh failed: %s", future.exception())
+
+    async def aclose(self):
+        for future in list(self._inflight.values()):
+            future.cancel()
+        if self.redis is not None:
+            await self.redis.aclose()
+
+    def snapshot(self) -> dict:
+        data = self.stats.as_dict()
+        data["size"] = len(self.local)
+        data["maxsize"] = self.local.maxsize
+        data["inflight"] = len(self._inflight)
+        data["redis_enabled"] = self.redis is not None
+        return data
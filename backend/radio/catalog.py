@@ -0,0 +1,407 @@
+"""Local SQLite mirror of the radio-browser station catalog.
+
+A background job bulk-downloads the full station dump plus the country,
+language and tag lists, then keeps the stations current with incremental
+syncs driven by ``lastchangetime``. Listing endpoints are answered from
+indexed local queries; radio-browser is only needed as a fallback until the
+first full sync has completed.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import (
+    Column,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    create_engine,
+    delete,
+    event,
+    func,
+    select,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from radio.query import StationQuery
+
+logger = logging.getLogger(__name__)
+
+Fetch = Callable[[str, Optional[dict]], Awaitable[list]]
+
+metadata = MetaData()
+
+stations = Table(
+    "stations",
+    metadata,
+    Column("stationuuid", String, primary_key=True),
+    Column("changeuuid", String, nullable=False, default=""),
+    Column("name", Text, nullable=False, default=""),
+    Column("url", Text, nullable=False, default=""),
+    Column("url_resolved", Text, nullable=False, default=""),
+    Column("homepage", Text, nullable=False, default=""),
+    Column("favicon", Text, nullable=False, default=""),
+    Column("tags", Text, nullable=False, default=""),
+    Column("country", String, nullable=False, default=""),
+    Column("countrycode", String, nullable=False, default=""),
+    Column("state", String, nullable=False, default=""),
+    Column("language", String, nullable=False, default=""),
+    Column("languagecodes", String, nullable=False, default=""),
+    Column("votes", Integer, nullable=False, default=0),
+    Column("lastchangetime", String, nullable=False, default=""),
+    Column("codec", String, nullable=False, default=""),
+    Column("bitrate", Integer, nullable=False, default=0),
+    Column("hls", Integer, nullable=False, default=0),
+    Column("lastcheckok", Integer, nullable=False, default=0),
+    Column("lastchecktime", String, nullable=False, default=""),
+    Column("clickcount", Integer, nullable=False, default=0),
+    Column("clicktrend", Integer, nullable=False, default=0),
+    Column("geo_lat", Float),
+    Column("geo_long", Float),
+    Index("ix_stations_popular", "lastcheckok", "clickcount"),
+    Index("ix_stations_countrycode", "countrycode", "clickcount"),
+    Index("ix_stations_lastchangetime", "lastchangetime"),
+)
+
+station_tags = Table(
+    "station_tags",
+    metadata,
+    Column("tag", String, primary_key=True),
+    Column("stationuuid", String, primary_key=True),
+    Index("ix_station_tags_station", "stationuuid"),
+)
+
+countries = Table(
+    "countries",
+    metadata,
+    Column("iso_3166_1", String, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("stationcount", Integer, nullable=False, default=0),
+)
+
+languages = Table(
+    "languages",
+    metadata,
+    Column("name", String, primary_key=True),
+    Column("iso_639", String),
+    Column("stationcount", Integer, nullable=False, default=0),
+)
+
+tags = Table(
+    "tags",
+    metadata,
+    Column("name", String, primary_key=True),
+    Column("stationcount", Integer, nullable=False, default=0),
+)
+
+sync_state = Table(
+    "sync_state",
+    metadata,
+    Column("key", String, primary_key=True),
+    Column("value", String, nullable=False),
+)
+
+STATION_FIELDS = [c.name for c in stations.columns]
+INT_FIELDS = {c.name for c in stations.columns if isinstance(c.type, Integer)}
+FLOAT_FIELDS = {c.name for c in stations.columns if isinstance(c.type, Float)}
+
+# Stations fetched per page during incremental syncs.
+INCREMENTAL_PAGE_SIZE = 1000
+CATALOG_SYNC_INTERVAL = float(os.environ.get("RADIO_CATALOG_SYNC_INTERVAL", 600))
+CATALOG_FULL_SYNC_INTERVAL = float(os.environ.get("RADIO_CATALOG_FULL_SYNC_INTERVAL", 86400))
+CATALOG_FOLLOW_INTERVAL = float(os.environ.get("RADIO_CATALOG_FOLLOW_INTERVAL", 15))
+
+
+def station_row(station: dict) -> dict:
+    """Normalize an upstream station dict into a ``stations`` row."""
+    row = {}
+    for field in STATION_FIELDS:
+        value = station.get(field)
+        if field in INT_FIELDS:
+            row[field] = int(value or 0)
+        elif field in FLOAT_FIELDS:
+            row[field] = float(value) if value not in (None, "") else None
+        else:
+            row[field] = value or ""
+    return row
+
+
+def _contains(value: str) -> str:
+    """LIKE pattern matching ``value`` literally anywhere (escape char ``\\``)."""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def split_tags(tag_string: str) -> List[str]:
+    return sorted({t.strip().lower() for t in (tag_string or "").split(",") if t.strip()})
+
+
+class StationCatalog:
+    """Indexed local copy of the station catalog backed by SQLite."""
+
+    def __init__(self, url: str):
+        self.engine = create_engine(url)
+        if self.engine.dialect.name == "sqlite":
+            event.listen(self.engine, "connect", _sqlite_pragmas)
+        metadata.create_all(self.engine)
+        self.version = 0
+        self.ready = self._state("full_synced_at") is not None
+        self._listeners: List[Callable[[], Awaitable[None]]] = []
+
+    @classmethod
+    def from_env(cls) -> Optional["StationCatalog"]:
+        """Catalog at ``RADIO_CATALOG_DB``, or ``None`` if mirroring is off."""
+        path = os.environ.get("RADIO_CATALOG_DB")
+        return cls(f"sqlite:///{path}") if path else None
+
+    def subscribe(self, listener: Callable[[], Awaitable[None]]):
+        """Await ``listener()`` whenever the catalog contents change."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    async def _changed(self):
+        self.version += 1
+        for listener in self._listeners:
+            try:
+                await listener()
+            except Exception as e:
+                logger.warning("Catalog listener failed: %s", e)
+
+    # -- sync -------------------------------------------------------------
+
+    def _state(self, key: str) -> Optional[str]:
+        with self.engine.connect() as conn:
+            return conn.execute(select(sync_state.c.value).where(sync_state.c.key == key)).scalar()
+
+    @staticmethod
+    def _set_state(conn, key: str, value: str):
+        stmt = sqlite_insert(sync_state).values(key=key, value=value)
+        conn.execute(stmt.on_conflict_do_update(index_elements=["key"], set_={"value": value}))
+
+    @staticmethod
+    def _upsert_stations(conn, upstream_stations: Iterable[dict]) -> int:
+        unique = {s["stationuuid"]: s for s in upstream_stations if s.get("stationuuid")}
+        rows = [station_row(s) for s in unique.values()]
+        if not rows:
+            return 0
+        stmt = sqlite_insert(stations)
+        conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["stationuuid"],
+                set_={f: stmt.excluded[f] for f in STATION_FIELDS if f != "stationuuid"},
+            ),
+            rows,
+        )
+        uuids = [r["stationuuid"] for r in rows]
+        for start in range(0, len(uuids), 500):
+            conn.execute(delete(station_tags).where(station_tags.c.stationuuid.in_(uuids[start:start + 500])))
+        tag_rows = [{"tag": t, "stationuuid": r["stationuuid"]} for r in rows for t in split_tags(r["tags"])]
+        if tag_rows:
+            conn.execute(station_tags.insert(), tag_rows)
+        return len(rows)
+
+    def _replace_all(self, dump: Dict[str, list]):
+        with self.engine.begin() as conn:
+            for table in (station_tags, stations, countries, languages, tags):
+                conn.execute(delete(table))
+            count = self._upsert_stations(conn, dump["stations"])
+            country_rows = {
+                c.get("iso_3166_1") or c.get("name", ""): {
+                    "iso_3166_1": c.get("iso_3166_1") or c.get("name", ""),
+                    "name": c.get("name", ""),
+                    "stationcount": int(c.get("stationcount") or 0),
+                }
+                for c in dump["countries"]
+            }
+            language_rows = {
+                l.get("name", ""): {
+                    "name": l.get("name", ""),
+                    "iso_639": l.get("iso_639"),
+                    "stationcount": int(l.get("stationcount") or 0),
+                }
+                for l in dump["languages"]
+            }
+            tag_rows = {
+                t.get("name", ""): {"name": t.get("name", ""), "stationcount": int(t.get("stationcount") or 0)}
+                for t in dump["tags"]
+            }
+            # Keyed by primary key above, since upstream lists can repeat names.
+            for table, rows in ((countries, country_rows), (languages, language_rows), (tags, tag_rows)):
+                if rows:
+                    conn.execute(table.insert(), list(rows.values()))
+            self._set_state(conn, "full_synced_at", str(time.time()))
+        return count
+
+    async def full_sync(self, fetch: Fetch) -> int:
+        """Replace the catalog with a fresh bulk dump; returns the station count."""
+        station_dump, country_list, language_list, tag_list = await asyncio.gather(
+            fetch("stations", None),
+            fetch("countries", None),
+            fetch("languages", None),
+            fetch("tags", None),
+        )
+        dump = {"stations": station_dump, "countries": country_list,
+                "languages": language_list, "tags": tag_list}
+        count = await asyncio.to_thread(self._replace_all, dump)
+        self.ready = True
+        await self._changed()
+        logger.info("Catalog full sync stored %d stations", count)
+        return count
+
+    def _watermark(self) -> str:
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.max(stations.c.lastchangetime))).scalar() or ""
+
+    @staticmethod
+    def _unchanged(conn, upstream_stations: List[dict]) -> set:
+        """Uuids whose stored ``changeuuid``/``lastchangetime`` match upstream."""
+        marks = {s["stationuuid"]: (s.get("changeuuid", ""), s.get("lastchangetime", ""))
+                 for s in upstream_stations if s.get("stationuuid")}
+        uuids, unchanged = list(marks), set()
+        for start in range(0, len(uuids), 500):
+            stored = conn.execute(
+                select(stations.c.stationuuid, stations.c.changeuuid, stations.c.lastchangetime)
+                .where(stations.c.stationuuid.in_(uuids[start:start + 500]))
+            )
+            unchanged.update(uuid for uuid, *mark in stored if tuple(mark) == marks[uuid])
+        return unchanged
+
+    def _apply_changes(self, changed: List[dict]) -> int:
+        with self.engine.begin() as conn:
+            # Every sync re-reads the stations at the watermark itself; only
+            # rows that differ from what we hold count as changes.
+            unchanged = self._unchanged(conn, changed)
+            changed = [s for s in changed if s.get("stationuuid") not in unchanged]
+            count = self._upsert_stations(conn, changed)
+            self._set_state(conn, "incremental_synced_at", str(time.time()))
+        return count
+
+    async def incremental_sync(self, fetch: Fetch) -> int:
+        """Upsert stations changed since the newest ``lastchangetime`` we hold."""
+        watermark = await asyncio.to_thread(self._watermark)
+        changed, offset = [], 0
+        while True:
+            page = await fetch("stations/search", {
+                "order": "changetimestamp",
+                "reverse": "true",
+                "limit": INCREMENTAL_PAGE_SIZE,
+                "offset": offset,
+            })
+            changed.extend(s for s in page if s.get("lastchangetime", "") >= watermark)
+            if len(page) < INCREMENTAL_PAGE_SIZE or page[-1].get("lastchangetime", "") < watermark:
+                break
+            offset += INCREMENTAL_PAGE_SIZE
+        count = await asyncio.to_thread(self._apply_changes, changed) if changed else 0
+        if count:
+            await self._changed()
+        logger.info("Catalog incremental sync applied %d changes", count)
+        return count
+
+    async def run(
+        self,
+        fetch: Fetch,
+        interval: float = CATALOG_SYNC_INTERVAL,
+        full_interval: float = CATALOG_FULL_SYNC_INTERVAL,
+    ):
+        """Keep the catalog current until cancelled.
+
+        Incremental syncs miss deletions and clickcount drift (neither bumps
+        ``lastchangetime``), so a full sync still runs every ``full_interval``.
+        """
+        last_full = float(self._state("full_synced_at") or 0)
+        if self.ready:
+            # Let in-memory views load what a previous process synced.
+            await self._changed()
+        while True:
+            try:
+                if not self.ready or time.time() - last_full >= full_interval:
+                    await self.full_sync(fetch)
+                    last_full = time.time()
+                else:
+                    await self.incremental_sync(fetch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Catalog sync failed: %s", e)
+            await asyncio.sleep(interval)
+
+    def _sync_marks(self) -> tuple:
+        return self._state("full_synced_at"), self._watermark()
+
+    async def follow(self, interval: float = CATALOG_FOLLOW_INTERVAL):
+        """Pick up syncs made by another process sharing the database (the
+        writer worker) until cancelled."""
+        seen = None
+        while True:
+            try:
+                marks = await asyncio.to_thread(self._sync_marks)
+                if marks[0] is not None and marks != seen:
+                    seen = marks
+                    self.ready = True
+                    await self._changed()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Following catalog syncs failed: %s", e)
+            await asyncio.sleep(interval)
+
+    # -- queries ----------------------------------------------------------
+
+    def _search(self, query: StationQuery) -> List[dict]:
+        stmt = select(stations).where(stations.c.lastcheckok == 1)
+        if query.countrycode:
+            stmt = stmt.where(stations.c.countrycode == query.countrycode.upper())
+        if query.name:
+            stmt = stmt.where(stations.c.name.ilike(_contains(query.name), escape="\\"))
+        if query.country:
+            stmt = stmt.where(stations.c.country.ilike(_contains(query.country), escape="\\"))
+        if query.language:
+            stmt = stmt.where(stations.c.language.ilike(_contains(query.language), escape="\\"))
+        if query.tag:
+            tagged = select(station_tags.c.stationuuid).where(station_tags.c.tag == query.tag.strip().lower())
+            stmt = stmt.where(stations.c.stationuuid.in_(tagged))
+        stmt = stmt.order_by(stations.c.clickcount.desc()).limit(query.limit).offset(query.offset)
+        with self.engine.connect() as conn:
+            return [dict(row) for row in conn.execute(stmt).mappings()]
+
+    async def search(self, query: StationQuery) -> List[dict]:
+        return await asyncio.to_thread(self._search, query)
+
+    def _by_uuids(self, uuids: List[str]) -> List[dict]:
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(stations).where(stations.c.stationuuid.in_(uuids))).mappings()
+            return [dict(row) for row in rows]
+
+    async def by_uuids(self, uuids: List[str]) -> List[dict]:
+        return await asyncio.to_thread(self._by_uuids, uuids)
+
+    def all_stations(self) -> List[dict]:
+        with self.engine.connect() as conn:
+            return [dict(row) for row in conn.execute(select(stations)).mappings()]
+
+    def count(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(stations)).scalar()
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "version": self.version,
+            "stations": self.count(),
+            "full_synced_at": self._state("full_synced_at"),
+            "incremental_synced_at": self._state("incremental_synced_at"),
+        }
+
+
+def _sqlite_pragmas(dbapi_connection, _record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets request handlers keep reading while a sync is writing.
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
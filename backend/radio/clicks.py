@@ -0,0 +1,167 @@
+"""Asynchronous, batched click reporting to radio-browser.
+
+``POST /api/station/{uuid}/click`` only enqueues the click and returns. A
+background worker drains the queue in batches, drops clicks radio-browser
+would ignore anyway (same client and station within 24 hours), rate-limits
+the upstream calls and retries failures. Local per-station counters record
+every unique click we accepted.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import Counter, OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from radio.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# radio-browser counts one click per client IP and station per day.
+DEDUPE_WINDOW = 24 * 3600.0
+
+
+@dataclass
+class ClickStats:
+    accepted: int = 0
+    dropped: int = 0
+    deduplicated: int = 0
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+
+
+class ClickReporter:
+    """Bounded click queue with a deduplicating, rate-limited flush worker."""
+
+    def __init__(
+        self,
+        report: Callable[[str], Awaitable[object]],
+        maxsize: int = 10000,
+        batch_size: int = 50,
+        rate: float = 10.0,
+        burst: float = 20.0,
+        max_attempts: int = 3,
+        retry_delay: float = 0.5,
+        dedupe_window: float = DEDUPE_WINDOW,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.report = report
+        self.queue: "asyncio.Queue[Tuple[str, str]]" = asyncio.Queue(maxsize)
+        self.batch_size = batch_size
+        self.bucket = TokenBucket(rate, burst, clock)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.dedupe_window = dedupe_window
+        self.clock = clock
+        self.stats = ClickStats()
+        self.counts: Counter = Counter()
+        # (client, station) -> last accepted click, oldest first.
+        self._seen: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._worker: Optional[asyncio.Task] = None
+        self._closing = False
+
+    @classmethod
+    def from_env(cls, report: Callable[[str], Awaitable[object]]) -> "ClickReporter":
+        return cls(
+            report,
+            maxsize=int(os.environ.get("RADIO_CLICK_QUEUE_SIZE", 10000)),
+            rate=float(os.environ.get("RADIO_CLICK_RATE", 10)),
+            burst=float(os.environ.get("RADIO_CLICK_BURST", 20)),
+        )
+
+    def start(self):
+        self._closing = False
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def submit(self, station_uuid: str, client_id: str) -> bool:
+        """Enqueue a click without waiting; ``False`` if it was shed."""
+        if self._closing:
+            self.stats.dropped += 1
+            return False
+        try:
+            self.queue.put_nowait((station_uuid, client_id))
+        except asyncio.QueueFull:
+            self.stats.dropped += 1
+            return False
+        self.stats.accepted += 1
+        return True
+
+    def _is_duplicate(self, station_uuid: str, client_id: str) -> bool:
+        now = self.clock()
+        key = (client_id, station_uuid)
+        seen_at = self._seen.get(key)
+        if seen_at is not None and now - seen_at < self.dedupe_window:
+            return True
+        self._seen[key] = now
+        self._seen.move_to_end(key)
+        # Expire from the old end; amortized O(1) per click. Past the size
+        # cap the oldest go early (radio-browser dedupes those anyway).
+        while self._seen:
+            oldest_key, oldest = next(iter(self._seen.items()))
+            if now - oldest < self.dedupe_window and len(self._seen) <= 4 * self.queue.maxsize:
+                break
+            del self._seen[oldest_key]
+        return False
+
+    async def _take_batch(self) -> List[Tuple[str, str]]:
+        batch = [await self.queue.get()]
+        while len(batch) < self.batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _send(self, station_uuid: str):
+        for attempt in range(1, self.max_attempts + 1):
+            await self.bucket.acquire()
+            try:
+                await self.report(station_uuid)
+                self.stats.sent += 1
+                return
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    self.stats.failed += 1
+                    logger.warning("Giving up on click for %s: %s", station_uuid, e)
+                    return
+                self.stats.retries += 1
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+    async def _run(self):
+        while True:
+            batch = await self._take_batch()
+            try:
+                unique = []
+                for station_uuid, client_id in batch:
+                    if self._is_duplicate(station_uuid, client_id):
+                        self.stats.deduplicated += 1
+                    else:
+                        self.counts[station_uuid] += 1
+                        unique.append(station_uuid)
+                await asyncio.gather(*(self._send(uuid) for uuid in unique))
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def aclose(self, timeout: float = 10.0):
+        """Stop accepting clicks and flush what is queued (up to ``timeout``)."""
+        self._closing = True
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Click queue not drained on shutdown; %d clicks lost", self.queue.qsize())
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+
+    def station_clicks(self, station_uuid: str) -> int:
+        return self.counts[station_uuid]
+
+    def snapshot(self) -> dict:
+        data = asdict(self.stats)
+        data["queue_depth"] = self.queue.qsize()
+        data["queue_maxsize"] = self.queue.maxsize
+        data["queue_utilization"] = round(self.queue.qsize() / self.queue.maxsize, 4) if self.queue.maxsize else 0.0
+        return data
@@ -0,0 +1,208 @@
+"""Compact, array-backed station store.
+
+Holding the full catalog as one dict per station costs well over a kilobyte
+of heap per station. ``ColumnarStations`` keeps each field as a typed
+``array`` column instead: numbers are stored inline and every string column
+holds ids into one shared string table, so repeated values (country, codec,
+language, tags, timestamps) are stored once. The string table itself is a
+single UTF-8 blob plus an offsets array. Station dicts are materialized only
+for the rows a request actually returns, and the most recently returned rows
+are kept decoded (popular stations head almost every listing).
+
+Columns may also be read-only NumPy views of a memory-mapped index snapshot
+(see :mod:`radio.snapshot`); everything here only indexes into them.
+"""
+import math
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Mapping, Sequence
+
+import numpy as np
+
+FIELDS = (
+    "changeuuid", "stationuuid", "name", "url", "url_resolved", "homepage",
+    "favicon", "tags", "country", "countrycode", "state", "language",
+    "languagecodes", "votes", "lastchangetime", "codec", "bitrate", "hls",
+    "lastcheckok", "lastchecktime", "clickcount", "clicktrend", "geo_lat",
+    "geo_long",
+)
+# array typecodes for the numeric columns; everything else is a string id.
+NUMERIC_TYPES = {
+    "votes": "i",
+    "bitrate": "i",
+    "hls": "b",
+    "lastcheckok": "b",
+    "clickcount": "i",
+    "clicktrend": "i",
+    "geo_lat": "d",
+    "geo_long": "d",
+}
+STRING_FIELDS = tuple(f for f in FIELDS if f not in NUMERIC_TYPES)
+
+
+class StringTable:
+    """Immutable table of strings stored as one UTF-8 blob plus offsets."""
+
+    def __init__(self, blob: bytes, offsets: Sequence[int]):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, string_id: int) -> str:
+        return str(self.blob[self.offsets[string_id]:self.offsets[string_id + 1]], "utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[i] for i in range(len(self)))
+
+    def lookup(self, string_ids: np.ndarray) -> List[str]:
+        """Strings for many ids at once."""
+        offsets = np.asarray(self.offsets)
+        starts = offsets[string_ids].tolist()
+        ends = offsets[string_ids + 1].tolist()
+        blob = self.blob
+        return [str(blob[a:b], "utf-8") for a, b in zip(starts, ends)]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.blob) + len(self.offsets) * self.offsets.itemsize
+
+
+class StringTableBuilder:
+    """Interns strings while a store is being built."""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._chunks: List[bytes] = []
+        self._offsets = array("I", [0])
+
+    def intern(self, value: str) -> int:
+        string_id = self._ids.get(value)
+        if string_id is None:
+            encoded = value.encode("utf-8")
+            string_id = self._ids[value] = len(self._chunks)
+            self._chunks.append(encoded)
+            self._offsets.append(self._offsets[-1] + len(encoded))
+        return string_id
+
+    def build(self) -> StringTable:
+        return StringTable(b"".join(self._chunks), self._offsets)
+
+
+class StationView(Mapping):
+    """Read-only, lazily decoded view of one station row."""
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: "ColumnarStations", row: int):
+        self._store = store
+        self._row = row
+
+    def __getitem__(self, field: str):
+        return self._store.value(self._row, field)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+
+class ColumnarStations:
+    """Station catalog stored column by column."""
+
+    # Decoded rows kept for reuse: a few thousand dicts, a few MB at most.
+    decoded_rows = 4096
+
+    def __init__(self, columns: Dict[str, array], strings: StringTable):
+        self.columns = columns
+        self.strings = strings
+        self.size = len(columns["stationuuid"])
+        self._decoded: "OrderedDict[int, dict]" = OrderedDict()
+
+    @classmethod
+    def from_dicts(cls, stations: Iterable[dict]) -> "ColumnarStations":
+        builder = StringTableBuilder()
+        columns = {f: array(NUMERIC_TYPES.get(f, "I")) for f in FIELDS}
+        for station in stations:
+            for field in STRING_FIELDS:
+                columns[field].append(builder.intern(station.get(field) or ""))
+            for field, typecode in NUMERIC_TYPES.items():
+                value = station.get(field)
+                if typecode == "d":
+                    columns[field].append(math.nan if value in (None, "") else float(value))
+                else:
+                    columns[field].append(int(value or 0))
+        return cls(columns, builder.build())
+
+    def __len__(self) -> int:
+        return self.size
+
+    def value(self, row: int, field: str):
+        raw = self.columns[field][row]
+        typecode = NUMERIC_TYPES.get(field)
+        if typecode is None:
+            return self.strings[raw]
+        # int()/float() also unwrap NumPy scalars from mmap-backed columns.
+        if typecode == "d":
+            return None if math.isnan(raw) else float(raw)
+        return int(raw)
+
+    def column(self, field: str) -> List:
+        """Decoded values of ``field`` for every row (used when building indexes)."""
+        if field in NUMERIC_TYPES:
+            return [self.value(row, field) for row in range(self.size)]
+        strings = self.strings
+        return [strings[i] for i in self.columns[field]]
+
+    def view(self, row: int) -> StationView:
+        return StationView(self, row)
+
+    def row(self, row: int) -> dict:
+        """Materialize one station as a plain dict."""
+        return {field: self.value(row, field) for field in FIELDS}
+
+    def rows(self, rows: Iterable[int]) -> List[dict]:
+        """Materialize many stations; rows not decoded recently are gathered
+        column by column. Callers get their own dicts and may modify them."""
+        rows = [int(row) for row in rows]
+        decoded = self._decoded
+        missing = [row for row in dict.fromkeys(rows) if row not in decoded]
+        if missing:
+            for row, station in zip(missing, self._gather(missing)):
+                decoded[row] = station
+            while len(decoded) > self.decoded_rows:
+                decoded.popitem(last=False)
+        result = []
+        for row in rows:
+            station = decoded.get(row)
+            if station is None:
+                # Evicted within this call (more rows than the cache holds).
+                station = self._gather([row])[0]
+            else:
+                decoded.move_to_end(row)
+            result.append(dict(station))
+        return result
+
+    def _gather(self, rows: List[int]) -> List[dict]:
+        """Decode ``rows``, gathering each column once."""
+        index = np.array(rows, dtype=np.intp)
+        if not len(index):
+            return []
+        values = []
+        for field in FIELDS:
+            raw = np.asarray(self.columns[field])[index]
+            typecode = NUMERIC_TYPES.get(field)
+            if typecode is None:
+                values.append(self.strings.lookup(raw))
+            elif typecode == "d":
+                values.append([None if math.isnan(v) else v for v in raw.tolist()])
+            else:
+                values.append(raw.tolist())
+        return [dict(zip(FIELDS, row)) for row in zip(*values)]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column buffers and string table."""
+        return sum(c.itemsize * len(c) for c in self.columns.values()) + self.strings.nbytes
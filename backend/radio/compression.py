@@ -0,0 +1,167 @@
+"""Negotiated gzip/brotli response compression.
+
+Picks the best encoding the client accepts (brotli when the ``brotli``
+package is installed, else gzip) for responses of at least ``minimum_size``
+bytes with a compressible content type. Small bodies are sent as-is: the
+framing overhead and CPU outweigh the savings. A strong ETag on a compressed
+response gets the coding appended, as the bytes differ from the identity
+body's.
+"""
+import os
+import zlib
+from typing import Dict, Iterable, Optional
+
+from radio.httpcache import coded_etag
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """``{"gzip": 1.0, "br": 0.5, ...}`` from an Accept-Encoding header."""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header: str, available: Iterable[str]) -> Optional[str]:
+    """Preferred encoding in ``available`` order that the client accepts."""
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=brotli_quality)
+            self._compress = self._obj.process
+            self._flush = self._obj.finish
+        else:
+            self._obj = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress = self._obj.compress
+            self._flush = self._obj.flush
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compress(data)
+
+    def finish(self) -> bytes:
+        return self._flush()
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses as negotiated with the client."""
+
+    def __init__(
+        self,
+        app,
+        minimum_size: Optional[int] = None,
+        gzip_level: Optional[int] = None,
+        brotli_quality: Optional[int] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size if minimum_size is not None else int(
+            os.environ.get("RADIO_COMPRESS_MIN_SIZE", 1024)
+        )
+        self.gzip_level = gzip_level if gzip_level is not None else int(os.environ.get("RADIO_GZIP_LEVEL", 5))
+        self.brotli_quality = brotli_quality if brotli_quality is not None else int(
+            os.environ.get("RADIO_BROTLI_QUALITY", 4)
+        )
+        self.encodings = ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                header = value.decode("latin-1")
+                break
+        encoding = negotiate(header, self.encodings) if header else None
+        start_message = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = {k.lower(): v for k, v in start_message["headers"]}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                compressible = any(content_type.startswith(t) for t in COMPRESSIBLE_TYPES)
+                if compressible:
+                    _add_header(start_message, b"vary", b"Accept-Encoding")
+                if (
+                    encoding is None
+                    or not compressible
+                    or b"content-encoding" in headers
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                raw_headers = [
+                    (k, coded_etag(v.decode("latin-1"), encoding).encode("latin-1") if k.lower() == b"etag" else v)
+                    for k, v in start_message["headers"]
+                    if k.lower() != b"content-length"
+                ]
+                raw_headers.append((b"content-encoding", encoding.encode()))
+                data = compressor.compress(body)
+                if not more_body:
+                    data += compressor.finish()
+                    raw_headers.append((b"content-length", str(len(data)).encode()))
+                start_message["headers"] = raw_headers
+                await send(start_message)
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                return
+            data = compressor.compress(body)
+            if not more_body:
+                data += compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _add_header(message: dict, name: bytes, value: bytes):
+    headers = list(message["headers"])
+    for i, (key, existing) in enumerate(headers):
+        if key.lower() == name:
+            if value.lower() not in existing.lower():
+                headers[i] = (key, existing + b", " + value)
+            message["headers"] = headers
+            return
+    headers.append((name, value))
+    message["headers"] = headers
+
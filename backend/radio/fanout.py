@@ -0,0 +1,73 @@
+"""Concurrent fan-out of upstream queries with partial-result merging."""
+import asyncio
+import heapq
+import os
+from typing import Any, Awaitable, Callable, Iterable, List, Sequence, Tuple
+from urllib.parse import quote
+
+FANOUT_CONCURRENCY = int(os.environ.get("RADIO_FANOUT_CONCURRENCY", 4))
+FANOUT_DEADLINE = float(os.environ.get("RADIO_FANOUT_DEADLINE", 5.0))
+
+
+async def fan_out(
+    fetch: Callable[[Any], Awaitable[Any]],
+    items: Sequence[Any],
+    concurrency: int = FANOUT_CONCURRENCY,
+    deadline: float = FANOUT_DEADLINE,
+) -> Tuple[List[Any], List[Any]]:
+    """Run ``fetch(item)`` for every item, at most ``concurrency`` at a time.
+
+    Everything still running after ``deadline`` seconds is cancelled. Returns
+    ``(results, failed_items)`` where ``results`` keeps input order and only
+    contains the calls that succeeded in time.
+    """
+    gate = asyncio.Semaphore(concurrency)
+
+    async def bounded(item):
+        async with gate:
+            return await fetch(item)
+
+    tasks = [asyncio.ensure_future(bounded(item)) for item in items]
+    if not tasks:
+        return [], []
+    _, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    results, failed = [], []
+    for item, task in zip(items, tasks):
+        if task.cancelled() or task.exception() is not None:
+            failed.append(item)
+        else:
+            results.append(task.result())
+    return results, failed
+
+
+def top_stations(station_lists: Iterable[List[dict]], k: int) -> List[dict]:
+    """Merge station lists, drop duplicate uuids and keep the top ``k`` by clickcount."""
+    unique = {}
+    for stations in station_lists:
+        for station in stations:
+            unique.setdefault(station["stationuuid"], station)
+    return heapq.nlargest(k, unique.values(), key=lambda s: s.get("clickcount", 0))
+
+
+def joined_chunks(values: Iterable[str], max_length: int, sep: str = ",") -> List[str]:
+    """``sep``-joined runs of ``values``, each at most ``max_length`` characters
+    once URL-encoded, so a list of ids can go upstream in a few query strings."""
+    chunks: List[str] = []
+    current: List[str] = []
+    length = 0
+    sep_length = len(quote(sep, safe=""))
+    for value in values:
+        value_length = len(quote(value, safe=""))
+        if current and length + sep_length + value_length > max_length:
+            chunks.append(sep.join(current))
+            current, length = [], 0
+        length += value_length + (sep_length if current else 0)
+        current.append(value)
+    if current:
+        chunks.append(sep.join(current))
+    return chunks
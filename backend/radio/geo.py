@@ -0,0 +1,172 @@
+"""Spatial index of station coordinates for nearby-station queries.
+
+Stations with coordinates are bucketed into a fixed lat/lon grid of
+``CELL_DEGREES`` cells and stored sorted by cell, row-major, so every grid
+row of a query's bounding box is one or two contiguous slices (two when it
+wraps the antimeridian), and a box spanning all longitudes is a single slice.
+Candidates from those slices get an exact vectorized haversine distance.
+
+k-nearest queries search a growing radius until it holds ``k`` stations,
+which makes the k smallest distances exact. Doc ids are the search index's,
+so ranking by doc id is ranking by popularity.
+"""
+import math
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from radio.search_index import SearchIndex
+
+EARTH_RADIUS_KM = 6371.0088
+# Half the circumference: no two points are further apart.
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+CELL_DEGREES = 1.0
+# First radius tried by k-nearest queries; grows 4x per round.
+KNN_START_KM = 50.0
+ORDERS = ("distance", "clickcount")
+MAX_LIMIT = 500
+
+
+@dataclass(frozen=True)
+class NearbyQuery:
+    """A validated nearby-stations request."""
+
+    lat: float
+    lon: float
+    radius_km: Optional[float] = None
+    limit: int = 50
+    order: str = "distance"
+
+    @classmethod
+    def parse(cls, lat: float, lon: float, radius: Optional[float] = None, limit: int = 50,
+              order: str = "distance") -> "NearbyQuery":
+        """Raises ``ValueError`` on bad input; ``limit`` is capped at MAX_LIMIT."""
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError("lat must be within [-90, 90] and lon within [-180, 180]")
+        if radius is not None and not 0 < radius <= MAX_DISTANCE_KM:
+            raise ValueError(f"radius must be in (0, {MAX_DISTANCE_KM:.0f}] km")
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        if order not in ORDERS:
+            raise ValueError(f"order must be one of: {', '.join(ORDERS)}")
+        return cls(lat, lon, radius, min(limit, MAX_LIMIT), order)
+
+
+class GeoIndex:
+    """Grid-bucketed coordinates of the stations that have them."""
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, ok: Optional[np.ndarray] = None,
+                 version: int = 0, cell_degrees: float = CELL_DEGREES):
+        self.version = version
+        self.cell_degrees = cell_degrees
+        self.rows = int(math.ceil(180 / cell_degrees))
+        self.cols = int(math.ceil(360 / cell_degrees))
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        valid = ~(np.isnan(lat) | np.isnan(lon)) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        if ok is not None:
+            valid &= ok
+        docs = np.flatnonzero(valid)
+        cells = self._row(lat[docs]) * self.cols + self._col(lon[docs])
+        # Stable, so each cell keeps doc (popularity) order.
+        order = np.argsort(cells, kind="stable")
+        self.docs = docs[order]
+        self.lat = np.radians(lat[self.docs])
+        self.lon = np.radians(lon[self.docs])
+        self.cos_lat = np.cos(self.lat)
+        self.cell_start = np.searchsorted(cells[order], np.arange(self.rows * self.cols + 1))
+
+    @classmethod
+    def from_search_index(cls, index: SearchIndex) -> "GeoIndex":
+        columns = index.store.columns
+        return cls(np.asarray(columns["geo_lat"]), np.asarray(columns["geo_long"]), index.ok, index.version)
+
+    @classmethod
+    def from_stations(cls, stations: Sequence[dict]) -> "GeoIndex":
+        """Index of a station list; doc ids are list positions."""
+        def coordinate(value):
+            return math.nan if value in (None, "") else float(value)
+        lat = np.array([coordinate(s.get("geo_lat")) for s in stations], dtype=np.float64)
+        lon = np.array([coordinate(s.get("geo_long")) for s in stations], dtype=np.float64)
+        return cls(lat, lon)
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def _row(self, lat):
+        return np.clip(np.floor((lat + 90) / self.cell_degrees).astype(np.int64), 0, self.rows - 1)
+
+    def _col(self, lon):
+        return np.floor((lon + 180) / self.cell_degrees).astype(np.int64) % self.cols
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Positions (into the sorted arrays) of every station in the grid
+        cells that can hold points within ``radius_km``."""
+        delta = radius_km / EARTH_RADIUS_KM
+        dlat = math.degrees(delta)
+        row_lo = int(self._row(max(lat - dlat, -90.0)))
+        row_hi = int(self._row(min(lat + dlat, 90.0)))
+        if abs(lat) + dlat >= 90 or delta >= math.pi / 2:
+            # Reaches a pole (or half the globe): every longitude.
+            return np.arange(self.cell_start[row_lo * self.cols], self.cell_start[(row_hi + 1) * self.cols])
+        dlon = math.degrees(math.asin(min(1.0, math.sin(delta) / math.cos(math.radians(lat)))))
+        col_lo = int(math.floor((lon - dlon + 180) / self.cell_degrees))
+        col_hi = int(math.floor((lon + dlon + 180) / self.cell_degrees))
+        if col_hi - col_lo + 1 >= self.cols:
+            spans = [(0, self.cols - 1)]
+        elif col_lo % self.cols <= col_hi % self.cols:
+            spans = [(col_lo % self.cols, col_hi % self.cols)]
+        else:
+            spans = [(col_lo % self.cols, self.cols - 1), (0, col_hi % self.cols)]
+        rows = np.arange(row_lo, row_hi + 1) * self.cols
+        slices = [
+            (start, end)
+            for c0, c1 in spans
+            for start, end in zip(self.cell_start[rows + c0].tolist(), self.cell_start[rows + c1 + 1].tolist())
+            if end > start
+        ]
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(start, end) for start, end in slices])
+
+    def _distances(self, lat: float, lon: float, positions: np.ndarray) -> np.ndarray:
+        lat, lon = math.radians(lat), math.radians(lon)
+        a = (np.sin((self.lat[positions] - lat) / 2) ** 2
+             + math.cos(lat) * self.cos_lat[positions] * np.sin((self.lon[positions] - lon) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def within(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """``(docs, distances_km)`` of every station within ``radius_km``, unordered."""
+        positions = self._candidates(lat, lon, radius_km)
+        distances = self._distances(lat, lon, positions)
+        inside = distances <= radius_km
+        return self.docs[positions[inside]], distances[inside]
+
+    def nearest(self, lat: float, lon: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """``(docs, distances_km)`` of the ``k`` nearest stations, unordered."""
+        radius = KNN_START_KM
+        while True:
+            docs, distances = self.within(lat, lon, radius)
+            if len(docs) >= k or radius >= MAX_DISTANCE_KM:
+                break
+            radius = min(radius * 4, MAX_DISTANCE_KM)
+        if len(docs) > k:
+            keep = np.argpartition(distances, k - 1)[:k]
+            docs, distances = docs[keep], distances[keep]
+        return docs, distances
+
+    def query(self, query: NearbyQuery) -> Tuple[np.ndarray, np.ndarray]:
+        """``(docs, distances_km)`` for ``query``: up to ``limit`` stations
+        within its radius (or the ``limit`` nearest without one), ordered by
+        distance or by clickcount, nearest first on ties."""
+        if query.radius_km is None:
+            docs, distances = self.nearest(query.lat, query.lon, query.limit)
+        else:
+            docs, distances = self.within(query.lat, query.lon, query.radius_km)
+        if query.order == "distance":
+            ranked = np.lexsort((docs, distances))
+        else:
+            ranked = np.lexsort((distances, docs))
+        ranked = ranked[:query.limit]
+        return docs[ranked], distances[ranked]
@@ -0,0 +1,125 @@
+"""Stream health table fed by the prober.
+
+Results live in memory for request-time filtering and ranking, and are
+persisted to a ``stream_health`` table (``RADIO_HEALTH_DB``) so a restart does
+not forget which streams were dead.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Boolean, Column, Float, Integer, MetaData, String, Table, Text, create_engine, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+logger = logging.getLogger(__name__)
+
+HEALTH_MODES = ("filter", "rank")
+
+metadata = MetaData()
+
+stream_health = Table(
+    "stream_health",
+    metadata,
+    Column("stationuuid", String, primary_key=True),
+    Column("url", Text, nullable=False, default=""),
+    Column("final_url", Text),
+    Column("ok", Boolean, nullable=False, default=False),
+    Column("status", Integer),
+    Column("ttfb_ms", Float),
+    Column("codec", String),
+    Column("bitrate", Integer),
+    Column("content_type", String),
+    Column("hls", Boolean, nullable=False, default=False),
+    Column("error", Text),
+    Column("checked_at", Float, nullable=False, default=0.0),
+)
+
+COLUMNS = [c.name for c in stream_health.columns]
+
+
+class StreamHealthStore:
+    """Latest probe result per station."""
+
+    def __init__(self, url: Optional[str] = None, max_age: float = 3600.0):
+        self.max_age = max_age
+        self.engine = create_engine(url) if url else None
+        self._rows: Dict[str, dict] = {}
+        if self.engine is not None:
+            metadata.create_all(self.engine)
+            self.reload()
+
+    @classmethod
+    def from_env(cls) -> "StreamHealthStore":
+        path = os.environ.get("RADIO_HEALTH_DB")
+        return cls(
+            f"sqlite:///{path}" if path else None,
+            max_age=float(os.environ.get("RADIO_PROBE_MAX_AGE", 3600)),
+        )
+
+    def reload(self):
+        """Load the persisted table, e.g. rows written by another worker."""
+        if self.engine is None:
+            return
+        with self.engine.connect() as conn:
+            self._rows = {row["stationuuid"]: dict(row) for row in conn.execute(select(stream_health)).mappings()}
+
+    def get(self, station_uuid: str) -> Optional[dict]:
+        return self._rows.get(station_uuid)
+
+    def is_fresh(self, station_uuid: str, now: Optional[float] = None) -> bool:
+        row = self._rows.get(station_uuid)
+        return row is not None and (now or time.time()) - row["checked_at"] < self.max_age
+
+    def _persist(self, rows: List[dict]):
+        statement = sqlite_insert(stream_health)
+        statement = statement.on_conflict_do_update(
+            index_elements=["stationuuid"],
+            set_={name: statement.excluded[name] for name in COLUMNS if name != "stationuuid"},
+        )
+        with self.engine.begin() as conn:
+            conn.execute(statement, rows)
+
+    async def record(self, results: Iterable[tuple]):
+        """Store ``(stationuuid, ProbeResult)`` pairs."""
+        rows = []
+        for station_uuid, result in results:
+            row = {"stationuuid": station_uuid, **result.as_dict()}
+            self._rows[station_uuid] = row
+            rows.append(row)
+        if rows and self.engine is not None:
+            try:
+                await asyncio.to_thread(self._persist, rows)
+            except Exception as e:
+                logger.warning("Persisting stream health failed: %s", e)
+
+    def summary(self, station_uuid: str) -> Optional[dict]:
+        """The health fields exposed on station responses."""
+        row = self._rows.get(station_uuid)
+        if row is None:
+            return None
+        return {k: row[k] for k in ("ok", "ttfb_ms", "codec", "bitrate", "hls", "checked_at")}
+
+    def apply(self, stations: List[dict], mode: str) -> List[dict]:
+        """Annotate ``stations`` with ``health``; ``filter`` drops streams
+        found dead, ``rank`` also moves verified streams ahead of unchecked
+        ones (keeping the original order within each group)."""
+        annotated = []
+        for station in stations:
+            health = self.summary(station.get("stationuuid", ""))
+            if health is not None and not health["ok"]:
+                continue
+            annotated.append({**station, "health": health})
+        if mode == "rank":
+            annotated.sort(key=lambda s: s["health"] is None)
+        return annotated
+
+    def status(self) -> dict:
+        ok = sum(1 for row in self._rows.values() if row["ok"])
+        return {
+            "persistent": self.engine is not None,
+            "stations": len(self._rows),
+            "ok": ok,
+            "dead": len(self._rows) - ok,
+        }
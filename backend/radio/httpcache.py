@@ -0,0 +1,206 @@
+"""HTTP caching headers and conditional requests.
+
+Every cacheable GET gets a ``Cache-Control`` policy chosen by route, an ETag
+and 304 handling for ``If-None-Match`` / ``If-Modified-Since``. Handlers that
+know their content identity set the ETag themselves (aggregates, raw upstream
+pages: the digest is computed once per cache entry, when it is written);
+anything else is hashed here from the response body.
+
+Only 200 and 304 responses get the route's policy; errors are ``no-store`` so
+no shared cache or browser keeps serving them. A ``Cache-Control`` set by the
+handler (partial results, for instance) is left alone.
+
+ETags name the identity body; compressed representations get the content
+coding appended (``"<digest>-gzip"``, see :func:`coded_etag`) since a strong
+validator must differ per representation. Conditional requests match either.
+"""
+import hashlib
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional
+
+from radio.metrics import route_template
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    max_age: int = 0
+    stale_while_revalidate: int = 0
+    public: bool = True
+    no_store: bool = False
+
+    @property
+    def header(self) -> str:
+        if self.no_store:
+            return "no-store"
+        parts = ["public" if self.public else "private", f"max-age={self.max_age}"]
+        if self.stale_while_revalidate:
+            parts.append(f"stale-while-revalidate={self.stale_while_revalidate}")
+        return ", ".join(parts)
+
+
+STATION_LISTS = CachePolicy(max_age=60, stale_while_revalidate=300)
+NO_STORE = CachePolicy(no_store=True)
+
+# Route template -> policy. Routes not listed get DEFAULT_POLICY.
+ROUTE_POLICIES: Dict[str, CachePolicy] = {
+    "/": CachePolicy(max_age=300),
+    "/api/stations/popular": STATION_LISTS,
+    "/api/stations/by-country/{country_code}": STATION_LISTS,
+    "/api/stations/by-tag/{tag}": STATION_LISTS,
+    "/api/stations/by-genre": STATION_LISTS,
+    "/api/stations/search": STATION_LISTS,
+    "/api/stations/nearby": STATION_LISTS,
+    "/api/stations/christian": CachePolicy(max_age=120, stale_while_revalidate=600),
+    "/api/station/{station_uuid}": CachePolicy(max_age=300, stale_while_revalidate=600),
+    # Resolved stream URLs can move (playlist rotation, load balancers).
+    "/api/station/{station_uuid}/stream": CachePolicy(max_age=60, stale_while_revalidate=240),
+    "/api/station/{station_uuid}/similar": CachePolicy(max_age=600, stale_while_revalidate=3600),
+    "/api/countries": CachePolicy(max_age=3600, stale_while_revalidate=86400),
+    "/api/languages": CachePolicy(max_age=3600, stale_while_revalidate=86400),
+    "/api/tags": CachePolicy(max_age=3600, stale_while_revalidate=86400),
+    "/api/genres": CachePolicy(max_age=86400),
+    # Live counters and operational views.
+    "/api/station/{station_uuid}/clicks": CachePolicy(max_age=10, public=False),
+    "/api/mirrors": NO_STORE,
+    "/api/catalog/status": NO_STORE,
+    "/api/cache/stats": NO_STORE,
+    "/api/clicks/stats": NO_STORE,
+    "/api/aggregates/status": NO_STORE,
+    "/api/similar/status": NO_STORE,
+    "/api/admission/status": NO_STORE,
+    "/api/streams/status": NO_STORE,
+    "/api/ready": NO_STORE,
+    "/metrics": NO_STORE,
+}
+DEFAULT_POLICY = NO_STORE
+
+
+def digest(data: bytes) -> str:
+    """Content digest of ``data``."""
+    return hashlib.blake2b(data, digest_size=12).hexdigest()
+
+
+def make_etag(*parts: str) -> str:
+    """Strong ETag from content digests and anything else shaping the body."""
+    if len(parts) == 1:
+        return f'"{parts[0]}"'
+    return '"' + hashlib.blake2b("|".join(parts).encode(), digest_size=12).hexdigest() + '"'
+
+
+# Content codings that may be appended to an ETag.
+CODINGS = ("gzip", "br")
+
+
+def coded_etag(etag: str, coding: str) -> str:
+    """ETag of the ``coding``-encoded representation of a strong ``etag``."""
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{coding}"'
+
+
+def _identity_tag(tag: str) -> str:
+    tag = tag.strip().removeprefix("W/")
+    for coding in CODINGS:
+        suffix = f'-{coding}"'
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def matched_etag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """The tag of an ``If-None-Match`` header matching ``etag`` in any content
+    coding (weak comparison), or ``None``."""
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag or "*"
+    identity = _identity_tag(etag)
+    return next((tag.strip() for tag in if_none_match.split(",") if _identity_tag(tag) == identity), None)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header matches ``etag`` (weak comparison)."""
+    return matched_etag(if_none_match, etag) is not None
+
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: Optional[str]) -> bool:
+    if not if_modified_since or not last_modified:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+# Headers a 304 must repeat; everything else (notably Content-Length) is dropped.
+_NOT_MODIFIED_HEADERS = {b"etag", b"cache-control", b"last-modified", b"vary", b"expires"}
+
+
+class HTTPCacheMiddleware:
+    """ASGI middleware adding Cache-Control/ETag and answering conditional GETs."""
+
+    def __init__(self, app, policies: Optional[Dict[str, CachePolicy]] = None, default: CachePolicy = DEFAULT_POLICY):
+        self.app = app
+        self.policies = ROUTE_POLICIES if policies is None else policies
+        self.default = default
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        request_headers = {k: v.decode("latin-1") for k, v in scope["headers"] if k in (b"if-none-match", b"if-modified-since")}
+        start_message = None
+        passthrough = False
+        chunks = []
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                policy = self.policies.get(route_template(scope), self.default)
+                if message["status"] not in (200, 304):
+                    policy = NO_STORE
+                headers = start_message["headers"] = list(start_message["headers"])
+                if not any(k.lower() == b"cache-control" for k, _ in headers):
+                    headers.append((b"cache-control", policy.header.encode()))
+                passthrough = message["status"] != 200 or policy.no_store
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._finish(start_message, b"".join(chunks), request_headers, send)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _finish(self, start_message: dict, body: bytes, request_headers: dict, send):
+        headers = start_message["headers"]
+        lookup = {k.lower(): v.decode("latin-1") for k, v in headers}
+        etag = lookup.get(b"etag")
+        if etag is None and b"content-encoding" not in lookup:
+            etag = make_etag(digest(body))
+            headers.append((b"etag", etag.encode()))
+        matched = matched_etag(request_headers.get(b"if-none-match"), etag or "")
+        if matched or (
+            b"if-none-match" not in request_headers
+            and not_modified_since(request_headers.get(b"if-modified-since"), lookup.get(b"last-modified"))
+        ):
+            start_message["status"] = 304
+            start_message["headers"] = [(k, v) for k, v in headers if k.lower() in _NOT_MODIFIED_HEADERS]
+            if matched and matched != "*":
+                # The client's copy may be a compressed representation: repeat
+                # the validator it holds.
+                start_message["headers"] = [(k, v) for k, v in start_message["headers"] if k.lower() != b"etag"]
+                start_message["headers"].append((b"etag", matched.encode("latin-1")))
+            body = b""
+        await send(start_message)
+        await send({"type": "http.response.body", "body": body, "more_body": False})
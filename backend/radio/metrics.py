@@ -0,0 +1,225 @@
+"""Prometheus metrics for the API.
+
+Request, upstream and per-stage latencies are histograms observed as work
+happens. Point-in-time state that other components already track (mirror
+health, cache hit ratio, pool occupancy, click queue) is read by
+:class:`StateCollector` when ``/metrics`` is scraped, so those counters are
+not duplicated.
+"""
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+registry = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    "radio_http_request_duration_seconds",
+    "API request latency by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+UPSTREAM_LATENCY = Histogram(
+    "radio_upstream_request_duration_seconds",
+    "radio-browser request latency by mirror and endpoint",
+    ["mirror", "endpoint", "outcome"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+STAGE_LATENCY = Histogram(
+    "radio_stage_duration_seconds",
+    "Time spent in each stage of request handling",
+    ["operation", "stage"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+EVENT_LOOP_LAG = Gauge(
+    "radio_event_loop_lag_seconds",
+    "How late the last event-loop lag probe woke up",
+    registry=registry,
+)
+EVENT_LOOP_LAG_HISTOGRAM = Histogram(
+    "radio_event_loop_lag_distribution_seconds",
+    "Distribution of event-loop lag probe delays",
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+
+
+def endpoint_label(endpoint: str) -> str:
+    """Upstream endpoint with per-station path segments dropped (bounded cardinality)."""
+    if endpoint.startswith("url/"):
+        return "url"
+    return endpoint
+
+
+@contextmanager
+def stage(operation: str, name: str) -> Iterator[None]:
+    """Time a block as stage ``name`` of ``operation``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(operation, name).observe(time.perf_counter() - start)
+
+
+async def monitor_event_loop(interval: float = 0.5, on_lag: Optional[Callable[[float], None]] = None):
+    """Record how late ``asyncio.sleep(interval)`` wakes up, until cancelled;
+    each sample is also passed to ``on_lag``."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        EVENT_LOOP_LAG.set(lag)
+        EVENT_LOOP_LAG_HISTOGRAM.observe(lag)
+        if on_lag is not None:
+            on_lag(lag)
+
+
+def route_template(scope: dict) -> Optional[str]:
+    """Path template of the route that handled ``scope`` (e.g. ``/api/station/{station_uuid}``)."""
+    route = scope.get("route")
+    if route is None:
+        # Older Starlette releases don't record the matched route in the scope.
+        from starlette.routing import Match
+
+        app = scope.get("app")
+        for candidate in getattr(app, "routes", ()):
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", None)
+
+
+class PrometheusMiddleware:
+    """ASGI middleware observing :data:`REQUEST_LATENCY` per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Unmatched paths share one label so 404 scans can't blow up cardinality.
+            route = route_template(scope) or "unmatched"
+            REQUEST_LATENCY.labels(scope["method"], route, str(status[0])).observe(time.perf_counter() - start)
+
+
+class StateCollector:
+    """Exposes component state (mirrors, cache, pool, clicks, prewarm, admission)
+    at scrape time.
+
+    ``sources`` returns the current components, so tests and hot reloads that
+    swap them are picked up without re-registering.
+    """
+
+    def __init__(self, sources: Callable[[], dict]):
+        self.sources = sources
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        sources = self.sources()
+        mirrors = sources.get("mirrors")
+        if mirrors is not None:
+            status = mirrors.status()
+            for name in ("failovers", "hedges", "hedge_wins"):
+                yield CounterMetricFamily(f"radio_mirror_{name}", f"Mirror {name.replace('_', ' ')}", value=status[name])
+            healthy = GaugeMetricFamily("radio_mirror_up", "1 if the mirror's circuit is closed", labels=["mirror"])
+            errors = GaugeMetricFamily("radio_mirror_error_rate", "EWMA error rate per mirror", labels=["mirror"])
+            latency = GaugeMetricFamily("radio_mirror_latency_ewma_seconds", "EWMA latency per mirror", labels=["mirror"])
+            for mirror in status["mirrors"]:
+                healthy.add_metric([mirror["url"]], 1.0 if mirror["state"] == "closed" else 0.0)
+                errors.add_metric([mirror["url"]], mirror["error_rate"])
+                if mirror["latency_ewma_ms"] is not None:
+                    latency.add_metric([mirror["url"]], mirror["latency_ewma_ms"] / 1000)
+            yield healthy
+            yield errors
+            yield latency
+
+        cache = sources.get("cache")
+        if cache is not None:
+            snapshot = cache.snapshot()
+            yield GaugeMetricFamily("radio_cache_hit_ratio", "Response cache hit ratio", value=snapshot["hit_ratio"])
+            yield GaugeMetricFamily("radio_cache_entries", "Response cache entries", value=snapshot["size"])
+            lookups = CounterMetricFamily("radio_cache_lookups", "Response cache lookups by result", labels=["result"])
+            for result in ("hits", "stale_hits", "misses", "coalesced"):
+                lookups.add_metric([result], snapshot[result])
+            yield lookups
+
+        upstream = sources.get("upstream")
+        if upstream is not None:
+            pool = upstream.pool_stats()
+            inflight = sum(pool["inflight"].values())
+            yield GaugeMetricFamily("radio_pool_open_connections", "Open upstream connections", value=pool["open_connections"])
+            yield GaugeMetricFamily("radio_pool_idle_connections", "Idle upstream connections", value=pool["idle_connections"])
+            yield GaugeMetricFamily("radio_pool_inflight_requests", "Upstream requests in flight", value=inflight)
+            yield GaugeMetricFamily(
+                "radio_pool_utilization", "In-flight upstream requests over pool capacity",
+                value=inflight / pool["max_connections"] if pool["max_connections"] else 0.0,
+            )
+
+        clicks = sources.get("clicks")
+        if clicks is not None:
+            snapshot = clicks.snapshot()
+            yield GaugeMetricFamily("radio_click_queue_depth", "Clicks waiting to be reported", value=snapshot["queue_depth"])
+            reported = CounterMetricFamily("radio_clicks", "Clicks by outcome", labels=["outcome"])
+            for outcome in ("accepted", "dropped", "deduplicated", "sent", "failed"):
+                reported.add_metric([outcome], snapshot[outcome])
+            yield reported
+
+        prewarm = sources.get("prewarm")
+        if prewarm is not None:
+            status = prewarm.status()
+            yield GaugeMetricFamily("radio_prewarm_hit_ratio", "Share of lookups served by prewarmed entries", value=status["hit_ratio"])
+            yield GaugeMetricFamily("radio_prewarm_hot_keys", "Keys tracked as hot", value=status["hot_keys"])
+            lookups = CounterMetricFamily("radio_prewarm_lookups", "Upstream-backed lookups by prewarm result", labels=["result"])
+            lookups.add_metric(["hit"], status["prewarm_hits"])
+            lookups.add_metric(["miss"], status["lookups"] - status["prewarm_hits"])
+            yield lookups
+            refreshes = CounterMetricFamily("radio_prewarm_refreshes", "Prewarm refreshes by outcome", labels=["outcome"])
+            refreshes.add_metric(["ok"], status["refreshes"])
+            refreshes.add_metric(["error"], status["refresh_errors"])
+            refreshes.add_metric(["over_budget"], status["over_budget"])
+            yield refreshes
+
+        admission = sources.get("admission")
+        if admission is not None:
+            status = admission.status()
+            concurrency = status["concurrency"]
+            yield GaugeMetricFamily("radio_concurrency_limit", "Adaptive limit on concurrent requests", value=concurrency["limit"])
+            yield GaugeMetricFamily("radio_concurrency_inflight", "Requests holding a concurrency slot", value=concurrency["inflight"])
+            yield CounterMetricFamily("radio_requests_shed", "Requests rejected with 503 by the concurrency limit", value=concurrency["shed"])
+            rejected = CounterMetricFamily("radio_rate_limited", "Requests refused by a rate limit", labels=["limit"])
+            rejected.add_metric(["client"], status["clients"]["rejected"])
+            rejected.add_metric(["upstream"], status["upstream"]["rejected"])
+            yield rejected
+
+
+def render() -> bytes:
+    return generate_latest(registry)
+
@@ -0,0 +1,366 @@
+"""Health-scored selection between radio-browser mirrors.
+
+Each mirror tracks an EWMA of its latency and error rate plus a circuit
+breaker. Requests pick a mirror with power-of-two-choices on that score, fail
+over to another mirror on error, and are hedged: if the first mirror has not
+answered within the recent p95 latency, the same request is sent to a second
+mirror and whichever answers first wins.
+
+Mirrors are discovered the way radio-browser recommends (DNS SRV records,
+else the A records of ``all.api.radio-browser.info`` reverse-resolved to
+hostnames) with a static list as the fallback.
+"""
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+STATIC_MIRRORS = [
+    "https://de1.api.radio-browser.info",
+    "https://nl1.api.radio-browser.info",
+    "https://at1.api.radio-browser.info",
+]
+DISCOVERY_HOST = "all.api.radio-browser.info"
+SRV_NAME = "_api._tcp.radio-browser.info"
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.environ.get(name, str(default)).lower() in ("1", "true", "yes", "on")
+
+
+class MirrorsUnavailable(Exception):
+    """Every mirror failed (or was skipped) for a request."""
+
+
+class _Refused(Exception):
+    """``admit`` refused to send a request; carries its exception."""
+
+    def __init__(self, error: Exception):
+        super().__init__(str(error))
+        self.error = error
+
+
+class Mirror:
+    """Health statistics and circuit breaker state for one mirror."""
+
+    def __init__(self, url: str, alpha: float = 0.3, window: int = 200):
+        self.url = url
+        self.alpha = alpha
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.samples: deque = deque(maxlen=window)
+        self.inflight = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+
+    def score(self) -> float:
+        """Lower is better: expected latency inflated by errors and load."""
+        latency = self.latency_ewma if self.latency_ewma is not None else 0.0
+        return (latency + 0.001) * (1 + 4 * self.error_ewma) * (1 + self.inflight)
+
+    def record(self, latency: float, ok: bool):
+        self.requests += 1
+        self.samples.append(latency)
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += self.alpha * (latency - self.latency_ewma)
+        self.error_ewma += self.alpha * ((0.0 if ok else 1.0) - self.error_ewma)
+        if ok:
+            self.consecutive_failures = 0
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "state": self.state,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 2) if self.latency_ewma is not None else None,
+            "error_rate": round(self.error_ewma, 4),
+            "inflight": self.inflight,
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+class MirrorPool:
+    """Chooses, hedges and fails over between radio-browser mirrors."""
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        failure_threshold: int = 5,
+        cooldown: float = 30.0,
+        hedging: bool = True,
+        discovery: bool = False,
+        min_hedge_delay: float = 0.05,
+        max_hedge_delay: float = 2.0,
+        rng: Optional[random.Random] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._mirrors: Dict[str, Mirror] = {}
+        self.set_urls(urls)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.hedging = hedging
+        self.discovery = discovery
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.rng = rng or random.Random()
+        self.clock = clock
+        self.failovers = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @classmethod
+    def from_env(cls) -> "MirrorPool":
+        return cls(
+            STATIC_MIRRORS,
+            failure_threshold=int(os.environ.get("RADIO_MIRROR_FAILURE_THRESHOLD", 5)),
+            cooldown=float(os.environ.get("RADIO_MIRROR_COOLDOWN", 30)),
+            hedging=_env_bool("RADIO_MIRROR_HEDGING", True),
+            discovery=_env_bool("RADIO_MIRROR_DISCOVERY", True),
+        )
+
+    @property
+    def urls(self) -> List[str]:
+        return list(self._mirrors)
+
+    @property
+    def mirrors(self) -> List[Mirror]:
+        return list(self._mirrors.values())
+
+    def set_urls(self, urls: Iterable[str]):
+        """Replace the mirror list, keeping statistics for known mirrors."""
+        self._mirrors = {url: self._mirrors.get(url) or Mirror(url) for url in urls}
+
+    # -- circuit breaker ------------------------------------------------------
+
+    def _available(self, mirror: Mirror) -> bool:
+        if mirror.state == OPEN and self.clock() - mirror.opened_at >= self.cooldown:
+            mirror.state = HALF_OPEN
+        if mirror.state == HALF_OPEN:
+            return not mirror.probing
+        return mirror.state == CLOSED
+
+    def _on_result(self, mirror: Mirror, ok: bool):
+        if mirror.state == HALF_OPEN:
+            mirror.probing = False
+            if ok:
+                mirror.state = CLOSED
+                mirror.error_ewma = 0.0
+            else:
+                self._open(mirror)
+        elif not ok and mirror.consecutive_failures >= self.failure_threshold:
+            self._open(mirror)
+
+    def _open(self, mirror: Mirror):
+        mirror.state = OPEN
+        mirror.opened_at = self.clock()
+        logger.warning("Circuit opened for mirror %s", mirror.url)
+
+    # -- selection --------------------------------------------------------------
+
+    def choose(self, exclude: Iterable[str] = ()) -> Optional[Mirror]:
+        """Power-of-two-choices among healthy mirrors not in ``exclude``."""
+        excluded = set(exclude)
+        candidates = [m for m in self._mirrors.values() if m.url not in excluded and self._available(m)]
+        probes = [m for m in candidates if m.state == HALF_OPEN]
+        if probes:
+            # A recovering mirror would never win on its error-inflated score,
+            # so it gets the single probe request outright.
+            mirror = probes[0]
+        elif not candidates:
+            # Everything is tripped: probe the mirror that tripped longest ago
+            # rather than refusing outright.
+            tripped = [m for m in self._mirrors.values() if m.url not in excluded and not m.probing]
+            if not tripped:
+                return None
+            mirror = min(tripped, key=lambda m: m.opened_at)
+            mirror.state = HALF_OPEN
+        elif len(candidates) == 1:
+            mirror = candidates[0]
+        else:
+            a, b = self.rng.sample(candidates, 2)
+            mirror = a if a.score() <= b.score() else b
+        if mirror.state == HALF_OPEN:
+            mirror.probing = True
+        return mirror
+
+    def hedge_delay(self) -> float:
+        """Recent p95 latency across mirrors, clamped to the configured range."""
+        samples = sorted(s for m in self._mirrors.values() for s in m.samples)
+        if len(samples) < 20:
+            return self.max_hedge_delay
+        p95 = samples[int(0.95 * (len(samples) - 1))]
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, p95))
+
+    # -- requests ---------------------------------------------------------------
+
+    async def _timed(
+        self,
+        mirror: Mirror,
+        attempt: Callable[[str], Awaitable[T]],
+        admit: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> T:
+        if admit is not None:
+            try:
+                await admit()
+            except asyncio.CancelledError:
+                if mirror.state == HALF_OPEN:
+                    mirror.probing = False
+                raise
+            except Exception as e:
+                # Never sent: says nothing about the mirror's health either.
+                if mirror.state == HALF_OPEN:
+                    mirror.probing = False
+                raise _Refused(e)
+        mirror.inflight += 1
+        start = self.clock()
+        try:
+            result = await attempt(mirror.url)
+        except asyncio.CancelledError:
+            # Lost a hedge race; says nothing about the mirror's health.
+            if mirror.state == HALF_OPEN:
+                mirror.probing = False
+            raise
+        except Exception:
+            mirror.record(self.clock() - start, ok=False)
+            self._on_result(mirror, ok=False)
+            raise
+        finally:
+            mirror.inflight -= 1
+        mirror.record(self.clock() - start, ok=True)
+        self._on_result(mirror, ok=True)
+        return result
+
+    async def request(
+        self,
+        attempt: Callable[[str], Awaitable[T]],
+        admit: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> T:
+        """Run ``attempt(mirror_url)`` with hedging and failover.
+
+        ``attempt`` must raise for any response that should count as a
+        failure. Raises :class:`MirrorsUnavailable` once every mirror failed.
+
+        ``admit`` is awaited before every request actually sent (the first
+        try, hedges and failovers). If it raises, that request is not sent;
+        with nothing else in flight the exception ends the whole request.
+        """
+        tried: List[str] = []
+        pending: Dict[asyncio.Task, Mirror] = {}
+        last_error: Optional[BaseException] = None
+        hedged = False
+
+        def launch(mirror: Mirror) -> asyncio.Task:
+            tried.append(mirror.url)
+            task = asyncio.ensure_future(self._timed(mirror, attempt, admit))
+            pending[task] = mirror
+            return task
+
+        first = None
+        try:
+            while True:
+                if not pending:
+                    mirror = self.choose(tried)
+                    if mirror is None:
+                        break
+                    if tried:
+                        self.failovers += 1
+                    task = launch(mirror)
+                    first = first or task
+                timeout = None
+                if self.hedging and not hedged and len(self._mirrors) > len(tried):
+                    timeout = self.hedge_delay()
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    mirror = self.choose(tried)
+                    if mirror is not None:
+                        self.hedges += 1
+                        launch(mirror)
+                    continue
+                refused = None
+                for task in done:
+                    pending.pop(task)
+                    if task.exception() is None:
+                        if hedged and task is not first:
+                            self.hedge_wins += 1
+                        return task.result()
+                    if isinstance(task.exception(), _Refused):
+                        refused = task.exception().error
+                    else:
+                        last_error = task.exception()
+                if refused is not None and not pending:
+                    raise refused
+        finally:
+            for task in pending:
+                task.cancel()
+        raise MirrorsUnavailable(str(last_error) if last_error else "no mirror available")
+
+    async def run_discovery(self, interval: float = 3600.0):
+        """Refresh the mirror list from DNS until cancelled."""
+        while True:
+            urls = await discover_mirrors()
+            if urls != self.urls:
+                logger.info("Radio-browser mirrors: %s", ", ".join(urls))
+                self.set_urls(urls)
+            await asyncio.sleep(interval)
+
+    def status(self) -> dict:
+        return {
+            "mirrors": [m.as_dict() for m in self._mirrors.values()],
+            "failovers": self.failovers,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay_ms": round(self.hedge_delay() * 1000, 2),
+        }
+
+
+async def discover_mirrors(timeout: float = 5.0) -> List[str]:
+    """Current radio-browser mirrors, falling back to :data:`STATIC_MIRRORS`."""
+    for lookup in (_srv_mirrors, _reverse_dns_mirrors):
+        try:
+            urls = await asyncio.wait_for(lookup(), timeout)
+        except Exception as e:
+            logger.info("Mirror discovery via %s failed: %s", lookup.__name__, e)
+            continue
+        if urls:
+            return sorted(set(urls))
+    return list(STATIC_MIRRORS)
+
+
+async def _srv_mirrors() -> List[str]:
+    try:
+        import dns.asyncresolver
+    except ImportError:
+        return []
+    answers = await dns.asyncresolver.resolve(SRV_NAME, "SRV")
+    return [f"https://{str(a.target).rstrip('.')}" for a in answers]
+
+
+async def _reverse_dns_mirrors() -> List[str]:
+    loop = asyncio.get_running_loop()
+    infos = await loop.getaddrinfo(DISCOVERY_HOST, 443, type=socket.SOCK_STREAM)
+    ips = {info[4][0] for info in infos}
+    hosts = await asyncio.gather(
+        *(loop.run_in_executor(None, socket.gethostbyaddr, ip) for ip in ips),
+        return_exceptions=True,
+    )
+    return [f"https://{h[0]}" for h in hosts if not isinstance(h, BaseException)]
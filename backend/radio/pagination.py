@@ -0,0 +1,72 @@
+"""Opaque cursors for paging through station lists.
+
+A cursor records the offset of the next page, the data snapshot it was issued
+against (``index:<version>``, ``catalog:<version>`` or ``upstream``) and a
+fingerprint of the filters, so a cursor cannot be replayed against a
+different query. Clients treat it as an opaque string; it is signed with
+``RADIO_CURSOR_SECRET`` (shared by all workers, random per process when
+unset) so offsets and snapshots can't be forged.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from radio.query import MAX_LIMIT
+from radio.responses import RawJSON
+
+CURSOR_VERSION = "2"
+CURSOR_KEY = (os.environ.get("RADIO_CURSOR_SECRET") or os.urandom(16).hex()).encode()
+# Deepest offset a cursor may point at; past it paging just ends.
+MAX_OFFSET = MAX_LIMIT * 20
+_SNAPSHOT = re.compile(r"upstream|(index|catalog):\d+")
+
+
+def fingerprint(*parts: Any) -> str:
+    """Short stable hash of the filters a cursor belongs to."""
+    return hashlib.blake2b(repr(parts).encode(), digest_size=6).hexdigest()
+
+
+@dataclass(frozen=True)
+class Cursor:
+    offset: int
+    snapshot: str
+    query: str
+
+    def encode(self) -> str:
+        raw = "|".join((CURSOR_VERSION, str(self.offset), self.snapshot, self.query))
+        raw = f"{raw}|{_sign(raw)}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "Cursor":
+        """Parse a token from :meth:`encode`; raises ``ValueError`` if malformed,
+        forged or pointing past :data:`MAX_OFFSET`."""
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+            signed, signature = raw.rsplit("|", 1)
+            version, offset, snapshot, query = signed.split("|")
+            offset = int(offset)
+        except Exception:
+            raise ValueError("invalid cursor") from None
+        if not hmac.compare_digest(signature, _sign(signed)) or version != CURSOR_VERSION:
+            raise ValueError("invalid cursor")
+        if not 0 <= offset <= MAX_OFFSET or not _SNAPSHOT.fullmatch(snapshot):
+            raise ValueError("invalid cursor")
+        return cls(offset, snapshot, query)
+
+
+def _sign(raw: str) -> str:
+    return hmac.new(CURSOR_KEY, raw.encode(), hashlib.blake2b).hexdigest()[:24]
+
+
+def count_stations(stations: Any) -> int:
+    """Number of stations in a list or in undecoded upstream JSON."""
+    if isinstance(stations, RawJSON):
+        # Every station object has exactly one "stationuuid" key; an escaped
+        # occurrence inside a string value can't match the unescaped quotes.
+        return stations.data.count(b'"stationuuid"')
+    return len(stations)
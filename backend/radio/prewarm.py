@@ -0,0 +1,238 @@
+"""Popularity-driven cache prewarming.
+
+Every upstream-backed lookup is counted per normalized cache key in a
+count-min sketch, and the keys with the highest estimates are kept in a small
+heavy-hitter table along with how to refetch them. A background loop
+refreshes hot keys whose cached copy is about to expire (or is already
+gone), so popular lists such as ``/by-country/US`` are never cold after a
+TTL. Refreshes run with bounded concurrency and are paid for from a token
+bucket, which caps the upstream traffic prewarming adds.
+
+Counts are halved every ``decay_interval`` so the table follows current
+traffic. Keys loaded by startup warm-up (see :meth:`Prewarmer.warm`) are
+registered but not counted as demand.
+
+Hit rate: a lookup is a prewarm hit when it is served by an entry the
+prewarmer loaded and that entry is still within the TTL it was loaded with.
+"""
+import asyncio
+import contextvars
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+import numpy as np
+
+from radio.cache import TieredCache
+from radio.fanout import fan_out
+from radio.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Keys loaded inside Prewarmer.warm(), collected so they can be marked once
+# the loader has succeeded.
+_warming: contextvars.ContextVar[Optional[Set[str]]] = contextvars.ContextVar("prewarming", default=None)
+
+
+class CountMinSketch:
+    """Approximate per-key counts in ``depth`` x ``width`` counters.
+
+    Uses conservative update: only the counters at the current minimum are
+    raised, which keeps over-estimates from hash collisions small.
+    """
+
+    def __init__(self, width: int = 4096, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.counts = np.zeros((depth, width), dtype=np.uint32)
+        self._rows = np.arange(depth)
+
+    def _columns(self, key: str) -> np.ndarray:
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.depth).digest()
+        return np.frombuffer(digest, dtype=np.uint32) % self.width
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Count ``key`` and return its new estimate."""
+        columns = self._columns(key)
+        current = self.counts[self._rows, columns]
+        estimate = int(current.min()) + count
+        self.counts[self._rows, columns] = np.maximum(current, estimate)
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return int(self.counts[self._rows, self._columns(key)].min())
+
+    def decay(self):
+        self.counts >>= 1
+
+
+@dataclass
+class HotKey:
+    key: str
+    estimate: int
+    ttl: float
+    fetch: Callable[[], Awaitable[Any]]
+
+
+class Prewarmer:
+    """Tracks key popularity and keeps the hottest keys in ``cache`` fresh."""
+
+    def __init__(
+        self,
+        cache: TieredCache,
+        top_k: int = 50,
+        min_hits: int = 3,
+        lead: float = 30.0,
+        concurrency: int = 4,
+        budget_per_minute: float = 60.0,
+        interval: float = 5.0,
+        decay_interval: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.cache = cache
+        self.top_k = top_k
+        self.min_hits = min_hits
+        self.lead = lead
+        self.concurrency = concurrency
+        self.interval = interval
+        self.decay_interval = decay_interval
+        self.clock = clock
+        # Up to 10 seconds' worth of refreshes can be spent at once.
+        burst = max(1.0, budget_per_minute / 6.0) if budget_per_minute > 0 else 0.0
+        self.budget = TokenBucket(budget_per_minute / 60.0, burst, clock)
+        self.sketch = CountMinSketch()
+        self.hot: Dict[str, HotKey] = {}
+        self._floor = 0
+        # TTLs of the keys loaded during warm-up
+        self._warm_ttls: Dict[str, float] = {}
+        # key -> time until which its cached entry is the one we loaded
+        self._warmed: Dict[str, float] = {}
+        self._last_decay = clock()
+        self.lookups = 0
+        self.hits = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.over_budget = 0
+        self.warmed_at_startup = 0
+
+    @classmethod
+    def from_env(cls, cache: TieredCache) -> "Prewarmer":
+        return cls(
+            cache,
+            top_k=int(os.environ.get("RADIO_PREWARM_TOP_K", 50)),
+            min_hits=int(os.environ.get("RADIO_PREWARM_MIN_HITS", 3)),
+            lead=float(os.environ.get("RADIO_PREWARM_LEAD", 30)),
+            concurrency=int(os.environ.get("RADIO_PREWARM_CONCURRENCY", 4)),
+            budget_per_minute=float(os.environ.get("RADIO_PREWARM_BUDGET", 60)),
+            interval=float(os.environ.get("RADIO_PREWARM_INTERVAL", 5)),
+            decay_interval=float(os.environ.get("RADIO_PREWARM_DECAY_INTERVAL", 300)),
+        )
+
+    def observe(self, key: str, ttl: float, fetch: Callable[[], Awaitable[Any]]):
+        """Record a lookup of ``key``, which ``fetch`` reloads for ``ttl`` seconds."""
+        warming = _warming.get()
+        if warming is not None:
+            warming.add(key)
+            self._warm_ttls[key] = ttl
+            return
+        self.lookups += 1
+        warmed_until = self._warmed.get(key)
+        if warmed_until is not None:
+            if warmed_until > self.clock():
+                self.hits += 1
+            else:
+                del self._warmed[key]
+
+        estimate = self.sketch.add(key)
+        hot = self.hot.get(key)
+        if hot is not None:
+            hot.estimate, hot.ttl, hot.fetch = estimate, ttl, fetch
+        elif len(self.hot) < self.top_k:
+            self.hot[key] = HotKey(key, estimate, ttl, fetch)
+            self._floor = min(h.estimate for h in self.hot.values())
+        elif estimate > self._floor:
+            coldest = min(self.hot.values(), key=lambda h: h.estimate)
+            del self.hot[coldest.key]
+            self.hot[key] = HotKey(key, estimate, ttl, fetch)
+            self._floor = min(h.estimate for h in self.hot.values())
+
+    async def warm(self, loader: Callable[[], Awaitable[Any]]):
+        """Run a startup ``loader``; the keys it loads count as prewarmed."""
+        keys: Set[str] = set()
+        token = _warming.set(keys)
+        try:
+            await loader()
+        finally:
+            _warming.reset(token)
+        now = self.clock()
+        for key in keys:
+            self._warmed[key] = now + self._warm_ttls.pop(key)
+        self.warmed_at_startup += len(keys)
+
+    def due(self) -> list:
+        """Hot keys whose cached copy expires within ``lead`` seconds (half
+        the TTL for short TTLs), hottest first."""
+        due = []
+        for hot in self.hot.values():
+            if hot.estimate < self.min_hits:
+                continue
+            fresh_for = self.cache.fresh_for(hot.key)
+            if fresh_for is None or fresh_for <= min(self.lead, hot.ttl / 2):
+                due.append(hot)
+        return sorted(due, key=lambda h: h.estimate, reverse=True)
+
+    async def _refresh(self, hot: HotKey):
+        try:
+            value = await hot.fetch()
+        except Exception:
+            self.refresh_errors += 1
+            raise
+        await self.cache.set(hot.key, value, hot.ttl)
+        self.refreshes += 1
+        self._warmed[hot.key] = self.clock() + hot.ttl
+
+    async def tick(self):
+        """One round: decay if due, then refresh what the budget allows."""
+        now = self.clock()
+        if now - self._last_decay >= self.decay_interval:
+            self.sketch.decay()
+            for hot in self.hot.values():
+                hot.estimate //= 2
+            self._floor //= 2
+            self._last_decay = now
+            self._warmed = {k: until for k, until in self._warmed.items() if until > now}
+        batch = []
+        for hot in self.due():
+            if not self.budget.try_acquire():
+                self.over_budget += 1
+                break
+            batch.append(hot)
+        if batch:
+            _, failed = await fan_out(self._refresh, batch, concurrency=self.concurrency)
+            if failed:
+                logger.warning("Prewarm refresh failed for %d of %d keys", len(failed), len(batch))
+
+    async def run(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.warning("Prewarm round failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def status(self) -> dict:
+        hottest = sorted(self.hot.values(), key=lambda h: h.estimate, reverse=True)[:10]
+        return {
+            "lookups": self.lookups,
+            "prewarm_hits": self.hits,
+            "hit_ratio": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "over_budget": self.over_budget,
+            "warmed_at_startup": self.warmed_at_startup,
+            "hot_keys": len(self.hot),
+            "hottest": [{"key": h.key, "estimate": h.estimate} for h in hottest],
+        }
@@ -0,0 +1,376 @@
+"""Background health checks of station stream URLs.
+
+radio-browser's ``lastcheckok`` is refreshed by its own checkers on their
+schedule, so it lags reality. :class:`StreamProber` opens each stream with a
+short GET (many ICY servers mishandle HEAD), follows .pls/.m3u playlists and
+HLS master playlists to the playable URL, and records whether audio arrived,
+the time to first byte and the codec/bitrate the server actually announces
+(``Content-Type``, ``icy-br``, ``ice-audio-info``, HLS ``CODECS``/``BANDWIDTH``).
+
+Probes run with bounded concurrency and a token bucket per host, so one
+broadcaster hosting thousands of stations is not hammered. Station URLs,
+redirects and playlist entries all come from third parties, so every request
+(each hop and redirect) must resolve to public addresses only.
+"""
+import asyncio
+import ipaddress
+import os
+import socket
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+
+from radio.ratelimit import TokenBucket
+
+MAX_PLAYLIST_DEPTH = 3
+MAX_PLAYLIST_BYTES = 64 * 1024
+
+PLAYLIST_TYPES = {
+    "audio/x-scpls": "pls",
+    "audio/scpls": "pls",
+    "audio/x-mpegurl": "m3u",
+    "audio/mpegurl": "m3u",
+    "application/vnd.apple.mpegurl": "m3u",
+    "application/x-mpegurl": "m3u",
+}
+PLAYLIST_EXTENSIONS = {".pls": "pls", ".m3u": "m3u", ".m3u8": "m3u"}
+
+CODECS = {
+    "audio/mpeg": "MP3",
+    "audio/mp3": "MP3",
+    "audio/aac": "AAC",
+    "audio/aacp": "AAC+",
+    "audio/x-aac": "AAC",
+    "audio/ogg": "OGG",
+    "application/ogg": "OGG",
+    "audio/opus": "OPUS",
+    "audio/flac": "FLAC",
+    "audio/x-flac": "FLAC",
+    "video/mp2t": "AAC",
+}
+
+
+@dataclass
+class ProbeResult:
+    url: str
+    ok: bool
+    final_url: Optional[str] = None
+    status: Optional[int] = None
+    ttfb_ms: Optional[float] = None
+    codec: Optional[str] = None
+    bitrate: Optional[int] = None
+    content_type: Optional[str] = None
+    hls: bool = False
+    error: Optional[str] = None
+    checked_at: float = 0.0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class BlockedAddress(Exception):
+    """A probe would have reached a private, loopback or link-local address."""
+
+
+# -- parsing ------------------------------------------------------------------
+
+def playlist_kind(url: str, content_type: str, head: bytes) -> Optional[str]:
+    """``"pls"``, ``"m3u"`` or ``None`` for an audio stream."""
+    kind = PLAYLIST_TYPES.get(content_type)
+    if kind:
+        return kind
+    if content_type.startswith("audio/") and content_type not in ("audio/x-mpegurl", "audio/mpegurl"):
+        return None
+    start = head.lstrip()[:16].lower()
+    if start.startswith(b"[playlist]"):
+        return "pls"
+    if start.startswith(b"#extm3u"):
+        return "m3u"
+    path = urlsplit(url).path.lower()
+    for extension, kind in PLAYLIST_EXTENSIONS.items():
+        if path.endswith(extension):
+            return kind
+    return None
+
+
+def needs_resolving(url: str, hls: bool = False) -> bool:
+    """Whether ``url`` is (by its extension, or the listing's HLS flag) a
+    playlist; anything else is assumed to be a directly playable stream."""
+    return hls or playlist_kind(url, "", b"") is not None
+
+
+def is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address)
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def parse_pls(text: str) -> List[str]:
+    entries = []
+    for line in text.splitlines():
+        key, _, value = line.partition("=")
+        if key.strip().lower().startswith("file") and value.strip():
+            entries.append(value.strip())
+    return entries
+
+
+def parse_m3u(text: str, base: str) -> Tuple[List[str], bool, Optional[Tuple[int, str]]]:
+    """``(entries, is_hls, (bandwidth, codecs) of the first variant)``."""
+    entries = []
+    hls = False
+    variant = None
+    pending_variant = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            if line.startswith("#EXT-X-"):
+                hls = True
+            if line.startswith("#EXT-X-STREAM-INF:"):
+                pending_variant = _stream_inf(line.split(":", 1)[1])
+            continue
+        entries.append(urljoin(base, line))
+        if pending_variant is not None and variant is None:
+            variant = pending_variant
+        pending_variant = None
+    return entries, hls, variant
+
+
+def _stream_inf(attributes: str) -> Tuple[int, str]:
+    bandwidth, codecs = 0, ""
+    # Attribute values may be quoted and contain commas (CODECS="mp4a.40.2,avc1").
+    key, value, quoted, parts = "", "", False, []
+    for char in attributes + ",":
+        if char == '"':
+            quoted = not quoted
+        elif char == "," and not quoted:
+            parts.append(value)
+            value = ""
+        else:
+            value += char
+    for part in parts:
+        key, _, val = part.partition("=")
+        if key.strip() == "BANDWIDTH" and val.strip().isdigit():
+            bandwidth = int(val)
+        elif key.strip() == "CODECS":
+            codecs = val.strip()
+    return bandwidth, codecs
+
+
+def hls_codec(codecs: str) -> Optional[str]:
+    codecs = codecs.lower()
+    if "mp4a.40.5" in codecs or "mp4a.40.29" in codecs:
+        return "AAC+"
+    if "mp4a" in codecs:
+        return "AAC"
+    if "mp3" in codecs or "mp4a.40.34" in codecs:
+        return "MP3"
+    return None
+
+
+def icy_bitrate(headers: httpx.Headers) -> Optional[int]:
+    value = headers.get("icy-br", "").split(",")[0].strip()
+    if value.isdigit():
+        return int(value)
+    for item in headers.get("ice-audio-info", "").split(";"):
+        key, _, val = item.partition("=")
+        if key.strip().lower() in ("bitrate", "ice-bitrate") and val.strip().isdigit():
+            return int(val.strip())
+    return None
+
+
+# -- probing ------------------------------------------------------------------
+
+@dataclass
+class _Hop:
+    """The next URL to fetch, with what earlier playlists told us."""
+    url: str
+    hls: bool = False
+    codec: Optional[str] = None
+    bitrate: Optional[int] = None
+
+
+class StreamProber:
+    """Probes stream URLs with bounded concurrency and per-host rate limits."""
+
+    def __init__(
+        self,
+        concurrency: int = 20,
+        host_rate: float = 1.0,
+        host_burst: float = 2.0,
+        timeout: float = 8.0,
+        listener_concurrency: int = 20,
+        allow_private: bool = False,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.concurrency = concurrency
+        self.listener_concurrency = listener_concurrency
+        self.allow_private = allow_private
+        self.host_rate = host_rate
+        self.host_burst = host_burst
+        self.timeout = timeout
+        self.clock = clock
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._gate: Optional[asyncio.Semaphore] = None
+        # Listener probes never queue behind background ones
+        self._listener_gate: Optional[asyncio.Semaphore] = None
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.probes = 0
+        self.failures = 0
+        self.blocked = 0
+
+    @classmethod
+    def from_env(cls) -> "StreamProber":
+        return cls(
+            concurrency=int(os.environ.get("RADIO_PROBE_CONCURRENCY", 20)),
+            host_rate=float(os.environ.get("RADIO_PROBE_HOST_RATE", 1)),
+            host_burst=float(os.environ.get("RADIO_PROBE_HOST_BURST", 2)),
+            timeout=float(os.environ.get("RADIO_PROBE_TIMEOUT", 8)),
+            listener_concurrency=int(os.environ.get("RADIO_STREAM_RESOLVE_CONCURRENCY", 20)),
+        )
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.concurrency + self.listener_concurrency, max_keepalive_connections=0
+                ),
+                headers={"User-Agent": "GlobalRadio-StreamProber/1.0", "Icy-MetaData": "1"},
+                # Runs for every request, redirects included
+                event_hooks={"request": [self._check_address]},
+                transport=self._transport,
+            )
+            self._gate = asyncio.Semaphore(self.concurrency)
+            self._listener_gate = asyncio.Semaphore(self.listener_concurrency)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+
+    async def _check_address(self, request: httpx.Request):
+        """Refuse requests to hosts that resolve to non-public addresses."""
+        if self.allow_private:
+            return
+        host = request.url.host
+        try:
+            addresses = [str(ipaddress.ip_address(host))]
+        except ValueError:
+            try:
+                infos = await asyncio.get_running_loop().getaddrinfo(
+                    host, request.url.port or 80, type=socket.SOCK_STREAM
+                )
+            except socket.gaierror:
+                # Unresolvable: the connection attempt will fail on its own.
+                return
+            addresses = [info[4][0] for info in infos]
+        if not all(is_public_address(a) for a in addresses):
+            raise BlockedAddress(host)
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.host_rate, self.host_burst, self.clock)
+        return bucket
+
+    async def probe(self, url: str, throttle: bool = True) -> ProbeResult:
+        """Follow ``url`` to audio and report what was found.
+
+        Each hop (the URL, then any playlist entry it leads to) waits for its
+        host's token before taking a concurrency slot and starting its
+        timeout, so a busy host delays its probes rather than failing them.
+        ``throttle=False`` skips the per-host rate limit and uses a separate
+        concurrency gate, for probes made on behalf of a listener who is
+        about to connect anyway.
+        """
+        await self.start()
+        self.probes += 1
+        hop = _Hop(url)
+        for _ in range(MAX_PLAYLIST_DEPTH + 1):
+            if throttle:
+                await self._bucket(hop.url).acquire()
+            async with self._gate if throttle else self._listener_gate:
+                try:
+                    outcome = await asyncio.wait_for(self._hop(url, hop), self.timeout)
+                except (asyncio.TimeoutError, httpx.TimeoutException):
+                    outcome = ProbeResult(url, ok=False, final_url=hop.url, error="timeout")
+                except httpx.HTTPError as e:
+                    outcome = ProbeResult(url, ok=False, final_url=hop.url, error=type(e).__name__)
+                except BlockedAddress:
+                    self.blocked += 1
+                    outcome = ProbeResult(url, ok=False, final_url=hop.url, error="blocked address")
+            if isinstance(outcome, ProbeResult):
+                break
+            hop = outcome
+        else:
+            outcome = ProbeResult(url, ok=False, final_url=hop.url, error="playlist nesting too deep")
+        outcome.checked_at = time.time()
+        if not outcome.ok:
+            self.failures += 1
+        return outcome
+
+    async def _hop(self, url: str, hop: "_Hop"):
+        """Fetch ``hop.url``: a :class:`ProbeResult`, or the next hop when it
+        is a playlist."""
+        start = self.clock()
+        async with self._client.stream("GET", hop.url) as response:
+            if response.status_code >= 400:
+                return ProbeResult(url, ok=False, final_url=hop.url, status=response.status_code,
+                                   error=f"HTTP {response.status_code}")
+            content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+            chunks = response.aiter_bytes()
+            head = await anext(chunks, b"")
+            ttfb = (self.clock() - start) * 1000
+            final = str(response.url)
+            kind = playlist_kind(final, content_type, head)
+            if kind is None:
+                if not head:
+                    return ProbeResult(url, ok=False, final_url=final, status=response.status_code,
+                                       content_type=content_type, error="empty body")
+                return ProbeResult(
+                    url, ok=True, final_url=final, status=response.status_code, ttfb_ms=round(ttfb, 1),
+                    codec=hop.codec or CODECS.get(content_type),
+                    bitrate=hop.bitrate or icy_bitrate(response.headers),
+                    content_type=content_type, hls=hop.hls,
+                )
+            body = head
+            async for chunk in chunks:
+                body += chunk
+                if len(body) > MAX_PLAYLIST_BYTES:
+                    break
+        text = body.decode("utf-8", errors="replace")
+        hls, codec, bitrate = hop.hls, hop.codec, hop.bitrate
+        if kind == "pls":
+            entries = [urljoin(final, e) for e in parse_pls(text)]
+        else:
+            entries, is_hls, variant = parse_m3u(text, final)
+            if is_hls:
+                hls = True
+                if variant is not None:
+                    bitrate = bitrate or (variant[0] // 1000 or None)
+                    codec = codec or hls_codec(variant[1])
+                elif entries:
+                    # A media playlist: segments are listed, so it plays.
+                    return ProbeResult(url, ok=True, final_url=final, status=response.status_code,
+                                       ttfb_ms=round(ttfb, 1), codec=codec, bitrate=bitrate,
+                                       content_type=content_type, hls=True)
+        if not entries:
+            return ProbeResult(url, ok=False, final_url=final, status=response.status_code,
+                               content_type=content_type, error="empty playlist")
+        return _Hop(entries[0], hls, codec, bitrate)
+
+    async def probe_many(self, urls: Iterable[str]) -> List[ProbeResult]:
+        return await asyncio.gather(*(self.probe(url) for url in urls))
+
+    def status(self) -> dict:
+        return {"probes": self.probes, "failures": self.failures, "blocked": self.blocked, "hosts": len(self._buckets)}
@@ -0,0 +1,46 @@
+"""Backend-neutral description of a station listing query."""
+from dataclasses import dataclass
+from typing import Optional
+
+# Largest page a listing endpoint serves.
+MAX_LIMIT = 500
+
+
+@dataclass(frozen=True)
+class StationQuery:
+    """Filters shared by every station listing endpoint.
+
+    Results are always the non-broken stations ordered by clickcount,
+    descending, so the same query can be answered by radio-browser or by a
+    local catalog.
+    """
+
+    name: Optional[str] = None
+    country: Optional[str] = None
+    countrycode: Optional[str] = None
+    language: Optional[str] = None
+    tag: Optional[str] = None
+    limit: int = 50
+    offset: int = 0
+
+    def __post_init__(self):
+        # Internal callers build queries from arithmetic (offset + limit, ...);
+        # a negative value must never reach a slice or SQL ``LIMIT -1``.
+        object.__setattr__(self, "limit", max(0, self.limit))
+        object.__setattr__(self, "offset", max(0, self.offset))
+
+    def upstream_params(self) -> dict:
+        """Query parameters for radio-browser's ``stations/search``."""
+        params = {
+            "limit": self.limit,
+            "order": "clickcount",
+            "reverse": "true",
+            "hidebroken": "true"
+        }
+        if self.offset:
+            params["offset"] = self.offset
+        for field in ("name", "country", "countrycode", "language", "tag"):
+            value = getattr(self, field)
+            if value:
+                params[field] = value
+        return params
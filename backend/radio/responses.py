@@ -0,0 +1,144 @@
+"""Fast JSON responses.
+
+``ORJSONResponse`` serializes with orjson instead of the stdlib encoder.
+``RawJSON`` marks upstream bytes that are already the JSON we want to send:
+``envelope`` splices them into ``{"stations": ...}`` without decoding and
+re-encoding the list.
+
+``StationFormat`` carries the ``fields=`` projection and ``format=columnar``
+options of the station endpoints; ``stations_response`` applies them and only
+parses upstream bytes when the client asked for a different shape.
+
+``prepared_response`` serves a pre-serialized body with its ETag, answering
+``If-None-Match`` with an empty 304.
+"""
+import re
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+import orjson
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+
+from radio.compression import negotiate
+from radio.httpcache import NO_STORE, coded_etag, digest, etag_matches, http_date, make_etag
+
+FIELD_RE = re.compile(r"^[a-z0-9_]+$")
+MAX_FIELDS = 64
+FORMATS = ("json", "columnar")
+
+
+class ORJSONResponse(JSONResponse):
+    """``JSONResponse`` rendered with orjson (NaN/inf become ``null``)."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class RawJSON:
+    """An already-serialized JSON document.
+
+    Raw upstream pages are cached as ``RawJSON``, so the content digest
+    (computed here, once) lives exactly as long as the cache entry.
+    """
+
+    __slots__ = ("data", "digest")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.digest = digest(data)
+
+
+def is_json_document(data: bytes) -> bool:
+    """Cheap sanity check before passing bytes through unparsed."""
+    head = data.lstrip()[:1]
+    return head in (b"[", b"{")
+
+
+def envelope(key: str, value: Any, **extra: Any) -> Response:
+    """``{key: value, **extra}`` as a response, splicing ``RawJSON`` verbatim."""
+    if not isinstance(value, RawJSON):
+        return ORJSONResponse({key: value, **extra})
+    body = b"".join((
+        b'{', orjson.dumps(key), b':', value.data,
+        *(b',' + orjson.dumps(k) + b':' + orjson.dumps(v) for k, v in extra.items()),
+        b'}',
+    ))
+    # The upstream bytes are a shared cache entry that carries its digest.
+    parts = (value.digest, orjson.dumps(extra).decode()) if extra else (value.digest,)
+    return Response(body, media_type="application/json", headers={"ETag": make_etag(*parts)})
+
+
+@dataclass(frozen=True)
+class StationFormat:
+    """Requested shape of a station list response."""
+
+    fields: Optional[Tuple[str, ...]] = None
+    columnar: bool = False
+
+    @classmethod
+    def parse(cls, fields: Optional[str] = None, format: str = "json") -> "StationFormat":
+        """Validate the query parameters; raises ``ValueError`` on bad input."""
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+        projection = None
+        if fields:
+            projection = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+            bad = [f for f in projection if not FIELD_RE.match(f)]
+            if bad or not projection or len(projection) > MAX_FIELDS:
+                raise ValueError(f"invalid fields: {fields!r}")
+        return cls(projection, format == "columnar")
+
+    @property
+    def passthrough(self) -> bool:
+        return self.fields is None and not self.columnar
+
+    def project(self, station: dict) -> dict:
+        if self.fields is None:
+            return station
+        return {f: station.get(f) for f in self.fields}
+
+
+def columns(stations: List[dict], fields: Optional[Tuple[str, ...]] = None) -> dict:
+    """One array per field; the field list defaults to the first station's keys."""
+    if fields is None:
+        fields = tuple(stations[0]) if stations else ()
+    return {f: [s.get(f) for s in stations] for f in fields}
+
+
+def stations_response(stations: Any, fmt: StationFormat = StationFormat(), **extra: Any) -> Response:
+    """``{"stations": ..., **extra}`` shaped as ``fmt`` asks. Partial results
+    are ``no-store`` so no cache keeps serving them once upstream recovers."""
+    if fmt.passthrough:
+        response = envelope("stations", stations, **extra)
+    else:
+        if isinstance(stations, RawJSON):
+            stations = orjson.loads(stations.data)
+        if fmt.columnar:
+            response = ORJSONResponse({
+                "format": "columnar",
+                "count": len(stations),
+                "stations": columns(stations, fmt.fields),
+                **extra,
+            })
+        else:
+            response = ORJSONResponse({"stations": [fmt.project(s) for s in stations], **extra})
+    if extra.get("partial"):
+        response.headers["Cache-Control"] = NO_STORE.header
+    return response
+
+
+def prepared_response(headers: Headers, prepared: Any) -> Response:
+    """Serve a ``PreparedBody``: 304 on a matching ETag, gzip if accepted."""
+    gzipped = negotiate(headers.get("accept-encoding", ""), ("gzip",))
+    response_headers = {
+        "ETag": coded_etag(prepared.etag, "gzip") if gzipped else prepared.etag,
+        "Last-Modified": http_date(prepared.modified),
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(headers.get("if-none-match"), prepared.etag):
+        return Response(status_code=304, headers=response_headers)
+    if gzipped:
+        response_headers["Content-Encoding"] = "gzip"
+        return Response(prepared.gzipped, media_type="application/json", headers=response_headers)
+    return Response(prepared.body, media_type="application/json", headers=response_headers)
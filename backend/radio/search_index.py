@@ -0,0 +1,236 @@
+"""In-process inverted index over the station catalog.
+
+Station data lives in a :class:`ColumnarStations` store; only the rows a
+query returns are turned back into dicts.
+
+Stations are numbered in rank order (clickcount, then votes, descending), so
+every posting list sorted by doc id is also sorted by rank and the first
+``limit`` survivors of a filter intersection are the answer.
+
+Each field keeps a sorted vocabulary plus CSR-style postings (``offsets`` into
+one flat ``docs`` array). A prefix query is therefore a single contiguous
+slice of ``docs``, and filters are intersected with boolean masks in NumPy.
+Name tokens that match nothing exactly or by prefix fall back to trigram
+similarity, so small typos still find stations.
+"""
+import bisect
+import re
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from radio.columnar import ColumnarStations
+from radio.query import StationQuery
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Minimum Jaccard similarity of trigram sets for a fuzzy name match.
+FUZZY_THRESHOLD = 0.4
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall((text or "").lower())
+
+
+def trigrams(token: str) -> set:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Postings:
+    """Sorted vocabulary with CSR posting lists for one field."""
+
+    def __init__(self, terms_by_doc: Sequence[Iterable[str]]):
+        pairs = {}
+        for doc, terms in enumerate(terms_by_doc):
+            for term in set(terms):
+                pairs.setdefault(term, []).append(doc)
+        self.vocab = sorted(pairs)
+        lengths = np.fromiter((len(pairs[t]) for t in self.vocab), dtype=np.int64, count=len(self.vocab))
+        self.offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.offsets[1:])
+        self.docs = np.fromiter(
+            (doc for term in self.vocab for doc in pairs[term]),
+            dtype=np.uint32,
+            count=int(self.offsets[-1]),
+        )
+
+    @classmethod
+    def from_arrays(cls, vocab: Sequence[str], offsets: np.ndarray, docs: np.ndarray) -> "Postings":
+        """Postings over prebuilt arrays, e.g. views into an index snapshot."""
+        postings = cls.__new__(cls)
+        postings.vocab, postings.offsets, postings.docs = vocab, offsets, docs
+        return postings
+
+    def term_id(self, term: str) -> Optional[int]:
+        i = bisect.bisect_left(self.vocab, term)
+        return i if i < len(self.vocab) and self.vocab[i] == term else None
+
+    def postings(self, term_id: int) -> np.ndarray:
+        return self.docs[self.offsets[term_id]:self.offsets[term_id + 1]]
+
+    def exact(self, term: str) -> np.ndarray:
+        term_id = self.term_id(term)
+        return self.postings(term_id) if term_id is not None else self.docs[:0]
+
+    def prefix(self, prefix: str) -> np.ndarray:
+        """Docs of every term starting with ``prefix`` (one slice, may repeat docs)."""
+        lo = bisect.bisect_left(self.vocab, prefix)
+        hi = bisect.bisect_left(self.vocab, prefix + "\U0010ffff")
+        return self.docs[self.offsets[lo]:self.offsets[hi]]
+
+    def containing(self, needle: str) -> np.ndarray:
+        """Docs of every term containing ``needle``; meant for small vocabularies."""
+        ids = [i for i, term in enumerate(self.vocab) if needle in term]
+        if not ids:
+            return self.docs[:0]
+        return np.concatenate([self.postings(i) for i in ids])
+
+
+class TrigramIndex:
+    """Trigram -> term ids, for fuzzy lookups in a vocabulary."""
+
+    def __init__(self, vocab: Sequence[str]):
+        grams = [trigrams(term) for term in vocab]
+        self.gram_counts = np.fromiter((len(g) for g in grams), dtype=np.int32, count=len(grams))
+        self.grams = Postings(grams)
+
+    @classmethod
+    def from_arrays(cls, gram_counts: np.ndarray, grams: Postings) -> "TrigramIndex":
+        index = cls.__new__(cls)
+        index.gram_counts, index.grams = gram_counts, grams
+        return index
+
+    def similar(self, token: str, threshold: float = FUZZY_THRESHOLD) -> np.ndarray:
+        """Ids of vocabulary terms whose trigram Jaccard with ``token`` >= threshold."""
+        query = trigrams(token)
+        hits = [self.grams.exact(g) for g in query]
+        hits = [h for h in hits if len(h)]
+        if not hits:
+            return np.zeros(0, dtype=np.int64)
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.gram_counts))
+        candidates = np.flatnonzero(shared)
+        union = self.gram_counts[candidates] + len(query) - shared[candidates]
+        return candidates[shared[candidates] / union >= threshold]
+
+
+class SortedUuids:
+    """uuid -> doc lookup by binary search over docs sorted by uuid.
+
+    Unlike a dict it needs no per-entry objects, so it can live in a
+    memory-mapped snapshot and costs nothing to load.
+    """
+
+    def __init__(self, store: ColumnarStations, order: np.ndarray):
+        self.store = store
+        self.order = order
+
+    @classmethod
+    def build(cls, store: ColumnarStations) -> "SortedUuids":
+        uuids = store.column("stationuuid")
+        return cls(store, np.array(sorted(range(len(uuids)), key=uuids.__getitem__), dtype=np.uint32))
+
+    def _uuid(self, i: int) -> str:
+        return self.store.strings[self.store.columns["stationuuid"][self.order[i]]]
+
+    def get(self, station_uuid: str) -> Optional[int]:
+        lo, hi = 0, len(self.order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._uuid(mid) < station_uuid:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.order) and self._uuid(lo) == station_uuid:
+            return int(self.order[lo])
+        return None
+
+
+# Postings attributes of SearchIndex, in snapshot order.
+POSTING_FIELDS = ("names", "tags", "languages", "countries", "countrycodes")
+
+
+class SearchIndex:
+    """Inverted indexes on name tokens, tags, language and country."""
+
+    def __init__(self, stations: Sequence[dict], version: int = 0):
+        self.version = version
+        order = sorted(
+            range(len(stations)),
+            key=lambda i: (-int(stations[i].get("clickcount") or 0), -int(stations[i].get("votes") or 0)),
+        )
+        self.store = ColumnarStations.from_dicts(stations[i] for i in order)
+        self.size = len(self.store)
+        self.names = Postings(tokenize(name) for name in self.store.column("name"))
+        self.name_trigrams = TrigramIndex(self.names.vocab)
+        self.tags = Postings(_split(tags) for tags in self.store.column("tags"))
+        self.languages = Postings(_split(language) for language in self.store.column("language"))
+        self.countries = Postings([country.lower()] for country in self.store.column("country"))
+        self.countrycodes = Postings([code.upper()] for code in self.store.column("countrycode"))
+        self.ok = np.frombuffer(self.store.columns["lastcheckok"], dtype=np.int8).astype(bool)
+        self.by_uuid: Dict[str, int] = {u: i for i, u in enumerate(self.store.column("stationuuid"))}
+
+    @classmethod
+    def from_parts(
+        cls,
+        version: int,
+        store: ColumnarStations,
+        postings: Dict[str, Postings],
+        name_trigrams: TrigramIndex,
+        by_uuid: SortedUuids,
+    ) -> "SearchIndex":
+        """An index over prebuilt structures (see :mod:`radio.snapshot`)."""
+        index = cls.__new__(cls)
+        index.version = version
+        index.store = store
+        index.size = len(store)
+        for field in POSTING_FIELDS:
+            setattr(index, field, postings[field])
+        index.name_trigrams = name_trigrams
+        index.ok = np.asarray(store.columns["lastcheckok"], dtype=np.int8).astype(bool)
+        index.by_uuid = by_uuid
+        return index
+
+    def _name_token_docs(self, token: str) -> np.ndarray:
+        docs = self.names.prefix(token)
+        if len(docs):
+            return docs
+        similar = self.name_trigrams.similar(token)
+        if not len(similar):
+            return docs
+        return np.concatenate([self.names.postings(int(i)) for i in similar])
+
+    def _clauses(self, query: StationQuery) -> List[np.ndarray]:
+        clauses = []
+        for token in tokenize(query.name or ""):
+            clauses.append(self._name_token_docs(token))
+        if query.tag:
+            clauses.append(self.tags.exact(query.tag.strip().lower()))
+        if query.language:
+            clauses.append(self.languages.containing(query.language.strip().lower()))
+        if query.country:
+            clauses.append(self.countries.containing(query.country.strip().lower()))
+        if query.countrycode:
+            clauses.append(self.countrycodes.exact(query.countrycode.strip().upper()))
+        return clauses
+
+    def match(self, query: StationQuery) -> np.ndarray:
+        """Doc ids (ascending, i.e. best first) of non-broken stations matching ``query``."""
+        mask = self.ok.copy()
+        for docs in self._clauses(query):
+            clause = np.zeros(self.size, dtype=bool)
+            clause[docs] = True
+            mask &= clause
+        return np.flatnonzero(mask)
+
+    def search(self, query: StationQuery) -> List[dict]:
+        docs = self.match(query)[query.offset:query.offset + query.limit]
+        return self.store.rows(docs)
+
+    def get(self, station_uuid: str) -> Optional[dict]:
+        doc = self.by_uuid.get(station_uuid)
+        return self.store.row(doc) if doc is not None else None
+
+
+def _split(value: str) -> List[str]:
+    return [t.strip().lower() for t in (value or "").split(",") if t.strip()]
@@ -0,0 +1,199 @@
+"""Content-based "similar stations".
+
+Each station is a sparse TF-IDF vector over its tags, languages, country and
+codec. The terms are prefixed by field (``tag:jazz``, ``cc:DE``), and each
+field is weighted so that a shared tag counts for more than a shared codec.
+Vectors are L2-normalized, so a dot product is the cosine similarity.
+
+The index keeps the vectors twice: by station (CSR) to read a query vector,
+and by term (CSC) to score it. Scoring a station gathers the posting slices
+of its few terms and accumulates them with one ``np.bincount`` over the whole
+catalog. The top k come from ``np.partition``. Ties are broken by doc id,
+which is popularity order when the index is built from the search index.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from radio.search_index import SearchIndex, _split
+
+logger = logging.getLogger(__name__)
+
+FIELD_WEIGHTS = {"tag": 1.0, "lang": 0.6, "cc": 0.5, "codec": 0.2}
+
+
+def station_terms(tags: str, language: str, countrycode: str, codec: str) -> List[str]:
+    terms = [f"tag:{t}" for t in _split(tags)]
+    terms += [f"lang:{l}" for l in _split(language)]
+    if countrycode:
+        terms.append(f"cc:{countrycode.upper()}")
+    if codec:
+        terms.append(f"codec:{codec.upper()}")
+    return list(dict.fromkeys(terms))
+
+
+class SimilarityIndex:
+    """Normalized TF-IDF vectors of a fixed list of stations. Stations outside
+    the optional ``ok`` mask are never returned as similar."""
+
+    def __init__(self, docs_terms: Sequence[Iterable[str]], version: int = 0,
+                 ok: Optional[np.ndarray] = None, weights: Dict[str, float] = FIELD_WEIGHTS):
+        self.version = version
+        self.size = len(docs_terms)
+        self.ok = ok
+        vocab: Dict[str, int] = {}
+        doc_ids: List[int] = []
+        term_ids: List[int] = []
+        for doc, terms in enumerate(docs_terms):
+            for term in terms:
+                doc_ids.append(doc)
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+        self.vocab = vocab
+        docs = np.array(doc_ids, dtype=np.int64)
+        terms = np.array(term_ids, dtype=np.int64)
+        field_weight = np.array(
+            [weights.get(term.split(":", 1)[0], 1.0) for term in vocab], dtype=np.float64
+        )
+        df = np.bincount(terms, minlength=len(vocab))
+        idf = np.log((1 + self.size) / (1 + df)) + 1.0
+        values = field_weight[terms] * idf[terms]
+        norms = np.sqrt(np.bincount(docs, weights=values * values, minlength=self.size))
+        values /= np.where(norms > 0, norms, 1.0)[docs]
+
+        # By station: entries are already grouped by doc.
+        self.indptr = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(docs, minlength=self.size), out=self.indptr[1:])
+        self.indices = terms
+        self.values = values
+        # By term.
+        order = np.argsort(terms, kind="stable")
+        self.term_indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=self.term_indptr[1:])
+        self.term_docs = docs[order]
+        self.term_values = values[order]
+
+    @classmethod
+    def from_stations(cls, stations: Sequence[dict], version: int = 0) -> "SimilarityIndex":
+        return cls([
+            station_terms(s.get("tags") or "", s.get("language") or "", s.get("countrycode") or "", s.get("codec") or "")
+            for s in stations
+        ], version)
+
+    @classmethod
+    def from_search_index(cls, index: SearchIndex) -> "SimilarityIndex":
+        """Doc ids shared with ``index``, so results map straight to its rows."""
+        store = index.store
+        columns = [store.column(f) for f in ("tags", "language", "countrycode", "codec")]
+        return cls([station_terms(*values) for values in zip(*columns)], index.version, index.ok)
+
+    def scores(self, doc: int) -> np.ndarray:
+        """Cosine similarity of ``doc`` with every station."""
+        start, end = self.indptr[doc], self.indptr[doc + 1]
+        slices_docs, slices_values = [], []
+        for term, weight in zip(self.indices[start:end].tolist(), self.values[start:end].tolist()):
+            lo, hi = self.term_indptr[term], self.term_indptr[term + 1]
+            slices_docs.append(self.term_docs[lo:hi])
+            slices_values.append(self.term_values[lo:hi] * weight)
+        if not slices_docs:
+            return np.zeros(self.size)
+        return np.bincount(np.concatenate(slices_docs), weights=np.concatenate(slices_values), minlength=self.size)
+
+    def top_k(self, doc: int, k: int) -> List[Tuple[int, float]]:
+        """``(doc, score)`` of the ``k`` most similar stations, best first."""
+        scores = self.scores(doc)
+        scores[doc] = 0.0
+        if self.ok is not None:
+            scores[~self.ok] = 0.0
+        positive = int(np.count_nonzero(scores > 0))
+        if positive == 0 or k <= 0:
+            return []
+        if positive > k:
+            kth = np.partition(scores, self.size - k)[self.size - k]
+            candidates = np.flatnonzero(scores >= kth)
+        else:
+            candidates = np.flatnonzero(scores > 0)
+        order = np.lexsort((candidates, -scores[candidates]))[:k]
+        return [(int(d), float(s)) for d, s in zip(candidates[order], scores[candidates[order]])]
+
+
+class SimilarStations:
+    """The similarity index for the current search index, plus a per-station
+    result cache that is dropped on every rebuild."""
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self.maxsize = maxsize if maxsize is not None else int(os.environ.get("RADIO_SIMILAR_CACHE", 4096))
+        self.index: Optional[SimilarityIndex] = None
+        self._cache: "OrderedDict[tuple, list]" = OrderedDict()
+        self.rebuilds = 0
+        self.build_seconds = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key: tuple, compute: Callable[[], list]) -> list:
+        value = self._cache.get(key)
+        if value is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return value
+        self.misses += 1
+        value = self._cache[key] = compute()
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return value
+
+    async def rebuild(self, search_index: SearchIndex):
+        start = time.perf_counter()
+        self.index = await asyncio.to_thread(SimilarityIndex.from_search_index, search_index)
+        self.build_seconds = round(time.perf_counter() - start, 3)
+        self.rebuilds += 1
+        # Cached results are doc ids of the previous index.
+        self._cache.clear()
+
+    async def run(self, current: Callable[[], Optional[SearchIndex]], interval: float):
+        """Rebuild whenever the search index has been replaced."""
+        while True:
+            search_index = current()
+            if search_index is not None and (self.index is None or self.index.version != search_index.version):
+                try:
+                    await self.rebuild(search_index)
+                except Exception as e:
+                    logger.warning("Rebuilding the similarity index failed: %s", e)
+            await asyncio.sleep(interval)
+
+    def similar(self, search_index: SearchIndex, doc: int, k: int) -> Optional[List[dict]]:
+        """Top ``k`` stations like ``doc`` of ``search_index``, with scores, or
+        ``None`` until the similarity index has caught up with it."""
+        index = self.index
+        if index is None or index.version != search_index.version:
+            return None
+        top = self._cached((index.version, doc, k), lambda: index.top_k(doc, k))
+        rows = search_index.store.rows(d for d, _ in top)
+        for row, (_, score) in zip(rows, top):
+            row["similarity"] = round(score, 4)
+        return rows
+
+    def status(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "version": self.index.version if self.index is not None else None,
+            "stations": self.index.size if self.index is not None else 0,
+            "terms": len(self.index.vocab) if self.index is not None else 0,
+            "rebuilds": self.rebuilds,
+            "build_seconds": self.build_seconds,
+            "cache_entries": len(self._cache),
+            "cache_hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+def rank_pool(station: dict, pool: Sequence[dict], k: int) -> List[dict]:
+    """Top ``k`` of an ad-hoc candidate ``pool`` like ``station`` (used when
+    there is no local catalog to index)."""
+    unique = {s["stationuuid"]: s for s in pool if s.get("stationuuid") != station["stationuuid"]}
+    stations = [station, *sorted(unique.values(), key=lambda s: -(s.get("clickcount") or 0))]
+    index = SimilarityIndex.from_stations(stations)
+    return [dict(stations[d], similarity=round(score, 4)) for d, score in index.top_k(0, k)]
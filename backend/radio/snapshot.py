@@ -0,0 +1,212 @@
+"""Versioned binary snapshot of the station catalog and search index.
+
+Building a :class:`SearchIndex` means reading every station from SQLite and
+tokenizing it again, in every worker and on every restart. Instead the writer
+worker serializes the built index once: every column, string table and
+posting list is a flat array, so the file is a header plus raw array bytes.
+Workers ``mmap`` it read-only and wrap the arrays as NumPy views. Loading
+costs almost nothing, and all workers on a host share the same page-cache
+pages instead of each holding a private copy.
+
+Files are written to a temporary name and renamed over the old one, so a
+reader sees either the old or the new snapshot, never a partial one.
+Readers poll for a new inode and swap indexes without a restart. A mapping
+that is still in use keeps the replaced file's data alive until it is
+dropped.
+
+Layout (little-endian)::
+
+    header   MAGIC, format, version, created_at, section count
+    table    per section: name, dtype, offset, nbytes
+    data     sections, each aligned to ALIGNMENT bytes
+"""
+import mmap
+import os
+import struct
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from radio.columnar import FIELDS, ColumnarStations, StringTable
+from radio.search_index import POSTING_FIELDS, Postings, SearchIndex, SortedUuids, TrigramIndex
+
+MAGIC = b"RADIOIDX"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+_HEADER = struct.Struct("<8sIQdI")
+_ENTRY = struct.Struct("<48s8sQQ")
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def _array(values) -> np.ndarray:
+    if isinstance(values, np.ndarray):
+        return values
+    if isinstance(values, (bytes, bytearray, memoryview)):
+        return np.frombuffer(values, dtype=np.uint8)
+    return np.frombuffer(values, dtype=np.dtype(values.typecode))
+
+
+def _string_sections(name: str, strings: Sequence[str]) -> Dict[str, np.ndarray]:
+    if isinstance(strings, StringTable):
+        return {f"{name}/blob": _array(strings.blob), f"{name}/offsets": _array(strings.offsets)}
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return {f"{name}/blob": np.frombuffer(b"".join(encoded), dtype=np.uint8), f"{name}/offsets": offsets}
+
+
+def _postings_sections(name: str, postings: Postings) -> Dict[str, np.ndarray]:
+    return {
+        **_string_sections(f"{name}/vocab", postings.vocab),
+        f"{name}/offsets": _array(postings.offsets),
+        f"{name}/docs": _array(postings.docs),
+    }
+
+
+def sections(index: SearchIndex) -> Dict[str, np.ndarray]:
+    """Every array of ``index``, by section name."""
+    out = {f"column/{field}": _array(index.store.columns[field]) for field in FIELDS}
+    out.update(_string_sections("strings", index.store.strings))
+    for field in POSTING_FIELDS:
+        out.update(_postings_sections(field, getattr(index, field)))
+    out["name_trigrams/gram_counts"] = _array(index.name_trigrams.gram_counts)
+    out.update(_postings_sections("name_trigrams/grams", index.name_trigrams.grams))
+    by_uuid = index.by_uuid if isinstance(index.by_uuid, SortedUuids) else SortedUuids.build(index.store)
+    out["uuid_order"] = by_uuid.order
+    return out
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_snapshot(index: SearchIndex, path: str, version: int) -> int:
+    """Atomically write ``index`` as snapshot ``version``; returns its size."""
+    arrays = sections(index)
+    offset = _align(_HEADER.size + _ENTRY.size * len(arrays))
+    table: List[Tuple[str, np.ndarray, int]] = []
+    for name, array in arrays.items():
+        table.append((name, array, offset))
+        offset = _align(offset + array.nbytes)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, version, time.time(), len(table)))
+            for name, array, start in table:
+                f.write(_ENTRY.pack(name.encode(), array.dtype.str.encode(), start, array.nbytes))
+            for name, array, start in table:
+                f.seek(start)
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(offset)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    return offset
+
+
+def read_header(path: str) -> Tuple[int, float]:
+    """``(version, created_at)`` of the snapshot at ``path``."""
+    with open(path, "rb") as f:
+        magic, fmt, version, created_at, _ = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != MAGIC or fmt != FORMAT_VERSION:
+        raise SnapshotError(f"{path} is not a format {FORMAT_VERSION} index snapshot")
+    return version, created_at
+
+
+def _map(path: str) -> Tuple[mmap.mmap, os.stat_result]:
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), os.fstat(f.fileno())
+
+
+def load_snapshot(path: str) -> Tuple[SearchIndex, os.stat_result]:
+    """Map the snapshot at ``path``; nothing is copied but the ``ok`` mask."""
+    mapped, stat = _map(path)
+    magic, fmt, version, _, count = _HEADER.unpack_from(mapped, 0)
+    if magic != MAGIC or fmt != FORMAT_VERSION:
+        raise SnapshotError(f"{path} is not a format {FORMAT_VERSION} index snapshot")
+    view = memoryview(mapped)
+    arrays: Dict[str, np.ndarray] = {}
+    blobs: Dict[str, memoryview] = {}
+    for i in range(count):
+        name, dtype, start, nbytes = _ENTRY.unpack_from(mapped, _HEADER.size + i * _ENTRY.size)
+        name = name.rstrip(b"\0").decode()
+        if start + nbytes > len(mapped):
+            raise SnapshotError(f"{path} is truncated")
+        if name.endswith("/blob"):
+            blobs[name] = view[start:start + nbytes]
+            continue
+        dtype = np.dtype(dtype.rstrip(b"\0").decode())
+        arrays[name] = np.frombuffer(mapped, dtype=dtype, count=nbytes // dtype.itemsize, offset=start)
+
+    def strings(name: str) -> StringTable:
+        return StringTable(blobs[f"{name}/blob"], arrays[f"{name}/offsets"])
+
+    def postings(name: str) -> Postings:
+        return Postings.from_arrays(strings(f"{name}/vocab"), arrays[f"{name}/offsets"], arrays[f"{name}/docs"])
+
+    store = ColumnarStations({field: arrays[f"column/{field}"] for field in FIELDS}, strings("strings"))
+    index = SearchIndex.from_parts(
+        version,
+        store,
+        {field: postings(field) for field in POSTING_FIELDS},
+        TrigramIndex.from_arrays(arrays["name_trigrams/gram_counts"], postings("name_trigrams/grams")),
+        SortedUuids(store, arrays["uuid_order"]),
+    )
+    return index, stat
+
+
+class SnapshotStore:
+    """The snapshot file shared by the workers on one host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._loaded: Optional[Tuple[int, int]] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["SnapshotStore"]:
+        """Store at ``RADIO_SNAPSHOT_PATH``, or ``None`` if snapshots are off."""
+        path = os.environ.get("RADIO_SNAPSHOT_PATH")
+        return cls(path) if path else None
+
+    def version(self) -> int:
+        try:
+            return read_header(self.path)[0]
+        except (FileNotFoundError, SnapshotError, struct.error):
+            return 0
+
+    def _identity(self, stat: os.stat_result) -> Tuple[int, int]:
+        return stat.st_ino, stat.st_mtime_ns
+
+    def changed(self) -> bool:
+        """Whether the file differs from the one last loaded here."""
+        try:
+            return self._identity(os.stat(self.path)) != self._loaded
+        except FileNotFoundError:
+            return False
+
+    def load(self) -> SearchIndex:
+        index, stat = load_snapshot(self.path)
+        self._loaded = self._identity(stat)
+        return index
+
+    def rebuild(self, stations: Sequence[dict]) -> SearchIndex:
+        """Index ``stations`` as the next version, publish it and map it."""
+        index = SearchIndex(stations, self.version() + 1)
+        write_snapshot(index, self.path, index.version)
+        return self.load()
+
+    def status(self) -> dict:
+        try:
+            version, created_at = read_header(self.path)
+            size = os.path.getsize(self.path)
+        except (FileNotFoundError, SnapshotError, struct.error):
+            return {"enabled": True, "path": self.path, "version": None}
+        return {"enabled": True, "path": self.path, "version": version, "created_at": created_at, "bytes": size}
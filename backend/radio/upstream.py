@@ -0,0 +1,127 @@
+"""Shared, connection-pooled HTTP client for the radio-browser API.
+
+A single ``httpx.AsyncClient`` is created when the app starts and reused for
+every upstream call, so TCP/TLS handshakes happen once per mirror instead of
+once per request.
+"""
+import asyncio
+import os
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import h2  # noqa: F401  (enables httpx's HTTP/2 support)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.environ.get(name, str(default)).lower() in ("1", "true", "yes", "on")
+
+
+class UpstreamClient:
+    """Long-lived pooled client with HTTP/2, keep-alive and per-host caps.
+
+    Every setting can be overridden through ``RADIO_*`` environment variables
+    so pool sizing can be tuned per deployment without code changes.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        per_host_connections: Optional[int] = None,
+        timeout: Optional[float] = None,
+        http2: Optional[bool] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.max_connections = max_connections or _env_int("RADIO_POOL_MAX_CONNECTIONS", 100)
+        self.max_keepalive_connections = max_keepalive_connections or _env_int(
+            "RADIO_POOL_MAX_KEEPALIVE", 20
+        )
+        self.keepalive_expiry = keepalive_expiry or _env_float("RADIO_POOL_KEEPALIVE_EXPIRY", 30.0)
+        self.per_host_connections = per_host_connections or _env_int("RADIO_POOL_PER_HOST", 10)
+        self.timeout = timeout or _env_float("RADIO_UPSTREAM_TIMEOUT", 10.0)
+        if http2 is None:
+            http2 = _env_bool("RADIO_HTTP2", True)
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self.inflight: Dict[str, int] = {}
+
+    @property
+    def started(self) -> bool:
+        return self._client is not None and not self._client.is_closed
+
+    async def start(self):
+        """Create the pooled client (idempotent)."""
+        if self.started:
+            return
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        self._client = httpx.AsyncClient(
+            http2=self.http2,
+            limits=limits,
+            timeout=self.timeout,
+            transport=self._transport,
+        )
+
+    async def aclose(self):
+        """Close pooled connections; safe to call more than once."""
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._host_slots.clear()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if not self.started:
+            raise RuntimeError("UpstreamClient.start() has not been awaited")
+        return self._client
+
+    def _slot(self, host: str) -> asyncio.Semaphore:
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.per_host_connections)
+        return slot
+
+    async def get(self, url: str, params: Optional[dict] = None) -> httpx.Response:
+        """GET ``url`` through the shared pool, honouring the per-host cap."""
+        if not self.started:
+            # Used outside the app lifespan (scripts, ad-hoc calls).
+            await self.start()
+        host = urlsplit(url).netloc
+        async with self._slot(host):
+            self.inflight[host] = self.inflight.get(host, 0) + 1
+            try:
+                return await self.client.get(url, params=params)
+            finally:
+                self.inflight[host] -= 1
+
+    def pool_stats(self) -> dict:
+        """Connection pool occupancy, for metrics."""
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        return {
+            "max_connections": self.max_connections,
+            "per_host_connections": self.per_host_connections,
+            "open_connections": len(connections),
+            "idle_connections": sum(1 for c in connections if c.is_idle()),
+            "inflight": dict(self.inflight),
+        }
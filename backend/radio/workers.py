@@ -0,0 +1,161 @@
+"""Support for running the API as several worker processes.
+
+Under gunicorn every worker runs the app lifespan. :class:`WriterLock` picks
+one of them to run the background writers (catalog sync, stream probing);
+the rest follow what it writes. :class:`Warmup` fills the caches behind the
+hottest endpoints and reports readiness once all of them have loaded, so a
+load balancer (or ``entrypoint.sh``) only sends traffic to warm workers.
+
+A readiness probe reaches whichever worker accepts the connection, so with
+``RADIO_READY_DIR`` every warm worker drops a ``<pid>`` file there and
+``/api/ready`` only passes once ``RADIO_READY_WORKERS`` live workers have.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class WriterLock:
+    """Non-blocking exclusive lock on a file, held for the process lifetime.
+
+    The OS drops the lock when its holder dies, so another worker takes over
+    on its next :meth:`acquire`. Without a path every process is the writer
+    (the single-process default).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._file = None
+
+    @classmethod
+    def from_env(cls) -> "WriterLock":
+        return cls(os.environ.get("RADIO_WRITER_LOCK"))
+
+    @property
+    def held(self) -> bool:
+        return self.path is None or fcntl is None or self._file is not None
+
+    def acquire(self) -> bool:
+        if self.held:
+            return True
+        handle = open(self.path, "a+")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        handle.seek(0)
+        handle.truncate()
+        handle.write(str(os.getpid()))
+        handle.flush()
+        self._file = handle
+        return True
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+class Warmup:
+    """Runs named loaders until each has succeeded once."""
+
+    def __init__(
+        self,
+        loaders: Dict[str, Callable[[], Awaitable[object]]],
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 30.0,
+        ready_dir: Optional[str] = None,
+        workers: int = 1,
+    ):
+        self.loaders = loaders
+        self.ready_dir = ready_dir
+        self.workers = workers
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.started_at = time.time()
+        self.completed: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+
+    @classmethod
+    def from_env(cls, loaders: Dict[str, Callable[[], Awaitable[object]]]) -> "Warmup":
+        return cls(
+            loaders,
+            ready_dir=os.environ.get("RADIO_READY_DIR"),
+            workers=int(os.environ.get("RADIO_READY_WORKERS", 1)),
+        )
+
+    @property
+    def ready(self) -> bool:
+        """This worker's loaders have all succeeded."""
+        return len(self.completed) == len(self.loaders)
+
+    def workers_ready(self) -> int:
+        """Live workers that have marked themselves ready in ``ready_dir``."""
+        if self.ready_dir is None:
+            return int(self.ready)
+        count = 0
+        for name in os.listdir(self.ready_dir):
+            if not name.isdigit():
+                continue
+            try:
+                os.kill(int(name), 0)
+            except ProcessLookupError:
+                # A recycled or crashed worker's leftover mark.
+                continue
+            except PermissionError:
+                pass
+            count += 1
+        return count
+
+    @property
+    def all_ready(self) -> bool:
+        return self.ready and self.workers_ready() >= self.workers
+
+    def _mark_ready(self):
+        if self.ready_dir is not None:
+            open(os.path.join(self.ready_dir, str(os.getpid())), "w").close()
+
+    async def _load(self, name: str):
+        delay = self.retry_delay
+        while True:
+            try:
+                await self.loaders[name]()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors[name] = str(e) or type(e).__name__
+                logger.warning("Warm-up of %s failed, retrying in %.0fs: %s", name, delay, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+                continue
+            self.completed[name] = round(time.time() - self.started_at, 3)
+            self.errors.pop(name, None)
+            return
+
+    async def run(self):
+        await asyncio.gather(*(self._load(name) for name in self.loaders))
+        self._mark_ready()
+        logger.info("Warm-up complete in %.2fs", time.time() - self.started_at)
+
+    def status(self) -> dict:
+        return {
+            "ready": self.all_ready,
+            "worker_ready": self.ready,
+            "workers_ready": self.workers_ready(),
+            "workers": self.workers,
+            "pid": os.getpid(),
+            "completed": self.completed,
+            "pending": [name for name in self.loaders if name not in self.completed],
+            "errors": self.errors,
+        }
@@ -1,14 +1,319 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from pydantic import BaseModel
 import requests
 import random
 import os
-from typing import List, Dict, Any, Optional
+import sys
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import replace
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
 import asyncio
 import httpx
-from pydantic import BaseModel
+import orjson
+import logging
+import time
+import uuid
+
+ROOT_DIR = Path(__file__).parent
+# Support both `uvicorn server:app` (from backend/) and `backend.server:app`.
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from radio.admission import Admission, AdmissionMiddleware, ClientIdentity, UpstreamBudgetExhausted, retry_after_header
+from radio.aggregates import AggregateStore
+from radio.cache import TieredCache, cache_key
+from radio.catalog import StationCatalog
+from radio.clicks import ClickReporter
+from radio.compression import CompressionMiddleware
+from radio.fanout import fan_out, joined_chunks, top_stations
+from radio.geo import GeoIndex, NearbyQuery
+from radio.health import HEALTH_MODES, StreamHealthStore
+from radio.httpcache import HTTPCacheMiddleware
+from radio import metrics
+from radio.mirrors import MirrorPool, MirrorsUnavailable
+from radio.pagination import MAX_OFFSET, Cursor, count_stations, fingerprint
+from radio.prewarm import Prewarmer
+from radio.prober import StreamProber, needs_resolving
+from radio.query import MAX_LIMIT, StationQuery
+from radio.responses import ORJSONResponse, RawJSON, StationFormat, is_json_document, prepared_response, stations_response
+from radio.search_index import SearchIndex
+from radio.similar import SimilarStations, rank_pool
+from radio.snapshot import SnapshotStore
+from radio.upstream import UpstreamClient
+from radio.workers import Warmup, WriterLock
+
+logger = logging.getLogger(__name__)
+
+# Shared connection pool for all radio-browser calls
+upstream = UpstreamClient()
+# Radio-browser mirrors with health tracking, circuit breakers and hedging
+mirrors = MirrorPool.from_env()
+# Response cache keyed on upstream endpoint + params (LRU, optional Redis)
+cache = TieredCache.from_env()
+# Keeps the most requested upstream-backed keys fresh ahead of expiry
+prewarmer = Prewarmer.from_env(cache)
+# Per-client request rates, adaptive concurrency limit and the global budget
+# for upstream calls (shared through the cache's Redis with
+# RADIO_RATE_LIMIT_SHARED)
+admission = Admission.from_env(cache.redis)
+# Configured API keys and the proxies whose X-Forwarded-For we believe
+client_identity = ClientIdentity.from_env()
+# Local SQLite mirror of the station catalog (enabled by RADIO_CATALOG_DB)
+catalog = StationCatalog.from_env()
+# In-memory inverted index, rebuilt from the catalog after every sync
+search_index: Optional[SearchIndex] = None
+# Recent index snapshots by catalog version, so cursors issued before a
+# rebuild keep paging through the data they started on
+index_snapshots: "OrderedDict[int, SearchIndex]" = OrderedDict()
+INDEX_SNAPSHOTS = int(os.environ.get("RADIO_INDEX_SNAPSHOTS", 2))
+# Versioned binary index snapshot shared by all workers through mmap
+# (enabled by RADIO_SNAPSHOT_PATH; needs the catalog to build it)
+snapshots = SnapshotStore.from_env()
+SNAPSHOT_POLL_INTERVAL = float(os.environ.get("RADIO_SNAPSHOT_POLL_INTERVAL", 5))
+# TF-IDF similarity over the search index, rebuilt after each index swap
+similar = SimilarStations()
+SIMILAR_REBUILD_INTERVAL = float(os.environ.get("RADIO_SIMILAR_REBUILD_INTERVAL", 30))
+SIMILAR_TTL = float(os.environ.get("RADIO_SIMILAR_TTL", 3600))
+# Batch lookups: most uuids per request, and the longest (URL-encoded)
+# uuids= value sent in one upstream byuuid call
+BATCH_MAX = int(os.environ.get("RADIO_BATCH_MAX", 200))
+BATCH_URL_BUDGET = int(os.environ.get("RADIO_BATCH_URL_BUDGET", 1800))
+# Grid index of station coordinates, built on first use per search index
+geo_index: Optional[GeoIndex] = None
+# Without the catalog, nearby queries rank this many upstream stations found
+# within the radius (or NEARBY_POOL_RADIUS_KM for k-nearest queries)
+NEARBY_POOL = int(os.environ.get("RADIO_NEARBY_POOL", 500))
+NEARBY_POOL_RADIUS_KM = float(os.environ.get("RADIO_NEARBY_POOL_RADIUS_KM", 500))
+
+async def report_click(station_uuid: str):
+    return await fetch_radio_browser(f"url/{station_uuid}")
+
+async def fetch_aggregate(name: str):
+    return await fetch_radio_browser(name)
+
+# Countries/languages/tags, pre-sorted and pre-serialized in the background
+aggregates = AggregateStore(fetch_aggregate)
+# Queued, deduplicated click reporting to radio-browser
+clicks = ClickReporter.from_env(report_click)
+# Reachability/TTFB/codec of station streams, as measured by our own prober
+health_store = StreamHealthStore.from_env()
+prober = StreamProber.from_env()
+PROBE_TOP_N = int(os.environ.get("RADIO_PROBE_TOP_N", 0))
+PROBE_INTERVAL = float(os.environ.get("RADIO_PROBE_INTERVAL", 900))
+STREAM_TTL = float(os.environ.get("RADIO_STREAM_TTL", 300))
+# With several workers, only the lock holder syncs the catalog and probes
+writer_lock = WriterLock.from_env()
+WRITER_LOCK_RETRY = float(os.environ.get("RADIO_WRITER_LOCK_RETRY", 30))
+
+# Component state is read at scrape time, so swapped globals are picked up
+metrics.registry.register(metrics.StateCollector(
+    lambda: {"mirrors": mirrors, "cache": cache, "upstream": upstream, "clicks": clicks, "prewarm": prewarmer,
+             "admission": admission}
+))
+
+def install_search_index(index: SearchIndex):
+    global search_index
+    search_index = index
+    index_snapshots[index.version] = index
+    while len(index_snapshots) > INDEX_SNAPSHOTS:
+        index_snapshots.popitem(last=False)
+
+async def rebuild_search_index():
+    if snapshots is not None and not writer_lock.held:
+        # Followers map the snapshot the writer publishes instead
+        return
+    stations = await asyncio.to_thread(catalog.all_stations)
+    if snapshots is None:
+        index = await asyncio.to_thread(SearchIndex, stations, catalog.version)
+    else:
+        index = await asyncio.to_thread(snapshots.rebuild, stations)
+    install_search_index(index)
+
+async def watch_snapshots():
+    """Hot-swap to each new index snapshot (the first one at startup)"""
+    while True:
+        try:
+            if snapshots.changed():
+                install_search_index(await asyncio.to_thread(snapshots.load))
+                logger.info("Loaded index snapshot version %d", search_index.version)
+        except Exception as e:
+            logger.warning("Loading index snapshot failed: %s", e)
+        await asyncio.sleep(SNAPSHOT_POLL_INTERVAL)
+
+# Map common genres to tags
+GENRE_TAGS = {
+    "rock": "rock",
+    "pop": "pop",
+    "jazz": "jazz",
+    "classical": "classical",
+    "country": "country",
+    "hip-hop": "hip hop,hiphop,rap",
+    "electronic": "electronic,dance,techno,house",
+    "blues": "blues",
+    "reggae": "reggae",
+    "folk": "folk",
+    "metal": "metal",
+    "punk": "punk",
+    "alternative": "alternative",
+    "indie": "indie",
+    "soul": "soul,r&b",
+    "funk": "funk",
+    "latin": "latin,salsa,merengue",
+    "world": "world music,ethnic",
+    "ambient": "ambient,chillout",
+    "news": "news,talk",
+    "sports": "sports",
+    "christian": "christian,gospel,religious"
+}
+
+# Curated genres shown in the apps
+GENRES = [
+    {"name": "Rock", "slug": "rock", "icon": "🎸"},
+    {"name": "Pop", "slug": "pop", "icon": "🎵"},
+    {"name": "Jazz", "slug": "jazz", "icon": "🎺"},
+    {"name": "Classical", "slug": "classical", "icon": "🎼"},
+    {"name": "Country", "slug": "country", "icon": "🤠"},
+    {"name": "Hip-Hop", "slug": "hip-hop", "icon": "🎤"},
+    {"name": "Electronic", "slug": "electronic", "icon": "🎧"},
+    {"name": "Blues", "slug": "blues", "icon": "🎷"},
+    {"name": "Reggae", "slug": "reggae", "icon": "🌴"},
+    {"name": "Folk", "slug": "folk", "icon": "🪕"},
+    {"name": "Metal", "slug": "metal", "icon": "⚡"},
+    {"name": "Punk", "slug": "punk", "icon": "🤘"},
+    {"name": "Alternative", "slug": "alternative", "icon": "🎭"},
+    {"name": "Indie", "slug": "indie", "icon": "🎨"},
+    {"name": "Soul/R&B", "slug": "soul", "icon": "💫"},
+    {"name": "Latin", "slug": "latin", "icon": "💃"},
+    {"name": "World", "slug": "world", "icon": "🌍"},
+    {"name": "Ambient", "slug": "ambient", "icon": "🌙"},
+    {"name": "Christian", "slug": "christian", "icon": "✝️"},
+    {"name": "News/Talk", "slug": "news", "icon": "📰"},
+    {"name": "Sports", "slug": "sports", "icon": "⚽"}
+]
+
+def genre_tags(genre: str) -> List[str]:
+    """Tags a genre slug searches for (an unknown slug is taken as tags)"""
+    return [t.strip() for t in GENRE_TAGS.get(genre.lower(), genre).split(",") if t.strip()]
+
+async def probe_streams(stations: List[dict]):
+    """Probe the streams of ``stations`` not checked recently"""
+    due = [s for s in stations if s.get("stationuuid") and not health_store.is_fresh(s["stationuuid"])]
+    urls = [s.get("url_resolved") or s.get("url") for s in due]
+    results = await prober.probe_many(urls)
+    await health_store.record(zip((s["stationuuid"] for s in due), results))
+    return results
+
+async def run_stream_probes():
+    """Keep the health of the ``PROBE_TOP_N`` most popular streams current"""
+    while True:
+        try:
+            await probe_streams(await find_stations(StationQuery(limit=PROBE_TOP_N)))
+        except Exception as e:
+            logger.warning("Stream probing failed: %s", e)
+        await asyncio.sleep(PROBE_INTERVAL)
+
+async def run_writers():
+    """Catalog sync and stream probing, in the worker holding the writer
+    lock; the other workers follow what it writes until they get the lock"""
+    follower = None
+    try:
+        while not writer_lock.acquire():
+            if follower is None and catalog is not None:
+                follower = asyncio.create_task(catalog.follow())
+            await asyncio.to_thread(health_store.reload)
+            await asyncio.sleep(WRITER_LOCK_RETRY)
+    finally:
+        if follower is not None:
+            follower.cancel()
+            await asyncio.gather(follower, return_exceptions=True)
+    writers = []
+    if catalog is not None:
+        writers.append(catalog.run(fetch_radio_browser))
+    if PROBE_TOP_N > 0:
+        writers.append(run_stream_probes())
+    await asyncio.gather(*writers)
+
+# Countries whose first page is loaded at startup, by station count
+PREWARM_COUNTRIES = int(os.environ.get("RADIO_PREWARM_COUNTRIES", 20))
+
+async def warm_popular():
+    await find_stations(StationQuery(limit=50), raw=True)
+
+async def warm_countries():
+    await aggregates.get("countries")
+
+async def warm_genres():
+    """First page of every curated genre, as /api/stations/by-genre loads it"""
+    async def first_page(slug: str):
+        tags = genre_tags(slug)
+        if len(tags) == 1:
+            return await find_stations(StationQuery(tag=tags[0], limit=50), raw=True)
+        return await asyncio.gather(*(find_stations(StationQuery(tag=tag, limit=50)) for tag in tags))
+
+    _, failed = await fan_out(first_page, [genre["slug"] for genre in GENRES])
+    if failed:
+        raise RuntimeError(f"genres not loaded: {', '.join(failed)}")
+
+async def warm_top_countries():
+    """First page of the countries with the most stations, as
+    /api/stations/by-country loads it"""
+    countries = (await aggregates.get("countries")).items[:PREWARM_COUNTRIES]
+    codes = [c["iso_3166_1"].upper() for c in countries if c.get("iso_3166_1")]
+    _, failed = await fan_out(
+        lambda code: find_stations(StationQuery(countrycode=code, limit=100), raw=True), codes
+    )
+    if failed:
+        raise RuntimeError(f"countries not loaded: {', '.join(failed)}")
+
+def warmup_loaders() -> Dict[str, Any]:
+    return {
+        "popular": lambda: prewarmer.warm(warm_popular),
+        "countries": warm_countries,
+        "genres": lambda: prewarmer.warm(warm_genres),
+        "top_countries": lambda: prewarmer.warm(warm_top_countries),
+    }
+
+# Readiness: caches behind the landing screens are loaded (in every worker
+# when RADIO_READY_DIR is set)
+warmup = Warmup.from_env(warmup_loaders())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await upstream.start()
+    clicks.start()
+    if catalog is not None:
+        catalog.subscribe(rebuild_search_index)
+    background = [
+        # Loop lag also drives the adaptive concurrency limit
+        asyncio.create_task(metrics.monitor_event_loop(on_lag=lambda lag: admission.concurrency.observe_lag(lag))),
+        asyncio.create_task(aggregates.run()),
+        asyncio.create_task(run_writers()),
+        asyncio.create_task(warmup.run()),
+        asyncio.create_task(prewarmer.run()),
+        asyncio.create_task(similar.run(lambda: search_index, SIMILAR_REBUILD_INTERVAL)),
+    ]
+    if mirrors.discovery:
+        background.append(asyncio.create_task(mirrors.run_discovery()))
+    if snapshots is not None:
+        background.append(asyncio.create_task(watch_snapshots()))
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        writer_lock.release()
+        # Flush queued clicks while the upstream pool is still open
+        await clicks.aclose()
+        await prober.aclose()
+        await upstream.aclose()
+        await cache.aclose()
 
-app = FastAPI(title="Global Radio API")
+app = FastAPI(title="Global Radio API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -18,147 +323,329 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-class RadioStation(BaseModel):
-    stationuuid: str
-    name: str
-    url: str
-    url_resolved: str
-    homepage: str
-    favicon: str
-    country: str
-    countrycode: str
-    state: str
-    language: str
-    votes: int
-    lastchangetime: str
-    codec: str
-    bitrate: int
-    hls: int
-    lastcheckok: int
-    lastchecktime: str
-    clickcount: int
-    clicktrend: int
-    tags: str
-
-# Cache for radio browser servers
-radio_browser_servers = []
+app.add_middleware(HTTPCacheMiddleware)
+app.add_middleware(CompressionMiddleware)
+# Inside the metrics middleware so rejected requests are still counted
+app.add_middleware(
+    AdmissionMiddleware,
+    control=lambda: admission,
+    identify=lambda scope: client_id(Request(scope)),
+)
+app.add_middleware(metrics.PrometheusMiddleware)
 
 async def get_radio_browser_servers():
     """Get list of radio browser API servers for load balancing"""
-    global radio_browser_servers
-    if not radio_browser_servers:
-        # Use known working servers
-        radio_browser_servers = [
-            "https://de1.api.radio-browser.info",
-            "https://nl1.api.radio-browser.info", 
-            "https://at1.api.radio-browser.info"
-        ]
-    return radio_browser_servers
-
-async def make_radio_request(endpoint: str, params: dict = None):
-    """Make request to radio browser API with server failover"""
-    servers = await get_radio_browser_servers()
-    
-    last_error = None
-    for server in servers:
+    return mirrors.urls
+
+async def make_radio_request(endpoint: str, params: dict = None, raw: bool = False):
+    """Make request to radio browser API, served from cache when possible.
+    With ``raw`` the undecoded response body is returned (and cached) as
+    ``RawJSON``"""
+    ttl = cache.ttl_for(endpoint)
+    if ttl is None:
+        return await fetch_radio_browser(endpoint, params, raw)
+
+    # Coalesces concurrent misses and serves stale entries while refreshing
+    key = cache_key(f"raw/{endpoint}" if raw else endpoint, params)
+    fetch = lambda: fetch_radio_browser(endpoint, params, raw)
+    prewarmer.observe(key, ttl, fetch)
+    return await cache.get_or_fetch(key, ttl, fetch)
+
+async def fetch_radio_browser(endpoint: str, params: dict = None, raw: bool = False):
+    """Fetch from radio browser API with health-scored mirror selection,
+    hedging and failover, paid for from the global upstream budget"""
+    label = metrics.endpoint_label(endpoint)
+
+    async def attempt(server: str):
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await upstream.get(f"{server}/json/{endpoint}", params=params)
+            outcome = str(response.status_code)
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            metrics.UPSTREAM_LATENCY.labels(server, label, outcome).observe(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise httpx.HTTPStatusError(
+                f"{server} answered {response.status_code}", request=response.request, response=response
+            )
+        if raw:
+            if not is_json_document(response.content):
+                raise ValueError(f"{server} answered with a non-JSON body")
+            return RawJSON(response.content)
+        with metrics.stage(label, "json_decode"):
+            return orjson.loads(response.content)
+
+    try:
+        # Every request actually sent, hedges and failovers included, spends
+        # an upstream token
+        return await mirrors.request(attempt, admit=admission.admit_upstream)
+    except UpstreamBudgetExhausted as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Upstream request budget exhausted",
+            headers={"Retry-After": retry_after_header(e.retry_after)},
+        )
+    except MirrorsUnavailable:
+        raise HTTPException(status_code=503, detail="Radio service temporarily unavailable")
+
+async def find_stations(query: StationQuery, raw: bool = False, index: Optional[SearchIndex] = None):
+    """Stations matching query, from the local catalog once it is synced.
+    With ``raw``, upstream results come back as unparsed ``RawJSON``; ``index``
+    pins a specific search index snapshot"""
+    index = index or search_index
+    if index is not None:
+        return index.search(query)
+    if catalog is not None and catalog.ready:
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                url = f"{server}/json/{endpoint}"
-                response = await client.get(url, params=params)
-                if response.status_code == 200:
-                    return response.json()
+            return await catalog.search(query)
         except Exception as e:
-            last_error = e
-            continue
-    
-    raise HTTPException(status_code=503, detail="Radio service temporarily unavailable")
+            logger.warning("Catalog query failed, falling back to upstream: %s", e)
+    if raw:
+        return await make_radio_request("stations/search", query.upstream_params(), raw=True)
+    return await make_radio_request("stations/search", query.upstream_params())
+
+def station_cursor(cursor: Optional[str] = None) -> Optional[Cursor]:
+    """Opaque ``cursor`` from a previous page's ``next_cursor``"""
+    if cursor is None:
+        return None
+    try:
+        return Cursor.decode(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def current_snapshot() -> Tuple[str, Optional[SearchIndex]]:
+    """Token naming the data stations are served from right now"""
+    if search_index is not None:
+        return f"index:{search_index.version}", search_index
+    if catalog is not None and catalog.ready:
+        return f"catalog:{catalog.version}", None
+    return "upstream", None
+
+def resolve_page(cursor: Optional[Cursor], query_id: str) -> Tuple[int, str, Optional[SearchIndex]]:
+    """``(offset, snapshot, index)`` for the page ``cursor`` points at"""
+    if cursor is None:
+        return (0, *current_snapshot())
+    if cursor.query != query_id:
+        raise HTTPException(status_code=400, detail="cursor belongs to a different query")
+    if cursor.snapshot.startswith("index:"):
+        version = int(cursor.snapshot.split(":", 1)[1])
+        index = search_index if search_index is not None and search_index.version == version else index_snapshots.get(version)
+        if index is not None:
+            return cursor.offset, cursor.snapshot, index
+    # The snapshot is gone (or never was pinned); continue at the same offset
+    # of whatever is current.
+    return (cursor.offset, *current_snapshot())
+
+def next_cursor(page: Tuple[int, str, Optional[SearchIndex]], query_id: str, stations, limit: int) -> Optional[str]:
+    """Cursor for the page after ``stations``, or ``None`` at the end"""
+    offset, snapshot, _ = page
+    count = count_stations(stations)
+    if count < limit or offset + count > MAX_OFFSET:
+        return None
+    return Cursor(offset + count, snapshot, query_id).encode()
+
+async def find_station_page(query: StationQuery, cursor: Optional[Cursor]):
+    """One page of ``query`` plus the cursor for the next one"""
+    query_id = fingerprint(replace(query, limit=0, offset=0))
+    page = resolve_page(cursor, query_id)
+    stations = await find_stations(replace(query, offset=page[0]), raw=True, index=page[2])
+    return stations, next_cursor(page, query_id, stations, query.limit)
+
+def station_format(fields: Optional[str] = None, format: str = "json") -> StationFormat:
+    """``fields=a,b,c`` projection and ``format=json|columnar`` of station responses"""
+    try:
+        return StationFormat.parse(fields, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def stream_health(health: Optional[str] = None) -> Optional[str]:
+    """``health=filter`` drops streams our prober found dead, ``health=rank``
+    also lists verified streams first"""
+    if health is not None and health not in HEALTH_MODES:
+        raise HTTPException(status_code=400, detail=f"health must be one of: {', '.join(HEALTH_MODES)}")
+    return health
+
+def with_health(stations, mode: Optional[str]):
+    """``stations`` annotated/filtered by stream health when ``mode`` is set"""
+    if mode is None:
+        return stations
+    if isinstance(stations, RawJSON):
+        stations = orjson.loads(stations.data)
+    return health_store.apply(stations, mode)
+
+def nearby_query(
+    lat: float, lon: float, radius: Optional[float] = None, limit: int = 50, order: str = "distance"
+) -> NearbyQuery:
+    """Point, optional radius (km), limit and ``order=distance|clickcount``"""
+    try:
+        return NearbyQuery.parse(lat, lon, radius, limit, order)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def current_geo_index(index: SearchIndex) -> GeoIndex:
+    """Spatial index for ``index``; cheap to build, so built on first use"""
+    global geo_index
+    if geo_index is None or geo_index.version != index.version:
+        geo_index = GeoIndex.from_search_index(index)
+    return geo_index
+
+async def find_nearby(query: NearbyQuery) -> List[dict]:
+    """Stations near a point with a ``distance_km`` field, from the spatial
+    index or else ranked from an upstream geo search"""
+    index = search_index
+    if index is not None:
+        docs, distances = current_geo_index(index).query(query)
+        stations = index.store.rows(docs)
+    else:
+        params = {
+            "geo_lat": query.lat,
+            "geo_long": query.lon,
+            "geo_distance": int((query.radius_km or NEARBY_POOL_RADIUS_KM) * 1000),
+            "has_geo_info": "true",
+            "hidebroken": "true",
+            "order": "clickcount",
+            "reverse": "true",
+            "limit": NEARBY_POOL,
+        }
+        pool = sorted(
+            await make_radio_request("stations/search", params), key=lambda s: -(s.get("clickcount") or 0)
+        )
+        docs, distances = GeoIndex.from_stations(pool).query(query)
+        stations = [dict(pool[d]) for d in docs.tolist()]
+    for station, distance in zip(stations, distances.tolist()):
+        station["distance_km"] = round(distance, 3)
+    return stations
+
+async def search_by_tag(tag: str, limit: int):
+    """Top stations for a single tag, ordered by click count"""
+    return await find_stations(StationQuery(tag=tag, limit=limit))
 
 @app.get("/")
 async def root():
     return {"message": "Global Radio API is running"}
 
+@app.get("/api/ready")
+async def readiness():
+    """200 once the caches of this worker, and of every other worker sharing
+    RADIO_READY_DIR, are warm; 503 until then"""
+    status = warmup.status()
+    return ORJSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/api/aggregates/status")
+async def get_aggregate_status():
+    """Refresh state of the precomputed country/language/tag lists"""
+    return aggregates.status()
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Hit/miss/eviction counters for the upstream response cache, and how
+    often prewarmed entries served requests"""
+    return {"cache": cache.snapshot(), "prewarm": prewarmer.status()}
+
+@app.get("/api/admission/status")
+async def get_admission_status():
+    """Client rate limits, concurrency limit and upstream budget usage"""
+    return admission.status()
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+@app.get("/api/mirrors")
+async def get_mirror_status():
+    """Health, latency and circuit state of each radio-browser mirror"""
+    return mirrors.status()
+
+@app.get("/api/catalog/status")
+async def get_catalog_status():
+    """Sync state of the local station catalog mirror"""
+    snapshot = snapshots.status() if snapshots is not None else {"enabled": False}
+    if catalog is None:
+        return {"catalog": {"enabled": False}, "snapshot": snapshot}
+    return {"catalog": {"enabled": True, **catalog.status()}, "snapshot": snapshot}
+
+@app.get("/api/streams/status")
+async def get_stream_health_status():
+    """Stream prober counters and the reachability of probed stations"""
+    return {"prober": prober.status(), "health": health_store.status()}
+
 @app.get("/api/stations/popular")
-async def get_popular_stations(limit: int = 50):
+async def get_popular_stations(
+    limit: int = Query(50, ge=1, le=MAX_LIMIT),
+    fmt: StationFormat = Depends(station_format),
+    health: Optional[str] = Depends(stream_health),
+    cursor: Optional[Cursor] = Depends(station_cursor),
+):
     """Get most popular radio stations"""
     try:
-        params = {
-            "limit": limit,
-            "order": "clickcount",
-            "reverse": "true",
-            "hidebroken": "true"
-        }
-        stations = await make_radio_request("stations/search", params)
-        return {"stations": stations}
+        stations, cursor = await find_station_page(StationQuery(limit=limit), cursor)
+        return stations_response(with_health(stations, health), fmt, next_cursor=cursor)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/stations/by-country/{country_code}")
-async def get_stations_by_country(country_code: str, limit: int = 100):
+async def get_stations_by_country(
+    country_code: str,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    fmt: StationFormat = Depends(station_format),
+    health: Optional[str] = Depends(stream_health),
+    cursor: Optional[Cursor] = Depends(station_cursor),
+):
     """Get radio stations by country code"""
     try:
-        params = {
-            "countrycode": country_code.upper(),
-            "limit": limit,
-            "order": "clickcount",
-            "reverse": "true",
-            "hidebroken": "true"
-        }
-        stations = await make_radio_request("stations/search", params)
-        return {"stations": stations}
+        query = StationQuery(countrycode=country_code.upper(), limit=limit)
+        stations, cursor = await find_station_page(query, cursor)
+        return stations_response(with_health(stations, health), fmt, next_cursor=cursor)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/stations/by-tag/{tag}")
-async def get_stations_by_tag(tag: str, limit: int = 100):
+async def get_stations_by_tag(
+    tag: str,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    fmt: StationFormat = Depends(station_format),
+    health: Optional[str] = Depends(stream_health),
+    cursor: Optional[Cursor] = Depends(station_cursor),
+):
     """Get radio stations by tag/genre"""
     try:
-        params = {
-            "tag": tag.lower(),
-            "limit": limit,
-            "order": "clickcount",
-            "reverse": "true",
-            "hidebroken": "true"
-        }
-        stations = await make_radio_request("stations/search", params)
-        return {"stations": stations}
+        stations, cursor = await find_station_page(StationQuery(tag=tag.lower(), limit=limit), cursor)
+        return stations_response(with_health(stations, health), fmt, next_cursor=cursor)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/stations/christian")
-async def get_christian_stations(limit: int = 100):
+async def get_christian_stations(
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    fmt: StationFormat = Depends(station_format),
+    health: Optional[str] = Depends(stream_health),
+):
     """Get Christian radio stations"""
     try:
         # Search for Christian, Gospel, and Religious stations
         christian_tags = ["christian", "gospel", "religious", "christian music", "christian rock", "christian pop"]
-        all_stations = []
-        
-        for tag in christian_tags:
-            params = {
-                "tag": tag,
-                "limit": 50,
-                "order": "clickcount",
-                "reverse": "true",
-                "hidebroken": "true"
-            }
-            try:
-                stations = await make_radio_request("stations/search", params)
-                all_stations.extend(stations)
-            except:
-                continue
-        
-        # Remove duplicates and sort by click count
-        seen = set()
-        unique_stations = []
-        for station in all_stations:
-            if station['stationuuid'] not in seen:
-                seen.add(station['stationuuid'])
-                unique_stations.append(station)
-        
-        # Sort by clickcount descending
-        unique_stations.sort(key=lambda x: x.get('clickcount', 0), reverse=True)
-        
-        return {"stations": unique_stations[:limit]}
+        with metrics.stage("christian_stations", "upstream_fetch"):
+            results, failed = await fan_out(lambda tag: search_by_tag(tag, 50), christian_tags)
+        if failed and not results:
+            raise HTTPException(status_code=503, detail="Radio service temporarily unavailable")
+
+        # Remove duplicates and keep the top stations by click count
+        with metrics.stage("christian_stations", "dedupe_sort"):
+            stations = top_stations(results, limit)
+        with metrics.stage("christian_stations", "serialization"):
+            return stations_response(with_health(stations, health), fmt, partial=bool(failed))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -168,155 +655,308 @@ async def search_stations(
     country: Optional[str] = None,
     language: Optional[str] = None,
     tag: Optional[str] = None,
-    limit: int = 50
+    limit: int = Query(50, ge=1, le=MAX_LIMIT),
+    fmt: StationFormat = Depends(station_format),
+    health: Optional[str] = Depends(stream_health),
+    cursor: Optional[Cursor] = Depends(station_cursor),
 ):
     """Search radio stations with various filters"""
     try:
-        params = {
-            "limit": limit,
-            "order": "clickcount",
-            "reverse": "true",
-            "hidebroken": "true"
-        }
-        
-        if name:
-            params["name"] = name
-        if country:
-            params["country"] = country
-        if language:
-            params["language"] = language
-        if tag:
-            params["tag"] = tag
-            
-        stations = await make_radio_request("stations/search", params)
-        return {"stations": stations}
+        query = StationQuery(name=name, country=country, language=language, tag=tag, limit=limit)
+        stations, cursor = await find_station_page(query, cursor)
+        return stations_response(with_health(stations, health), fmt, next_cursor=cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/stations/nearby")
+async def get_nearby_stations(
+    query: NearbyQuery = Depends(nearby_query),
+    fmt: StationFormat = Depends(station_format),
+    health: Optional[str] = Depends(stream_health),
+):
+    """Stations within ``radius`` km of ``lat``/``lon``, or the ``limit``
+    nearest without a radius"""
+    try:
+        return stations_response(with_health(await find_nearby(query), health), fmt)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/stations/by-genre")
-async def get_stations_by_genre(genre: str, limit: int = 50):
+async def get_stations_by_genre(
+    genre: str,
+    limit: int = Query(50, ge=1, le=MAX_LIMIT),
+    fmt: StationFormat = Depends(station_format),
+    health: Optional[str] = Depends(stream_health),
+    cursor: Optional[Cursor] = Depends(station_cursor),
+):
     """Get stations by specific genre"""
     try:
-        # Map common genres to tags
-        genre_mapping = {
-            "rock": "rock",
-            "pop": "pop",
-            "jazz": "jazz",
-            "classical": "classical",
-            "country": "country",
-            "hip-hop": "hip hop,hiphop,rap",
-            "electronic": "electronic,dance,techno,house",
-            "blues": "blues",
-            "reggae": "reggae",
-            "folk": "folk",
-            "metal": "metal",
-            "punk": "punk",
-            "alternative": "alternative",
-            "indie": "indie",
-            "soul": "soul,r&b",
-            "funk": "funk",
-            "latin": "latin,salsa,merengue",
-            "world": "world music,ethnic",
-            "ambient": "ambient,chillout",
-            "news": "news,talk",
-            "sports": "sports",
-            "christian": "christian,gospel,religious"
-        }
-        
-        tag = genre_mapping.get(genre.lower(), genre)
-        
-        params = {
-            "tag": tag,
-            "limit": limit,
-            "order": "clickcount",
-            "reverse": "true",
-            "hidebroken": "true"
-        }
-        
-        stations = await make_radio_request("stations/search", params)
-        return {"stations": stations}
+        tags = genre_tags(genre)
+        if len(tags) == 1:
+            stations, cursor = await find_station_page(StationQuery(tag=tags[0], limit=limit), cursor)
+            return stations_response(with_health(stations, health), fmt, partial=False, next_cursor=cursor)
+
+        # Multi-tag genres: query each tag concurrently and merge. Page n needs
+        # the top offset+limit of every tag to merge correctly.
+        query_id = fingerprint("genre", tuple(tags))
+        page = resolve_page(cursor, query_id)
+        offset, _, index = page
+        depth = min(offset + limit, MAX_OFFSET + MAX_LIMIT)
+        results, failed = await fan_out(
+            lambda tag: find_stations(StationQuery(tag=tag, limit=depth), index=index), tags
+        )
+        if failed and not results:
+            raise HTTPException(status_code=503, detail="Radio service temporarily unavailable")
+        stations = top_stations(results, depth)[offset:]
+        cursor = next_cursor(page, query_id, stations, limit)
+        return stations_response(with_health(stations, health), fmt, partial=bool(failed), next_cursor=cursor)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/countries")
-async def get_countries():
-    """Get list of countries with radio stations"""
+async def get_countries(request: Request):
+    """Get list of countries with radio stations, sorted by station count"""
     try:
-        countries = await make_radio_request("countries")
-        # Sort by station count
-        sorted_countries = sorted(countries, key=lambda x: x.get('stationcount', 0), reverse=True)
-        return {"countries": sorted_countries}
+        return prepared_response(request.headers, await aggregates.body("countries"))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/languages")
-async def get_languages():
-    """Get list of languages"""
+async def get_languages(request: Request):
+    """Get list of languages, sorted by station count"""
     try:
-        languages = await make_radio_request("languages")
-        sorted_languages = sorted(languages, key=lambda x: x.get('stationcount', 0), reverse=True)
-        return {"languages": sorted_languages}
+        return prepared_response(request.headers, await aggregates.body("languages"))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/tags")
-async def get_tags(limit: int = 100):
+async def get_tags(request: Request, limit: int = Query(100, ge=1)):
     """Get popular tags/genres"""
     try:
-        tags = await make_radio_request("tags")
-        sorted_tags = sorted(tags, key=lambda x: x.get('stationcount', 0), reverse=True)
-        return {"tags": sorted_tags[:limit]}
+        return prepared_response(request.headers, await aggregates.body("tags", limit))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/genres")
 async def get_popular_genres():
     """Get curated list of popular music genres"""
-    genres = [
-        {"name": "Rock", "slug": "rock", "icon": "🎸"},
-        {"name": "Pop", "slug": "pop", "icon": "🎵"},
-        {"name": "Jazz", "slug": "jazz", "icon": "🎺"},
-        {"name": "Classical", "slug": "classical", "icon": "🎼"},
-        {"name": "Country", "slug": "country", "icon": "🤠"},
-        {"name": "Hip-Hop", "slug": "hip-hop", "icon": "🎤"},
-        {"name": "Electronic", "slug": "electronic", "icon": "🎧"},
-        {"name": "Blues", "slug": "blues", "icon": "🎷"},
-        {"name": "Reggae", "slug": "reggae", "icon": "🌴"},
-        {"name": "Folk", "slug": "folk", "icon": "🪕"},
-        {"name": "Metal", "slug": "metal", "icon": "⚡"},
-        {"name": "Punk", "slug": "punk", "icon": "🤘"},
-        {"name": "Alternative", "slug": "alternative", "icon": "🎭"},
-        {"name": "Indie", "slug": "indie", "icon": "🎨"},
-        {"name": "Soul/R&B", "slug": "soul", "icon": "💫"},
-        {"name": "Latin", "slug": "latin", "icon": "💃"},
-        {"name": "World", "slug": "world", "icon": "🌍"},
-        {"name": "Ambient", "slug": "ambient", "icon": "🌙"},
-        {"name": "Christian", "slug": "christian", "icon": "✝️"},
-        {"name": "News/Talk", "slug": "news", "icon": "📰"},
-        {"name": "Sports", "slug": "sports", "icon": "⚽"}
-    ]
-    return {"genres": genres}
+    return {"genres": GENRES}
+
+async def lookup_station(station_uuid: str) -> Optional[dict]:
+    """One station by uuid, from the index or catalog before upstream"""
+    stations = []
+    if search_index is not None and search_index.get(station_uuid):
+        stations = [search_index.get(station_uuid)]
+    elif catalog is not None and catalog.ready:
+        stations = await catalog.by_uuids([station_uuid])
+    if not stations:
+        stations = await make_radio_request("stations/byuuid", {"uuid": station_uuid})
+    return stations[0] if stations else None
+
+async def lookup_stations(station_uuids: List[str]) -> Tuple[Dict[str, dict], List[str]]:
+    """Stations by uuid from the index/catalog, then the per-station cache,
+    then one upstream byuuid call per URL-sized chunk of the rest. Returns
+    the stations found and the uuids whose upstream chunk failed"""
+    found: Dict[str, dict] = {}
+    if search_index is not None:
+        for station_uuid in station_uuids:
+            station = search_index.get(station_uuid)
+            if station is not None:
+                found[station_uuid] = station
+    elif catalog is not None and catalog.ready:
+        found.update((s["stationuuid"], s) for s in await catalog.by_uuids(station_uuids))
+    missing = [u for u in station_uuids if u not in found]
+    # The same entries single-station lookups cache
+    keys = [cache_key("stations/byuuid", {"uuid": u}) for u in missing]
+    for station_uuid, cached in zip(missing, await asyncio.gather(*(cache.get(k) for k in keys))):
+        if cached:
+            found[station_uuid] = cached[0]
+    missing = [u for u in missing if u not in found]
+    if not missing:
+        return found, []
+
+    results, failed = await fan_out(
+        lambda chunk: fetch_radio_browser("stations/byuuid", {"uuids": chunk}),
+        joined_chunks(missing, BATCH_URL_BUDGET),
+    )
+    ttl = cache.ttl_for("stations/byuuid")
+    for stations in results:
+        for station in stations:
+            found[station["stationuuid"]] = station
+            if ttl is not None:
+                await cache.set(cache_key("stations/byuuid", {"uuid": station["stationuuid"]}), [station], ttl)
+    return found, [u for chunk in failed for u in chunk.split(",")]
+
+class StationBatch(BaseModel):
+    uuids: List[str]
+
+def batch_uuids(batch: StationBatch) -> List[str]:
+    """Non-empty list of at most BATCH_MAX station uuids, in canonical form"""
+    if not batch.uuids:
+        raise HTTPException(status_code=400, detail="uuids must be a non-empty list of station uuids")
+    if len(batch.uuids) > BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"at most {BATCH_MAX} uuids per batch")
+    try:
+        # Anything else (commas in particular) would be split into several
+        # upstream lookups.
+        return [str(uuid.UUID(u.strip())) for u in batch.uuids]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="uuids must be a non-empty list of station uuids")
+
+@app.post("/api/stations/batch")
+async def get_stations_batch(station_uuids: List[str] = Depends(batch_uuids), fields: Optional[str] = None):
+    """Many stations by uuid in one call (favorites/recents hydration).
+    ``stations`` follows the input order with null where a uuid was not found"""
+    try:
+        fmt = station_format(fields)
+        unique = list(dict.fromkeys(station_uuids))
+        found, unavailable = await lookup_stations(unique)
+        if unavailable and not found:
+            raise HTTPException(status_code=503, detail="Radio service temporarily unavailable")
+        return {
+            "stations": [fmt.project(found[u]) if u in found else None for u in station_uuids],
+            "missing": [u for u in unique if u not in found and u not in unavailable],
+            "unavailable": unavailable,
+            "partial": bool(unavailable),
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/station/{station_uuid}")
-async def get_station_details(station_uuid: str):
+async def get_station_details(station_uuid: str, fmt: StationFormat = Depends(station_format)):
     """Get detailed information about a specific station"""
     try:
-        stations = await make_radio_request("stations/byuuid", {"uuid": station_uuid})
-        if stations and len(stations) > 0:
-            return {"station": stations[0]}
+        station = await lookup_station(station_uuid)
+        if station is not None:
+            return {"station": fmt.project(station)}
         else:
             raise HTTPException(status_code=404, detail="Station not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/station/{station_uuid}/click")
-async def click_station(station_uuid: str):
-    """Register a click for a station (for statistics)"""
+async def resolve_stream(station: dict) -> dict:
+    """Playable URL of ``station`` with the codec/bitrate actually served"""
+    url = station.get("url_resolved") or station.get("url")
+    if not needs_resolving(url, bool(station.get("hls"))):
+        # Already a direct stream: nothing to resolve, and nothing to fetch
+        # on the listener's behalf
+        return {
+            "stationuuid": station["stationuuid"],
+            "url": url,
+            "ok": None,
+            "codec": station.get("codec") or None,
+            "bitrate": station.get("bitrate") or None,
+            "hls": False,
+            "content_type": None,
+            "ttfb_ms": None,
+            "checked_at": None,
+        }
+    result = await prober.probe(url, throttle=False)
+    await health_store.record([(station["stationuuid"], result)])
+    return {
+        "stationuuid": station["stationuuid"],
+        # A failed probe may be a transient hiccup: hand out the listed URL
+        # and let the player try it.
+        "url": result.final_url if result.ok else url,
+        "ok": result.ok,
+        "codec": result.codec or station.get("codec") or None,
+        "bitrate": result.bitrate or station.get("bitrate") or None,
+        "hls": result.hls,
+        "content_type": result.content_type,
+        "ttfb_ms": result.ttfb_ms,
+        "checked_at": result.checked_at,
+    }
+
+@app.get("/api/station/{station_uuid}/stream")
+async def get_station_stream(station_uuid: str):
+    """Resolve a station's playlist (or HLS master playlist) to a directly
+    playable stream URL, with codec and bitrate hints (cached for
+    STREAM_TTL); direct stream URLs are returned as listed"""
     try:
-        await make_radio_request(f"url/{station_uuid}")
-        return {"success": True}
+        station = await lookup_station(station_uuid)
+        if station is None:
+            raise HTTPException(status_code=404, detail="Station not found")
+        key = cache_key("stream", {"uuid": station_uuid})
+        return {"stream": await cache.get_or_fetch(key, STREAM_TTL, lambda: resolve_stream(station))}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def similar_from_upstream(station: dict, limit: int) -> List[dict]:
+    """Without a similarity index: rank the top stations of the station's
+    first few tags and its country"""
+    tags = [t.strip() for t in (station.get("tags") or "").split(",") if t.strip()][:3]
+    queries = [StationQuery(tag=tag, limit=100) for tag in tags]
+    if station.get("countrycode"):
+        queries.append(StationQuery(countrycode=station["countrycode"], limit=100))
+    results, _ = await fan_out(find_stations, queries)
+    return rank_pool(station, [s for stations in results for s in stations], limit)
+
+@app.get("/api/station/{station_uuid}/similar")
+async def get_similar_stations(
+    station_uuid: str, limit: int = Query(20, ge=1, le=100), fmt: StationFormat = Depends(station_format)
+):
+    """Stations most like this one by tags, language, country and codec"""
+    try:
+        index = search_index
+        doc = index.by_uuid.get(station_uuid) if index is not None else None
+        stations = similar.similar(index, doc, limit) if doc is not None else None
+        if stations is None:
+            station = await lookup_station(station_uuid)
+            if station is None:
+                raise HTTPException(status_code=404, detail="Station not found")
+            key = cache_key("similar", {"uuid": station_uuid, "limit": limit})
+            stations = await cache.get_or_fetch(key, SIMILAR_TTL, lambda: similar_from_upstream(station, limit))
+        return stations_response(stations, fmt)
+    except HTTPException:
+        raise
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/similar/status")
+async def get_similar_status():
+    """Similarity index size, rebuilds and result cache hit ratio"""
+    return {"similar": similar.status()}
+
+def client_id(request: Request) -> str:
+    """Identity used to rate-limit requests and deduplicate clicks: a
+    configured API key, else the client IP (as forwarded by a trusted proxy)"""
+    return client_identity(request.headers, request.client.host if request.client else None)
+
+@app.post("/api/station/{station_uuid}/click")
+async def click_station(station_uuid: str, request: Request):
+    """Register a click for a station (for statistics); reported upstream
+    in the background"""
+    if clicks.submit(station_uuid, client_id(request)):
+        return {"success": True}
+    return {"success": False, "error": "Click queue is full, try again later"}
+
+@app.get("/api/station/{station_uuid}/clicks")
+async def station_clicks(station_uuid: str):
+    """Clicks registered through this API for a station"""
+    return {"stationuuid": station_uuid, "clicks": clicks.station_clicks(station_uuid)}
+
+@app.get("/api/clicks/stats")
+async def click_stats():
+    """Click queue depth, drops and upstream delivery counters"""
+    return {"clicks": clicks.snapshot()}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,10 @@
+"""Benchmarks for the Global Radio API backend.
+
+Run from the repository root, e.g. ``python -m benchmarks.bench_upstream_pool``.
+"""
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
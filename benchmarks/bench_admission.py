@@ -0,0 +1,104 @@
+"""Admission control under an abusive client: limits on versus off.
+
+One client hammers ``/api/stations/search`` with distinct (uncacheable)
+queries at a fixed rate while a few regular users browse at
+a normal pace, all in-process against a stub upstream. Without limits the
+abuser's traffic all reaches upstream and queues in front of everyone else;
+with per-client limits, the adaptive concurrency limit and the upstream
+budget it is refused early (429/503 with Retry-After). Reports regular-user
+latency, status codes per client and upstream calls per second.
+
+    python -m benchmarks.bench_admission --seconds 10 --abuse-rate 300
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from benchmarks.common import app_client, emit, latency_summary
+from benchmarks.stub_upstream import StubUpstream, synthetic_stations
+from radio.admission import Admission, AdaptiveLimiter, ClientIdentity, RateLimiter
+
+
+async def drive(args: argparse.Namespace, limited: bool) -> dict:
+    admission = Admission()
+    if limited:
+        admission = Admission(
+            clients=RateLimiter(args.client_rate, args.client_rate * 3),
+            concurrency=AdaptiveLimiter(initial=args.concurrency, max_limit=args.concurrency * 4),
+            upstream=RateLimiter(args.upstream_rate, args.upstream_rate * 2),
+            upstream_max_wait=0.5,
+        )
+    async with StubUpstream(synthetic_stations(args.stations), latency=args.latency) as stub:
+        identity = ClientIdentity(["abuser", *(f"user-{i}" for i in range(args.users))])
+        async with app_client(stub, admission=admission, client_identity=identity) as client:
+            deadline = time.perf_counter() + args.seconds
+            statuses = {"abuser": Counter(), "regular": Counter()}
+            latencies = []
+            sequence = 0
+
+            async def abuse(sequence: int):
+                response = await client.get(
+                    "/api/stations/search", params={"name": f"q{sequence}"}, headers={"x-api-key": "abuser"}
+                )
+                statuses["abuser"][response.status_code] += 1
+
+            async def abuser():
+                # Open loop: a fixed arrival rate whatever the answers, so both
+                # runs face the same offered load.
+                tasks = []
+                while time.perf_counter() < deadline:
+                    tasks.append(asyncio.ensure_future(abuse(len(tasks))))
+                    await asyncio.sleep(1 / args.abuse_rate)
+                await asyncio.gather(*tasks)
+
+            async def regular(user: int):
+                pages = ("/api/genres", "/api/stations/popular", "/api/stations/by-genre?genre=jazz")
+                turn = 0
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    response = await client.get(pages[turn % len(pages)], headers={"x-api-key": f"user-{user}"})
+                    latencies.append(time.perf_counter() - start)
+                    statuses["regular"][response.status_code] += 1
+                    turn += 1
+                    await asyncio.sleep(args.think)
+
+            before = sum(stub.paths.values())
+            await asyncio.gather(
+                abuser(),
+                *(regular(i) for i in range(args.users)),
+            )
+            upstream_calls = sum(stub.paths.values()) - before
+            return {
+                "regular_latency": latency_summary(latencies),
+                "statuses": {who: dict(sorted(counts.items())) for who, counts in statuses.items()},
+                "upstream_calls_per_second": round(upstream_calls / args.seconds, 1),
+                "admission": admission.status(),
+            }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    return {
+        "benchmark": "admission",
+        "config": {k: v for k, v in vars(args).items()},
+        "before_unlimited": await drive(args, limited=False),
+        "after_limited": await drive(args, limited=True),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--abuse-rate", type=float, default=300, help="abusive client's requests per second")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--think", type=float, default=0.05, help="pause between a regular user's requests")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub upstream latency in seconds")
+    parser.add_argument("--client-rate", type=float, default=20, help="requests per second per client")
+    parser.add_argument("--upstream-rate", type=float, default=50, help="upstream calls per second")
+    parser.add_argument("--concurrency", type=int, default=20, help="initial concurrency limit")
+    parser.add_argument("--stations", type=int, default=2000)
+    emit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
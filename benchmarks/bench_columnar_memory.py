@@ -0,0 +1,59 @@
+"""Heap used by the catalog as a list of dicts versus ``ColumnarStations``.
+
+    python -m benchmarks.bench_columnar_memory --stations 50000
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from benchmarks.common import emit
+from benchmarks.stub_upstream import synthetic_stations
+from radio.columnar import ColumnarStations
+
+
+def _retained(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current, peak, elapsed
+
+
+def run(count: int) -> dict:
+    # Parse real JSON so every dict owns its own strings, as with upstream data.
+    payload = json.dumps(synthetic_stations(count)).encode()
+    dicts, dict_bytes, dict_peak, dict_seconds = _retained(lambda: json.loads(payload))
+    store, store_bytes, store_peak, store_seconds = _retained(lambda: ColumnarStations.from_dicts(dicts))
+    return {
+        "stations": count,
+        "list_of_dicts": {
+            "retained_mb": round(dict_bytes / 2**20, 2),
+            "bytes_per_station": dict_bytes // count,
+            "build_seconds": round(dict_seconds, 3),
+        },
+        "columnar": {
+            "retained_mb": round(store_bytes / 2**20, 2),
+            "bytes_per_station": store_bytes // count,
+            "peak_mb": round(store_peak / 2**20, 2),
+            "buffer_mb": round(store.nbytes / 2**20, 2),
+            "build_seconds": round(store_seconds, 3),
+        },
+        "reduction": round(dict_bytes / store_bytes, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stations", type=int, default=50000)
+    args = parser.parse_args()
+    emit(run(args.stations))
+
+
+if __name__ == "__main__":
+    main()
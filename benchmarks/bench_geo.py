@@ -0,0 +1,82 @@
+"""Nearby-station queries: grid spatial index versus a full haversine scan.
+
+Builds the spatial index over a synthetic catalog and times radius and
+k-nearest queries at random points against scanning every station with
+vectorized haversine (itself much faster than a Python loop), and reports
+build time and the cost of materializing the returned rows.
+
+    python -m benchmarks.bench_geo --stations 50000
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from benchmarks.common import emit, latency_summary
+from benchmarks.stub_upstream import synthetic_stations
+from radio.geo import EARTH_RADIUS_KM, GeoIndex, NearbyQuery
+from radio.search_index import SearchIndex
+
+
+def full_scan(lats: np.ndarray, lons: np.ndarray, query: NearbyQuery):
+    lat, lon = math.radians(query.lat), math.radians(query.lon)
+    a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    if query.radius_km is not None:
+        docs = np.flatnonzero(distances <= query.radius_km)
+    else:
+        docs = np.argpartition(distances, query.limit - 1)[:query.limit]
+    return docs[np.argsort(distances[docs], kind="stable")][:query.limit]
+
+
+def timed(fn, queries) -> dict:
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        samples.append(time.perf_counter() - start)
+    return latency_summary(samples)
+
+
+def run(count: int, queries: int, limit: int, seed: int) -> dict:
+    search = SearchIndex(synthetic_stations(count, seed), 1)
+    start = time.perf_counter()
+    index = GeoIndex.from_search_index(search)
+    build_seconds = time.perf_counter() - start
+    lats = np.radians(np.asarray(search.store.columns["geo_lat"]))
+    lons = np.radians(np.asarray(search.store.columns["geo_long"]))
+
+    rng = np.random.default_rng(seed)
+    points = list(zip(rng.uniform(-60, 70, queries).tolist(), rng.uniform(-170, 170, queries).tolist()))
+    results = {}
+    for label, radius in (("radius_50km", 50), ("radius_500km", 500), ("radius_2000km", 2000), ("knn", None)):
+        batch = [NearbyQuery.parse(lat, lon, radius, limit) for lat, lon in points]
+        results[label] = {
+            "before_full_scan": timed(lambda q: full_scan(lats, lons, q), batch),
+            "after_grid_index": timed(index.query, batch),
+            "with_rows": timed(lambda q: search.store.rows(index.query(q)[0]), batch),
+            "mean_results": round(float(np.mean([len(index.query(q)[0]) for q in batch])), 1),
+        }
+    return {
+        "benchmark": "nearby_stations",
+        "stations": count,
+        "indexed": len(index),
+        "limit": limit,
+        "build_ms": round(build_seconds * 1000, 2),
+        "queries": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stations", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    emit(run(args.stations, args.queries, args.limit, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Repeat traffic reaching Python with and without an HTTP cache in front.
+
+Replays a browsing mix over simulated time through :class:`CachingProxy`
+(nginx ``proxy_cache`` semantics) and reports how many requests and bytes
+still reach the app, and how many of those were cheap 304 revalidations.
+
+    python -m benchmarks.bench_http_cache --requests 2000 --minutes 30
+"""
+import argparse
+import asyncio
+import random
+
+from benchmarks.caching_proxy import CachingProxy
+from benchmarks.common import app_client, emit
+from benchmarks.stub_upstream import StubUpstream
+
+ROUTES = [
+    ("/api/stations/popular", {"limit": 50}),
+    ("/api/stations/by-country/de", {}),
+    ("/api/stations/by-country/us", {}),
+    ("/api/stations/by-genre", {"genre": "rock"}),
+    ("/api/stations/by-tag/jazz", {}),
+    ("/api/countries", {}),
+    ("/api/genres", {}),
+    ("/api/tags", {"limit": 100}),
+]
+
+
+async def run(total: int, minutes: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    now = [0.0]
+    step = minutes * 60 / total
+    async with StubUpstream() as stub:
+        async with app_client(stub) as client:
+            proxy = CachingProxy(client, clock=lambda: now[0])
+            direct_bytes = 0
+            for _ in range(total):
+                path, params = ROUTES[min(int(rng.expovariate(0.5)), len(ROUTES) - 1)]
+                entry = await proxy.get(path, params)
+                direct_bytes += len(entry.body)
+                now[0] += step
+    stats = proxy.stats
+    return {
+        "benchmark": "http_cache",
+        "requests": total,
+        "simulated_minutes": minutes,
+        "without_cache": {"requests_reaching_python": total, "bytes_from_python": direct_bytes},
+        "with_cache": {
+            "requests_reaching_python": stats.upstream_requests,
+            "of_which_304": stats.not_modified,
+            "bytes_from_python": stats.upstream_bytes,
+            "cache_hits": stats.hits,
+        },
+        "reduction_pct": round(100 * (1 - stats.upstream_requests / total), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--minutes", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    emit(asyncio.run(run(args.requests, args.minutes, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
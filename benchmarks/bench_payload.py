@@ -0,0 +1,56 @@
+"""Response bytes for station lists: full vs projected vs columnar, per encoding.
+
+    python -m benchmarks.bench_payload --limit 100
+
+``mobile`` requests only the fields the mobile app renders.
+"""
+import argparse
+import asyncio
+
+from benchmarks.common import app_client, emit
+from benchmarks.stub_upstream import StubUpstream, synthetic_stations
+from radio.compression import BROTLI_AVAILABLE
+
+MOBILE_FIELDS = "stationuuid,name,url,url_resolved,favicon,homepage,tags,country,countrycode,language,codec,bitrate,votes,clickcount"
+
+SHAPES = {
+    "full": {},
+    "mobile_fields": {"fields": MOBILE_FIELDS},
+    "columnar": {"format": "columnar"},
+    "mobile_columnar": {"fields": MOBILE_FIELDS, "format": "columnar"},
+}
+
+
+async def run(limit: int, stations: int) -> dict:
+    encodings = ["identity", "gzip"] + (["br"] if BROTLI_AVAILABLE else [])
+    results = {}
+    async with StubUpstream(stations=synthetic_stations(stations)) as stub:
+        async with app_client(stub) as client:
+            for shape, params in SHAPES.items():
+                row = {}
+                for encoding in encodings:
+                    response = await client.get(
+                        "/api/stations/popular",
+                        params={"limit": limit, **params},
+                        headers={"Accept-Encoding": encoding},
+                    )
+                    response.raise_for_status()
+                    row[f"{encoding}_bytes"] = response.num_bytes_downloaded
+                results[shape] = row
+    baseline = results["full"]["identity_bytes"]
+    for row in results.values():
+        for key in list(row):
+            row[key.replace("_bytes", "_pct_of_before")] = round(100 * row[key] / baseline, 1)
+    return {"benchmark": "payload", "limit": limit, "brotli_available": BROTLI_AVAILABLE, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--stations", type=int, default=1000)
+    args = parser.parse_args()
+    emit(asyncio.run(run(args.limit, args.stations)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Popularity-driven prewarming: request latency with short TTLs, on versus off.
+
+Drives Zipf-distributed ``/api/stations/by-country`` traffic through the
+in-process app against a slow stub upstream, with a response-cache TTL short
+enough that popular keys expire several times during the run and no stale
+serving. With prewarming off every expiry costs a user an upstream round
+trip; with it on the hot keys are refreshed ahead of expiry. Reports latency,
+requests that had to wait on upstream, and the prewarm hit ratio.
+
+    python -m benchmarks.bench_prewarm --seconds 10 --ttl 2 --latency 0.05
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import app_client, emit, latency_summary
+from benchmarks.stub_upstream import StubUpstream, synthetic_stations
+from radio.cache import DEFAULT_TTLS, TieredCache
+from radio.prewarm import Prewarmer
+
+
+async def drive(args: argparse.Namespace, prewarm: bool) -> dict:
+    async with StubUpstream(synthetic_stations(args.stations), latency=args.latency) as stub:
+        codes = sorted({s["countrycode"] for s in stub.stations})
+        rng = random.Random(args.seed)
+        weights = [1 / (rank + 1) ** args.zipf for rank in range(len(codes))]
+        cache = TieredCache(ttls={**DEFAULT_TTLS, "stations/search": args.ttl, "raw/stations/search": args.ttl}, stale_ttl=0)
+        prewarmer = Prewarmer(
+            cache,
+            lead=args.ttl / 2,
+            interval=args.ttl / 4,
+            budget_per_minute=args.budget if prewarm else 0,
+        )
+        async with app_client(stub, cache=cache, prewarmer=prewarmer) as client:
+            latencies = []
+            slow = 0
+            deadline = time.perf_counter() + args.seconds
+
+            async def user():
+                nonlocal slow
+                while time.perf_counter() < deadline:
+                    code = rng.choices(codes, weights)[0]
+                    start = time.perf_counter()
+                    await client.get(f"/api/stations/by-country/{code}", params={"limit": 20})
+                    elapsed = time.perf_counter() - start
+                    latencies.append(elapsed)
+                    slow += elapsed >= args.latency
+                    await asyncio.sleep(args.think)
+
+            await asyncio.gather(*(user() for _ in range(args.users)))
+            status = prewarmer.status()
+            return {
+                **latency_summary(latencies),
+                "waited_on_upstream": slow,
+                "waited_ratio": round(slow / len(latencies), 4) if latencies else 0.0,
+                "prewarm_hit_ratio": status["hit_ratio"],
+                "prewarm_refreshes": status["refreshes"],
+                "upstream_searches": stub.paths["/json/stations/search"],
+            }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    return {
+        "benchmark": "prewarm",
+        "config": {k: v for k, v in vars(args).items()},
+        "before_on_demand": await drive(args, prewarm=False),
+        "after_prewarm": await drive(args, prewarm=True),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--ttl", type=float, default=2.0, help="stations/search cache TTL")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub upstream latency in seconds")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--think", type=float, default=0.01, help="pause between a user's requests")
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--budget", type=float, default=600, help="prewarm refreshes per minute")
+    parser.add_argument("--stations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    emit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
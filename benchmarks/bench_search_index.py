@@ -0,0 +1,51 @@
+"""Build time and query latency of the in-memory station search index.
+
+    python -m benchmarks.bench_search_index --stations 50000
+"""
+import argparse
+import time
+
+from benchmarks.common import emit, latency_summary
+from benchmarks.stub_upstream import synthetic_stations
+from radio.query import StationQuery
+from radio.search_index import SearchIndex
+
+QUERIES = {
+    "popular": StationQuery(limit=50),
+    "by_country": StationQuery(countrycode="DE", limit=100),
+    "by_tag": StationQuery(tag="jazz", limit=100),
+    "name_exact": StationQuery(name="smooth", limit=50),
+    "name_prefix": StationQuery(name="smo", limit=50),
+    "name_two_tokens": StationQuery(name="classic ro", limit=50),
+    "name_fuzzy": StationQuery(name="smoth", limit=50),
+    "name_tag_language": StationQuery(name="radio", tag="rock", language="english", limit=50),
+    "deep_page": StationQuery(tag="pop", limit=50, offset=1000),
+}
+
+
+def run(count: int, iterations: int) -> dict:
+    stations = synthetic_stations(count)
+    start = time.perf_counter()
+    index = SearchIndex(stations)
+    results = {"stations": count, "build_seconds": round(time.perf_counter() - start, 3), "queries": {}}
+    for label, query in QUERIES.items():
+        index.search(query)  # warm-up
+        samples = []
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            found = index.search(query)
+            samples.append(time.perf_counter() - t0)
+        results["queries"][label] = {"results": len(found), **latency_summary(samples)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stations", type=int, default=50000)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+    emit(run(args.stations, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""CPU time per station-list response: stdlib round trip vs orjson vs passthrough.
+
+    python -m benchmarks.bench_serialization --sizes 100 1000 10000
+
+``stdlib`` is what the API used to do per request (``response.json()`` then
+FastAPI's ``jsonable_encoder`` + ``JSONResponse``); ``orjson`` decodes and
+encodes with orjson; ``passthrough`` splices the upstream bytes into the
+envelope without parsing them.
+"""
+import argparse
+import json
+import time
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from benchmarks.common import emit
+from benchmarks.stub_upstream import synthetic_stations
+from radio.responses import ORJSONResponse, RawJSON, envelope
+
+
+def stdlib(body: bytes) -> bytes:
+    return JSONResponse(jsonable_encoder({"stations": json.loads(body)})).body
+
+
+def orjson_round_trip(body: bytes) -> bytes:
+    return ORJSONResponse({"stations": orjson.loads(body)}).body
+
+
+def passthrough(body: bytes) -> bytes:
+    return envelope("stations", RawJSON(body)).body
+
+
+PIPELINES = {"stdlib": stdlib, "orjson": orjson_round_trip, "passthrough": passthrough}
+
+
+def cpu_per_request(pipeline, body: bytes, min_seconds: float = 0.5) -> float:
+    iterations = 0
+    start = time.process_time()
+    while True:
+        pipeline(body)
+        iterations += 1
+        elapsed = time.process_time() - start
+        if elapsed >= min_seconds:
+            return elapsed / iterations
+
+
+def run(sizes) -> dict:
+    results = []
+    for size in sizes:
+        body = json.dumps(synthetic_stations(size)).encode()
+        row = {"stations": size, "body_kb": round(len(body) / 1024, 1)}
+        for name, pipeline in PIPELINES.items():
+            row[f"{name}_cpu_ms"] = round(cpu_per_request(pipeline, body) * 1000, 4)
+        row["speedup_passthrough_vs_stdlib"] = round(row["stdlib_cpu_ms"] / row["passthrough_cpu_ms"], 1)
+        results.append(row)
+    return {"benchmark": "serialization", "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+    emit(run(args.sizes))
+
+
+if __name__ == "__main__":
+    main()
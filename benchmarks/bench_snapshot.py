@@ -0,0 +1,111 @@
+"""Worker startup: building the search index versus mapping a snapshot.
+
+Without snapshots every worker (and every restart) reads the whole catalog
+from SQLite and builds its own index. With them the writer publishes one
+binary snapshot and the workers ``mmap`` it. Reports the time until a worker
+can answer queries, the Python heap each approach keeps per worker, snapshot
+size and write time, and query latency on both indexes.
+
+    python -m benchmarks.bench_snapshot --stations 50000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.common import emit, latency_summary
+from benchmarks.stub_upstream import synthetic_stations
+from radio.catalog import StationCatalog
+from radio.query import StationQuery
+from radio.search_index import SearchIndex
+from radio.snapshot import load_snapshot, write_snapshot
+
+QUERIES = {
+    "popular": StationQuery(limit=50),
+    "by_tag": StationQuery(tag="jazz", limit=100),
+    "name_prefix": StationQuery(name="smo", limit=50),
+}
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def heap_kept(fn, *args):
+    """``fn(*args)`` and the Python heap its result keeps alive, in MiB."""
+    tracemalloc.start()
+    try:
+        result = fn(*args)
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, round(current / 2**20, 1)
+
+
+def query_latency(index: SearchIndex, iterations: int) -> dict:
+    results = {}
+    for label, query in QUERIES.items():
+        index.search(query)
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            index.search(query)
+            samples.append(time.perf_counter() - start)
+        results[label] = latency_summary(samples)
+    return results
+
+
+def run(count: int, loads: int, iterations: int) -> dict:
+    stations = synthetic_stations(count)
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = StationCatalog(f"sqlite:///{os.path.join(tmp, 'catalog.db')}")
+        catalog._replace_all({"stations": stations, "countries": [], "languages": [], "tags": []})
+        rows, read_seconds = timed(catalog.all_stations)
+        built, build_seconds = timed(SearchIndex, rows, 1)
+        _, built_heap = heap_kept(SearchIndex, rows, 1)
+        del rows
+
+        path = os.path.join(tmp, "index.snap")
+        size, write_seconds = timed(write_snapshot, built, path, 1)
+        load_seconds = []
+        for _ in range(loads):
+            (mapped, _), seconds = timed(load_snapshot, path)
+            load_seconds.append(seconds)
+        (_, _), mapped_heap = heap_kept(load_snapshot, path)
+        first_query = timed(mapped.search, StationQuery(tag="rock", limit=50))[1]
+
+        return {
+            "benchmark": "index_snapshot",
+            "stations": count,
+            "before_build_per_worker": {
+                "startup_ms": round((read_seconds + build_seconds) * 1000, 1),
+                "sqlite_read_ms": round(read_seconds * 1000, 1),
+                "index_build_ms": round(build_seconds * 1000, 1),
+                "heap_mib_per_worker": built_heap,
+                "queries": query_latency(built, iterations),
+            },
+            "after_mmap_snapshot": {
+                "startup_ms": round(min(load_seconds) * 1000, 3),
+                "first_query_ms": round(first_query * 1000, 3),
+                "heap_mib_per_worker": mapped_heap,
+                "snapshot_mib": round(size / 2**20, 1),
+                "snapshot_write_ms": round(write_seconds * 1000, 1),
+                "queries": query_latency(mapped, iterations),
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stations", type=int, default=50000)
+    parser.add_argument("--loads", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=300)
+    args = parser.parse_args()
+    emit(run(args.stations, args.loads, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Per-call ``httpx.AsyncClient`` versus the shared pooled ``UpstreamClient``.
+
+Reports TCP connections (handshakes) per request and p50/p99 latency against
+a local stub mirror.
+
+    python -m benchmarks.bench_upstream_pool --requests 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.common import emit, latency_summary
+from benchmarks.stub_upstream import StubUpstream
+from radio.upstream import UpstreamClient
+
+PARAMS = {"limit": 50, "order": "clickcount", "reverse": "true", "hidebroken": "true"}
+
+
+async def _drive(fetch, total: int, concurrency: int) -> list:
+    latencies = []
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with gate:
+            start = time.perf_counter()
+            response = await fetch()
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies
+
+
+async def run(total: int, concurrency: int, latency: float) -> dict:
+    results = {}
+    async with StubUpstream(latency=latency) as stub:
+        url = f"{stub.url}/json/stations/search"
+
+        async def per_call():
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                return await client.get(url, params=PARAMS)
+
+        stub.reset_counters()
+        samples = await _drive(per_call, total, concurrency)
+        results["before_per_call_client"] = {
+            "handshakes_per_request": round(stub.connections / stub.requests, 3),
+            **latency_summary(samples),
+        }
+
+        pooled = UpstreamClient(per_host_connections=concurrency)
+        await pooled.start()
+        try:
+            stub.reset_counters()
+            samples = await _drive(lambda: pooled.get(url, params=PARAMS), total, concurrency)
+        finally:
+            await pooled.aclose()
+        results["after_pooled_client"] = {
+            "handshakes_per_request": round(stub.connections / stub.requests, 3),
+            **latency_summary(samples),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="stub latency in seconds")
+    args = parser.parse_args()
+    emit(asyncio.run(run(args.requests, args.concurrency, args.latency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""A minimal shared HTTP cache in front of the app, for tests and benchmarks.
+
+Behaves like nginx with ``proxy_cache`` + ``proxy_cache_revalidate``: fresh
+responses (per ``Cache-Control: max-age``) are answered without contacting
+the app, stale ones are revalidated with ``If-None-Match`` /
+``If-Modified-Since``, and ``no-store`` responses are never kept. It counts
+what actually reaches the Python process.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+import httpx
+
+
+def max_age(cache_control: str) -> Optional[int]:
+    directives = [d.strip() for d in cache_control.split(",")]
+    if "no-store" in directives or "private" in directives:
+        return None
+    for directive in directives:
+        if directive.startswith("max-age="):
+            return int(directive.split("=", 1)[1])
+    return None
+
+
+@dataclass
+class Entry:
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    stored_at: float
+    ttl: int
+
+
+@dataclass
+class ProxyStats:
+    requests: int = 0
+    hits: int = 0
+    revalidated: int = 0
+    upstream_requests: int = 0
+    upstream_bytes: int = 0
+    not_modified: int = 0
+    by_status: Dict[int, int] = field(default_factory=dict)
+
+
+class CachingProxy:
+    """Wraps an ``httpx.AsyncClient`` talking to the app."""
+
+    def __init__(self, client: httpx.AsyncClient, clock: Callable[[], float] = time.monotonic):
+        self.client = client
+        self.clock = clock
+        self.entries: Dict[str, Entry] = {}
+        self.stats = ProxyStats()
+
+    async def get(self, url: str, params: Optional[dict] = None) -> Entry:
+        self.stats.requests += 1
+        key = str(httpx.URL(url, params=params))
+        entry = self.entries.get(key)
+        now = self.clock()
+        if entry is not None and now - entry.stored_at < entry.ttl:
+            self.stats.hits += 1
+            return entry
+        headers = {"Accept-Encoding": "identity"}
+        if entry is not None:
+            if "etag" in entry.headers:
+                headers["If-None-Match"] = entry.headers["etag"]
+            if "last-modified" in entry.headers:
+                headers["If-Modified-Since"] = entry.headers["last-modified"]
+        response = await self.client.get(url, params=params, headers=headers)
+        self.stats.upstream_requests += 1
+        self.stats.upstream_bytes += len(response.content)
+        self.stats.by_status[response.status_code] = self.stats.by_status.get(response.status_code, 0) + 1
+        if response.status_code == 304 and entry is not None:
+            self.stats.not_modified += 1
+            self.stats.revalidated += 1
+            entry.stored_at = now
+            ttl = max_age(response.headers.get("cache-control", ""))
+            if ttl is not None:
+                entry.ttl = ttl
+            return entry
+        fresh = Entry(response.status_code, dict(response.headers), response.content, now, 0)
+        ttl = max_age(response.headers.get("cache-control", ""))
+        if response.status_code == 200 and ttl is not None:
+            fresh.ttl = ttl
+            self.entries[key] = fresh
+        return fresh
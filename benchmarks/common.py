@@ -0,0 +1,78 @@
+"""Small helpers shared by the benchmark scripts."""
+import json
+import math
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Iterable, List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples`` (``pct`` in 0..100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(samples: Iterable[float]) -> dict:
+    """p50/p95/p99 in milliseconds for latencies given in seconds."""
+    samples = list(samples)
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+    }
+
+
+def emit(results: dict):
+    print(json.dumps(results, indent=2))
+
+
+@asynccontextmanager
+async def app_client(stub, **overrides):
+    """The FastAPI app (with lifespan) pointed at ``stub``, via an in-process client."""
+    import httpx
+    import server
+    from radio.admission import Admission, ClientIdentity
+    from radio.aggregates import AggregateStore
+    from radio.cache import TieredCache
+    from radio.clicks import ClickReporter
+    from radio.health import StreamHealthStore
+    from radio.mirrors import MirrorPool
+    from radio.prewarm import Prewarmer
+    from radio.prober import StreamProber
+    from radio.similar import SimilarStations
+    from radio.workers import Warmup, WriterLock
+
+    state = {
+        "mirrors": MirrorPool([stub.url]),
+        "cache": TieredCache(),
+        "catalog": None,
+        "search_index": None,
+        "index_snapshots": OrderedDict(),
+        "snapshots": None,
+        "similar": SimilarStations(),
+        "geo_index": None,
+        "clicks": ClickReporter(server.report_click),
+        "aggregates": AggregateStore(server.fetch_aggregate),
+        "health_store": StreamHealthStore(),
+        # The stub streams listen on loopback.
+        "prober": StreamProber(allow_private=True),
+        "writer_lock": WriterLock(),
+        # Unlimited: benchmarks measure the app, not its admission limits.
+        "admission": Admission(),
+        "client_identity": ClientIdentity(),
+        # No warm-up traffic to the stub unless a caller passes loaders.
+        "warmup": Warmup({}),
+    }
+    state.update(overrides)
+    # Bound to whichever cache this run uses.
+    state.setdefault("prewarmer", Prewarmer(state["cache"]))
+    for name, value in state.items():
+        setattr(server, name, value)
+    async with server.app.router.lifespan_context(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client
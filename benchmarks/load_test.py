@@ -0,0 +1,253 @@
+"""Concurrent load test of every API route.
+
+Boots the app in-process against a stub radio-browser (configurable latency,
+error rate and catalog size) and a stub stream server, then drives each route
+with ``--requests`` calls at ``--concurrency`` and reports throughput,
+p50/p95/p99 latency, status counts and memory allocated per request as JSON.
+With ``--base-url`` the same mix is driven against a running deployment
+instead (allocations are then not measured).
+
+In-process the client shares the event loop with the app, so the RPS figures
+include client overhead; compare runs with each other, not with production.
+Exits non-zero when a route's failure rate exceeds ``--max-error-rate``.
+
+    python -m benchmarks.load_test --requests 200 --concurrency 20
+    python -m benchmarks.load_test --latency 0.05 --error-rate 0.05 --max-error-rate 0.1
+    python -m benchmarks.load_test --base-url http://localhost:8001 --routes popular,countries
+"""
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import httpx
+
+from benchmarks.common import app_client, emit, latency_summary, percentile
+from benchmarks.stub_streams import StubStreamServer
+from benchmarks.stub_upstream import StubUpstream, synthetic_stations
+
+# uuids per batch-lookup request, like hydrating a favorites list
+BATCH_SIZE = 50
+
+
+@dataclass
+class Route:
+    name: str
+    path: str
+    params: Dict[str, str] = field(default_factory=dict)
+    method: str = "GET"
+    key: Optional[str] = None  # top-level key the JSON body must have
+    json: Optional[dict] = None  # request body
+
+
+def routes(station_uuid: str, limit: int, batch: Sequence[str] = ()) -> List[Route]:
+    """The request mix: one entry per API route. ``batch`` are the uuids
+    hydrated by the batch route (default: just ``station_uuid``)."""
+    lists = {"limit": str(limit)}
+    return [
+        Route("root", "/", key="message"),
+        Route("popular", "/api/stations/popular", lists, key="stations"),
+        Route("popular_mobile", "/api/stations/popular", {**lists, "fields": "stationuuid,name,url_resolved"}, key="stations"),
+        Route("by_country", "/api/stations/by-country/US", lists, key="stations"),
+        Route("by_tag", "/api/stations/by-tag/rock", lists, key="stations"),
+        Route("by_genre", "/api/stations/by-genre", {**lists, "genre": "rock"}, key="stations"),
+        Route("by_genre_multi", "/api/stations/by-genre", {**lists, "genre": "electronic"}, key="stations"),
+        Route("christian", "/api/stations/christian", lists, key="stations"),
+        Route("search", "/api/stations/search", {**lists, "name": "radio"}, key="stations"),
+        Route("nearby", "/api/stations/nearby", {**lists, "lat": "48.85", "lon": "2.35", "radius": "1000"}, key="stations"),
+        Route("nearest", "/api/stations/nearby", {**lists, "lat": "40.71", "lon": "-74.0"}, key="stations"),
+        Route("countries", "/api/countries", key="countries"),
+        Route("languages", "/api/languages", key="languages"),
+        Route("tags", "/api/tags", {"limit": "100"}, key="tags"),
+        Route("genres", "/api/genres", key="genres"),
+        Route("station", f"/api/station/{station_uuid}", key="station"),
+        Route("stations_batch", "/api/stations/batch", method="POST", key="stations",
+              json={"uuids": list(batch) or [station_uuid]}),
+        Route("station_stream", f"/api/station/{station_uuid}/stream", key="stream"),
+        Route("station_similar", f"/api/station/{station_uuid}/similar", {"limit": "20"}, key="stations"),
+        Route("station_clicks", f"/api/station/{station_uuid}/clicks", key="clicks"),
+        Route("click", f"/api/station/{station_uuid}/click", method="POST", key="success"),
+        Route("click_stats", "/api/clicks/stats", key="clicks"),
+        Route("mirrors", "/api/mirrors"),
+        Route("catalog_status", "/api/catalog/status", key="catalog"),
+        Route("cache_stats", "/api/cache/stats", key="cache"),
+        Route("aggregates_status", "/api/aggregates/status"),
+        Route("streams_status", "/api/streams/status", key="prober"),
+        Route("similar_status", "/api/similar/status", key="similar"),
+        Route("admission_status", "/api/admission/status", key="concurrency"),
+        Route("metrics", "/metrics"),
+        Route("ready", "/api/ready", key="ready"),
+    ]
+
+
+def check(route: Route, response: httpx.Response) -> Optional[str]:
+    """Why ``response`` is a failure, or ``None``."""
+    if response.status_code >= 400:
+        return f"HTTP {response.status_code}"
+    if route.key is not None and route.key not in response.json():
+        return f"missing {route.key!r}"
+    return None
+
+
+async def drive(client: httpx.AsyncClient, route: Route, total: int, concurrency: int) -> dict:
+    """``total`` calls of ``route``, at most ``concurrency`` in flight."""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    failures: Counter = Counter()
+    gate = asyncio.Semaphore(concurrency)
+    # Validate the body of the first response only, to keep the client cheap.
+    validated = False
+
+    async def one():
+        nonlocal validated
+        async with gate:
+            start = time.perf_counter()
+            try:
+                response = await client.request(route.method, route.path, params=route.params, json=route.json)
+            except httpx.HTTPError as e:
+                failures[type(e).__name__] += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            statuses[str(response.status_code)] += 1
+            if response.status_code >= 400:
+                failures[f"HTTP {response.status_code}"] += 1
+            elif not validated:
+                validated = True
+                problem = check(route, response)
+                if problem:
+                    failures[problem] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    return {
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        **latency_summary(latencies),
+        "status": dict(statuses),
+        "failures": sum(failures.values()),
+        "failure_reasons": dict(failures),
+        "error_rate": round(sum(failures.values()) / total, 4) if total else 0.0,
+    }
+
+
+async def allocations(client: httpx.AsyncClient, route: Route, samples: int) -> dict:
+    """Peak Python memory allocated while serving one request (tracemalloc),
+    measured sequentially after the timed run so tracing does not skew it."""
+    peaks = []
+    blocks = []
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            blocks_before = sys.getallocatedblocks()
+            await client.request(route.method, route.path, params=route.params, json=route.json)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            blocks.append(sys.getallocatedblocks() - blocks_before)
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_peak_kib_p50": round(percentile(peaks, 50) / 1024, 1),
+        "alloc_peak_kib_p95": round(percentile(peaks, 95) / 1024, 1),
+        "retained_blocks_p50": percentile(blocks, 50),
+    }
+
+
+async def run_routes(
+    client: httpx.AsyncClient,
+    mix: Sequence[Route],
+    total: int,
+    concurrency: int,
+    alloc_samples: int = 0,
+) -> dict:
+    results = {}
+    for route in mix:
+        # One warm-up call so cold caches do not dominate short runs.
+        await client.request(route.method, route.path, params=route.params, json=route.json)
+        results[route.name] = await drive(client, route, total, concurrency)
+        if alloc_samples:
+            results[route.name].update(await allocations(client, route, alloc_samples))
+    return results
+
+
+@asynccontextmanager
+async def in_process_client(stations: int, latency: float, error_rate: float, seed: int):
+    """The app against stub upstream and stream servers; yields ``(client, station_uuids)``."""
+    async with StubStreamServer() as streams, StubUpstream(
+        synthetic_stations(stations, seed), latency=latency, error_rate=error_rate, seed=seed
+    ) as stub:
+        streams.stream("/live", headers={"icy-br": "128"})
+        for station in stub.stations:
+            station["url_resolved"] = f"{streams.url}/live"
+        async with app_client(stub) as client:
+            yield client, [s["stationuuid"] for s in stub.stations[:BATCH_SIZE]]
+
+
+@asynccontextmanager
+async def remote_client(base_url: str):
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        response = await client.get("/api/stations/popular", params={"limit": BATCH_SIZE, "fields": "stationuuid"})
+        response.raise_for_status()
+        yield client, [s["stationuuid"] for s in response.json()["stations"]]
+
+
+async def run(args: argparse.Namespace) -> dict:
+    if args.base_url:
+        target = remote_client(args.base_url)
+        alloc_samples = 0
+    else:
+        target = in_process_client(args.stations, args.latency, args.error_rate, args.seed)
+        alloc_samples = args.alloc_samples
+    async with target as (client, station_uuids):
+        mix = routes(station_uuids[0], args.limit, station_uuids)
+        if args.routes:
+            wanted = set(args.routes.split(","))
+            mix = [route for route in mix if route.name in wanted]
+        results = await run_routes(client, mix, args.requests, args.concurrency, alloc_samples)
+    return {
+        "benchmark": "load_test",
+        "target": args.base_url or "in-process",
+        "config": {
+            "requests_per_route": args.requests,
+            "concurrency": args.concurrency,
+            "limit": args.limit,
+            **({} if args.base_url else {
+                "stub_stations": args.stations,
+                "stub_latency_s": args.latency,
+                "stub_error_rate": args.error_rate,
+            }),
+        },
+        "routes": results,
+        "failed_routes": sorted(name for name, r in results.items() if r["error_rate"] > args.max_error_rate),
+    }
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=50, help="limit= on station list routes")
+    parser.add_argument("--routes", help="comma-separated route names (default: all)")
+    parser.add_argument("--base-url", help="drive a running deployment instead of the in-process app")
+    parser.add_argument("--stations", type=int, default=2000, help="stub catalog size")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="stub 503 probability")
+    parser.add_argument("--alloc-samples", type=int, default=20, help="requests per route traced for allocations")
+    parser.add_argument("--max-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def main():
+    results = asyncio.run(run(parser().parse_args()))
+    emit(results)
+    sys.exit(1 if results["failed_routes"] else 0)
+
+
+if __name__ == "__main__":
+    main()
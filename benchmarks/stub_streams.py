@@ -0,0 +1,94 @@
+"""In-process fake internet-radio servers for the stream prober.
+
+Serves endless ICY/HTTP audio streams, .pls/.m3u playlists and HLS
+playlists from one asyncio server. Everything is registered per path, so a
+test can lay out exactly the redirect chain it wants to probe.
+"""
+import asyncio
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+AUDIO_CHUNK = b"\xff\xfb\x90\x00" * 256
+
+
+class StubStreamServer:
+    def __init__(self, host: str = "127.0.0.1"):
+        self.host = host
+        self.port = 0
+        self.paths: Counter = Counter()
+        self.methods: Counter = Counter()
+        self._routes: Dict[str, Tuple[int, Dict[str, str], Optional[bytes], float]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: set = set()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def stream(self, path: str, content_type: str = "audio/mpeg", headers: Optional[Dict[str, str]] = None,
+               first_byte_delay: float = 0.0):
+        """An endless audio stream at ``path`` (ICY headers go in ``headers``)."""
+        self._routes[path] = (200, {"Content-Type": content_type, **(headers or {})}, None, first_byte_delay)
+
+    def file(self, path: str, body: str, content_type: str = "text/plain", status: int = 200):
+        """A fixed body, e.g. a playlist; ``{base}`` is replaced by the server URL."""
+        self._routes[path] = (status, {"Content-Type": content_type}, body.encode(), 0.0)
+
+    async def start(self) -> "StubStreamServer":
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writers.add(writer)
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            method, target, _ = head.decode("latin-1").split("\r\n", 1)[0].split(" ", 2)
+            path = target.split("?", 1)[0]
+            self.paths[path] += 1
+            self.methods[method] += 1
+            route = self._routes.get(path)
+            if route is None:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                await writer.drain()
+                return
+            status, headers, body, delay = route
+            if delay:
+                await asyncio.sleep(delay)
+            lines = [f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}"]
+            lines += [f"{k}: {v}" for k, v in headers.items()]
+            if body is not None:
+                body = body.replace(b"{base}", self.url.encode())
+                lines.append(f"Content-Length: {len(body)}")
+            lines.append("Connection: close")
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+            if method == "HEAD":
+                await writer.drain()
+                return
+            if body is not None:
+                writer.write(body)
+                await writer.drain()
+                return
+            while True:
+                writer.write(AUDIO_CHUNK)
+                await writer.drain()
+                await asyncio.sleep(0.01)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
@@ -0,0 +1,254 @@
+"""Local stand-in for a radio-browser mirror.
+
+A tiny keep-alive HTTP/1.1 server built on ``asyncio.start_server`` that
+serves synthetic station data under the same ``/json/...`` paths as the real
+API. It counts TCP connections and requests so benchmarks can report
+handshakes per request, and it can inject latency and failures.
+"""
+import asyncio
+import json
+import math
+import random
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+Handler = Callable[[str, Dict[str, str]], Tuple[int, bytes]]
+
+COUNTRIES = [
+    ("US", "The United States Of America", "english"),
+    ("DE", "Germany", "german"),
+    ("FR", "France", "french"),
+    ("GB", "The United Kingdom Of Great Britain And Northern Ireland", "english"),
+    ("ES", "Spain", "spanish"),
+    ("BR", "Brazil", "portuguese"),
+    ("IT", "Italy", "italian"),
+    ("NL", "The Netherlands", "dutch"),
+    ("MX", "Mexico", "spanish"),
+    ("CA", "Canada", "english"),
+]
+TAGS = [
+    "rock", "pop", "jazz", "classical", "country", "hip hop", "rap", "electronic",
+    "dance", "techno", "house", "blues", "reggae", "folk", "metal", "punk",
+    "alternative", "indie", "soul", "r&b", "funk", "latin", "salsa", "ambient",
+    "chillout", "news", "talk", "sports", "christian", "gospel", "religious",
+    "christian music", "christian rock", "christian pop", "world music", "oldies",
+]
+CODECS = [("MP3", 128), ("AAC", 64), ("AAC+", 48), ("OGG", 96), ("MP3", 320)]
+NAME_WORDS = [
+    "Radio", "FM", "Classic", "Hits", "Smooth", "Jazz", "Rock", "Nova", "Sky",
+    "City", "Wave", "Sound", "Live", "Soul", "Beat", "Gold", "Star", "Pulse",
+]
+
+
+def synthetic_stations(count: int, seed: int = 0) -> List[dict]:
+    """Deterministic stations shaped like radio-browser's ``stations/search``."""
+    rng = random.Random(seed)
+    stations = []
+    for i in range(count):
+        code, country, language = COUNTRIES[i % len(COUNTRIES)]
+        codec, bitrate = CODECS[rng.randrange(len(CODECS))]
+        tags = rng.sample(TAGS, rng.randint(1, 4))
+        name = " ".join(rng.sample(NAME_WORDS, 2)) + f" {i}"
+        stations.append({
+            "changeuuid": f"c{i:07d}-0000-4000-8000-000000000000",
+            "stationuuid": f"{i:08d}-0000-4000-8000-000000000000",
+            "name": name,
+            "url": f"http://stream.example.com/{i}",
+            "url_resolved": f"http://stream.example.com/{i}.mp3",
+            "homepage": f"http://station{i}.example.com/",
+            "favicon": "",
+            "tags": ",".join(tags),
+            "country": country,
+            "countrycode": code,
+            "state": "",
+            "language": language,
+            "languagecodes": "",
+            "votes": rng.randint(0, 5000),
+            "lastchangetime": f"2024-01-{1 + i % 28:02d} 12:00:00",
+            "codec": codec,
+            "bitrate": bitrate,
+            "hls": 0,
+            "lastcheckok": 1,
+            "lastchecktime": "2024-02-01 00:00:00",
+            "clickcount": rng.randint(0, 20000),
+            "clicktrend": rng.randint(-50, 50),
+            "geo_lat": round(rng.uniform(-60, 70), 5),
+            "geo_long": round(rng.uniform(-170, 170), 5),
+        })
+    return stations
+
+
+def _distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371008.8 * math.asin(math.sqrt(min(a, 1.0)))
+
+
+class StubUpstream:
+    """In-process fake radio-browser mirror.
+
+    ``latency`` (seconds) is added to every response and ``error_rate`` is the
+    probability of answering with a 503. Extra paths can be served by
+    registering a handler with :meth:`route`.
+    """
+
+    def __init__(
+        self,
+        stations: Optional[List[dict]] = None,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        host: str = "127.0.0.1",
+        seed: int = 0,
+    ):
+        self.stations = stations if stations is not None else synthetic_stations(200, seed)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.host = host
+        self.port = 0
+        self.connections = 0
+        self.requests = 0
+        self.paths: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: set = set()
+        self._routes: Dict[str, Handler] = {}
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def reset_counters(self):
+        self.connections = 0
+        self.requests = 0
+        self.paths.clear()
+
+    def route(self, path: str, handler: Handler):
+        """Serve ``path`` (exact match, without query) with ``handler``."""
+        self._routes[path] = handler
+
+    async def start(self) -> "StubUpstream":
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, target, _ = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self._respond(method, target, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # Client hung up, or the loop is shutting down with the
+            # connection still parked in keep-alive.
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _respond(self, method: str, target: str, body: bytes) -> Tuple[int, bytes]:
+        self.requests += 1
+        parts = urlsplit(target)
+        path = unquote(parts.path)
+        self.paths[path] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            return 503, b'{"error": "injected failure"}'
+        params = dict(parse_qsl(parts.query))
+        if method == "POST" and body:
+            params.update(parse_qsl(body.decode()))
+        handler = self._routes.get(path)
+        if handler is not None:
+            return handler(path, params)
+        return self._default(path, params)
+
+    def _default(self, path: str, params: Dict[str, str]) -> Tuple[int, bytes]:
+        if path == "/json/stations/search":
+            return 200, json.dumps(self._search(params)).encode()
+        if path == "/json/stations/byuuid":
+            wanted = set((params.get("uuids") or params.get("uuid") or "").split(","))
+            found = [s for s in self.stations if s["stationuuid"] in wanted]
+            return 200, json.dumps(found).encode()
+        if path in ("/json/countries", "/json/languages", "/json/tags"):
+            return 200, json.dumps(self._aggregate(path.rsplit("/", 1)[1])).encode()
+        if path.startswith("/json/url/"):
+            return 200, json.dumps({"ok": True, "message": "retrieved station url"}).encode()
+        if path == "/json/stations":
+            return 200, json.dumps(self.stations).encode()
+        return 404, b'{"error": "not found"}'
+
+    def _search(self, params: Dict[str, str]) -> List[dict]:
+        result = self.stations
+        if params.get("countrycode"):
+            code = params["countrycode"].upper()
+            result = [s for s in result if s["countrycode"] == code]
+        if params.get("tag"):
+            tag = params["tag"].lower()
+            result = [s for s in result if tag in s["tags"].split(",")]
+        if params.get("name"):
+            name = params["name"].lower()
+            result = [s for s in result if name in s["name"].lower()]
+        if params.get("language"):
+            language = params["language"].lower()
+            result = [s for s in result if s["language"] == language]
+        if params.get("geo_distance"):
+            lat, lon = float(params["geo_lat"]), float(params["geo_long"])
+            metres = float(params["geo_distance"])
+            result = [s for s in result if _distance_m(lat, lon, s["geo_lat"], s["geo_long"]) <= metres]
+        order = {"changetimestamp": "lastchangetime"}.get(params.get("order"), params.get("order"))
+        if order in ("clickcount", "votes", "bitrate", "lastchangetime"):
+            result = sorted(result, key=lambda s: s[order], reverse=params.get("reverse") == "true")
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", 100000))
+        return result[offset:offset + limit]
+
+    def _aggregate(self, kind: str) -> List[dict]:
+        counts: Counter = Counter()
+        names: Dict[str, str] = {}
+        for station in self.stations:
+            if kind == "tags":
+                counts.update(station["tags"].split(","))
+            elif kind == "languages":
+                counts[station["language"]] += 1
+            else:
+                counts[station["countrycode"]] += 1
+                names[station["countrycode"]] = station["country"]
+        if kind == "countries":
+            return [{"name": names[c], "iso_3166_1": c, "stationcount": n} for c, n in counts.items()]
+        return [{"name": name, "stationcount": n} for name, n in counts.items()]
@@ -5,20 +5,40 @@ set -e
 cd /backend || { echo "Backend directory not found"; exit 1; }
 
 echo "Starting FastAPI backend"
-# Start Uvicorn with proper host binding
-uvicorn server:app --host 0.0.0.0 --port 8001 &
+# Production mode: gunicorn with one uvicorn worker per CPU (RADIO_WORKERS
+# overrides); RADIO_WORKERS=1 runs a single uvicorn process instead.
+if [ "${RADIO_WORKERS:-0}" != "1" ] && command -v gunicorn >/dev/null 2>&1; then
+    gunicorn -c gunicorn.conf.py server:app &
+else
+    uvicorn server:app --host 0.0.0.0 --port 8001 &
+fi
 BACKEND_PID=$!
 
-echo "Waiting for backend to start..."
-sleep 30
+# Wait until every backend worker reports warm caches (popular, countries, genres),
+# giving up on readiness after READY_TIMEOUT seconds
+echo "Waiting for backend readiness..."
+READY_TIMEOUT=${READY_TIMEOUT:-120}
+waited=0
+until wget -q -O /dev/null http://127.0.0.1:8001/api/ready 2>/dev/null; do
+    if ! kill -0 $BACKEND_PID 2>/dev/null; then
+        echo "Backend failed to start at initialization, exiting"
+        exit 1
+    fi
+    if [ "$waited" -ge "$READY_TIMEOUT" ]; then
+        echo "Backend not ready after ${READY_TIMEOUT}s, starting nginx anyway"
+        break
+    fi
+    sleep 1
+    waited=$((waited + 1))
+done
 
-if ! kill -0 $BACKEND_PID 2>/dev/null; then
-    echo "Backend failed to start at initialization, exiting"
-    exit 1
+# Start Nginx (NGINX_PROXY_CACHE=1 puts a shared response cache in front of /api)
+NGINX_CONF=/etc/nginx/nginx.conf
+if [ "${NGINX_PROXY_CACHE:-0}" = "1" ]; then
+    NGINX_CONF=/etc/nginx/nginx.proxy-cache.conf
+    mkdir -p /var/cache/nginx/api
 fi
-
-# Start Nginx
-nginx -g 'daemon off;' &
+nginx -c "$NGINX_CONF" -g 'daemon off;' &
 NGINX_PID=$!
 
 # Handle termination signals
@@ -13,7 +13,7 @@ import StationCard from '../components/StationCard';
 import LoadingSpinner from '../components/LoadingSpinner';
 import {AudioContext} from '../context/AudioContext';
 import {ThemeContext} from '../context/ThemeContext';
-import {getFavorites} from '../services/StorageService';
+import {getFavorites, refreshFavorites} from '../services/StorageService';
 
 const FavoritesScreen = () => {
   const [favorites, setFavorites] = useState([]);
@@ -29,8 +29,10 @@ const FavoritesScreen = () => {
 
   const loadFavorites = async () => {
     try {
-      const favoriteStations = await getFavorites();
-      setFavorites(favoriteStations);
+      setFavorites(await getFavorites());
+      setLoading(false);
+      // Then update names, logos and stream URLs in one batch request
+      setFavorites(await refreshFavorites());
     } catch (error) {
       console.error('Error loading favorites:', error);
       Alert.alert('Error', 'Failed to load favorite stations');
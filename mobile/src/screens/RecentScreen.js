@@ -14,7 +14,7 @@ import StationCard from '../components/StationCard';
 import LoadingSpinner from '../components/LoadingSpinner';
 import {AudioContext} from '../context/AudioContext';
 import {ThemeContext} from '../context/ThemeContext';
-import {getRecentlyPlayed, clearRecentlyPlayed} from '../services/StorageService';
+import {getRecentlyPlayed, refreshRecentlyPlayed, clearRecentlyPlayed} from '../services/StorageService';
 
 const RecentScreen = () => {
   const [recentStations, setRecentStations] = useState([]);
@@ -30,8 +30,10 @@ const RecentScreen = () => {
 
   const loadRecentStations = async () => {
     try {
-      const recent = await getRecentlyPlayed();
-      setRecentStations(recent);
+      setRecentStations(await getRecentlyPlayed());
+      setLoading(false);
+      // Then update names, logos and stream URLs in one batch request
+      setRecentStations(await refreshRecentlyPlayed());
     } catch (error) {
       console.error('Error loading recent stations:', error);
       Alert.alert('Error', 'Failed to load recently played stations');
@@ -3,6 +3,15 @@ import axios from 'axios';
 // Replace with your actual backend URL
 const BASE_URL = 'https://d6033a80-baff-4b32-ac10-3c352226a0b4.preview.emergentagent.com';
 
+// Station fields the app renders; list endpoints return only these.
+const STATION_FIELDS = 'stationuuid,name,url,url_resolved,favicon,homepage,tags,country,countrycode,language,codec,bitrate,hls,votes,clickcount';
+
+// Most uuids the backend accepts in one batch lookup.
+const BATCH_MAX = 200;
+
+// Playback should not wait long on stream resolution; the listed URL is the fallback.
+const STREAM_RESOLVE_TIMEOUT = 3000;
+
 const apiClient = axios.create({
   baseURL: BASE_URL,
   timeout: 10000,
@@ -48,7 +57,7 @@ const ApiService = {
   getPopularStations: async (limit = 50) => {
     try {
       const response = await apiClient.get('/api/stations/popular', {
-        params: { limit }
+        params: { limit, fields: STATION_FIELDS }
       });
       return response.data;
     } catch (error) {
@@ -61,7 +70,7 @@ const ApiService = {
   getChristianStations: async (limit = 100) => {
     try {
       const response = await apiClient.get('/api/stations/christian', {
-        params: { limit }
+        params: { limit, fields: STATION_FIELDS }
       });
       return response.data;
     } catch (error) {
@@ -74,7 +83,7 @@ const ApiService = {
   getStationsByCountry: async (countryCode, limit = 100) => {
     try {
       const response = await apiClient.get(`/api/stations/by-country/${countryCode}`, {
-        params: { limit }
+        params: { limit, fields: STATION_FIELDS }
       });
       return response.data;
     } catch (error) {
@@ -87,7 +96,7 @@ const ApiService = {
   getStationsByGenre: async (genre, limit = 50) => {
     try {
       const response = await apiClient.get('/api/stations/by-genre', {
-        params: { genre, limit }
+        params: { genre, limit, fields: STATION_FIELDS }
       });
       return response.data;
     } catch (error) {
@@ -100,7 +109,7 @@ const ApiService = {
   searchStations: async (query, limit = 50) => {
     try {
       const response = await apiClient.get('/api/stations/search', {
-        params: { name: query, limit }
+        params: { name: query, limit, fields: STATION_FIELDS }
       });
       return response.data;
     } catch (error) {
@@ -142,6 +151,35 @@ const ApiService = {
     }
   },
 
+  // Get many stations in input order (null where a station no longer exists)
+  getStationsBatch: async (stationUuids) => {
+    try {
+      const stations = [];
+      for (let i = 0; i < stationUuids.length; i += BATCH_MAX) {
+        const response = await apiClient.post('/api/stations/batch',
+          {uuids: stationUuids.slice(i, i + BATCH_MAX)},
+          {params: {fields: STATION_FIELDS}}
+        );
+        stations.push(...response.data.stations);
+      }
+      return stations;
+    } catch (error) {
+      console.error('Error fetching stations batch:', error);
+      throw error;
+    }
+  },
+
+  // Resolve a station's playlist to a playable stream URL (followed server-side)
+  getStationStream: async (stationUuid, timeout = STREAM_RESOLVE_TIMEOUT) => {
+    try {
+      const response = await apiClient.get(`/api/station/${stationUuid}/stream`, {timeout});
+      return response.data.stream;
+    } catch (error) {
+      console.error('Error resolving station stream:', error);
+      throw error;
+    }
+  },
+
   // Register station click
   clickStation: async (stationUuid) => {
     try {
@@ -4,8 +4,27 @@ import TrackPlayer, {
   RepeatMode,
   State,
 } from 'react-native-track-player';
+import ApiService from './ApiService';
 import {addToRecentlyPlayed} from './StorageService';
 
+// Playlist (.pls/.m3u/.m3u8) URLs need resolving; anything else plays as listed.
+const PLAYLIST_URL = /\.(pls|m3u8?)(\?|#|$)/i;
+
+// Playable URL for a station: resolved by the API for playlists, else (or if
+// the API is slow or unreachable) the listed URL.
+const resolveStream = async (station) => {
+  const fallback = {url: station.url_resolved || station.url, hls: false};
+  if (!station.hls && !PLAYLIST_URL.test(fallback.url || '')) {
+    return fallback;
+  }
+  try {
+    const stream = await ApiService.getStationStream(station.stationuuid);
+    return stream && stream.url ? stream : fallback;
+  } catch (error) {
+    return fallback;
+  }
+};
+
 export const setupPlayer = async () => {
   try {
     // Setup the player
@@ -45,12 +64,16 @@ export const playRadioStation = async (station) => {
     // Stop current playback
     await TrackPlayer.reset();
 
+    const stream = await resolveStream(station);
+    const bitrate = stream.bitrate || station.bitrate;
+
     // Create track object
     const track = {
       id: station.stationuuid,
-      url: station.url_resolved || station.url,
+      url: stream.url,
+      type: stream.hls ? 'hls' : 'default',
       title: station.name,
-      artist: `${station.country} • ${station.bitrate ? station.bitrate + ' kbps' : 'Unknown bitrate'}`,
+      artist: `${station.country} • ${bitrate ? bitrate + ' kbps' : 'Unknown bitrate'}`,
       artwork: station.favicon || undefined,
       genre: station.tags ? station.tags.split(',')[0] : undefined,
       isLiveStream: true,
@@ -1,4 +1,5 @@
 import AsyncStorage from '@react-native-async-storage/async-storage';
+import ApiService from './ApiService';
 
 const KEYS = {
   FAVORITES: 'radioFavorites',
@@ -29,11 +30,33 @@ const setData = async (key, data) => {
   }
 };
 
+// Refresh saved stations with current data in one batch request. Stations
+// that are gone upstream, or all of them when offline, keep their saved data.
+const hydrateStations = async (key) => {
+  const saved = await getData(key);
+  if (saved.length === 0) {
+    return saved;
+  }
+  try {
+    const fresh = await ApiService.getStationsBatch(saved.map(s => s.stationuuid));
+    const hydrated = saved.map((station, i) => (fresh[i] ? {...station, ...fresh[i]} : station));
+    await setData(key, hydrated);
+    return hydrated;
+  } catch (error) {
+    console.error(`Error refreshing ${key}:`, error);
+    return saved;
+  }
+};
+
 // Favorites management
 export const getFavorites = async () => {
   return await getData(KEYS.FAVORITES);
 };
 
+export const refreshFavorites = async () => {
+  return await hydrateStations(KEYS.FAVORITES);
+};
+
 export const addToFavorites = async (station) => {
   try {
     const favorites = await getFavorites();
@@ -78,6 +101,10 @@ export const getRecentlyPlayed = async () => {
   return await getData(KEYS.RECENTLY_PLAYED);
 };
 
+export const refreshRecentlyPlayed = async () => {
+  return await hydrateStations(KEYS.RECENTLY_PLAYED);
+};
+
 export const addToRecentlyPlayed = async (station) => {
   try {
     const recent = await getRecentlyPlayed();
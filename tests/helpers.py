@@ -0,0 +1,52 @@
+"""Shared fixtures-as-code for the backend tests."""
+import time
+
+# Shared with the benchmarks: the app with lifespan, pointed at a stub mirror.
+from benchmarks.common import app_client  # noqa: F401
+
+
+class FakeRedis:
+    """In-memory stand-in for ``redis.asyncio.Redis`` (get/set with ``ex``,
+    incr/expire)."""
+
+    def __init__(self):
+        self.store = {}
+        self.fail = False
+
+    def _check(self):
+        if self.fail:
+            raise ConnectionError("fake redis is down")
+
+    async def get(self, key):
+        self._check()
+        entry = self.store.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self.store[key]
+            return None
+        return value
+
+    async def set(self, key, value, ex=None):
+        self._check()
+        if isinstance(value, str):
+            value = value.encode()
+        self.store[key] = (value, time.time() + ex if ex else None)
+        return True
+
+    async def incr(self, key):
+        value = int(await self.get(key) or 0) + 1
+        expires_at = self.store.get(key, (None, None))[1]
+        self.store[key] = (str(value).encode(), expires_at)
+        return value
+
+    async def expire(self, key, seconds):
+        self._check()
+        if key not in self.store:
+            return False
+        self.store[key] = (self.store[key][0], time.time() + seconds)
+        return True
+
+    async def aclose(self):
+        pass
@@ -0,0 +1,158 @@
+import asyncio
+
+from starlette.datastructures import Headers
+
+import server
+from benchmarks.stub_upstream import StubUpstream
+from radio.admission import Admission, AdaptiveLimiter, ClientIdentity, RateLimiter
+from tests.helpers import FakeRedis, app_client
+
+
+def test_client_limits_answer_429_and_overload_is_shed_with_503():
+    admission = Admission(
+        clients=RateLimiter(rate=1, burst=3),
+        concurrency=AdaptiveLimiter(initial=1, min_limit=1, max_limit=1, queue_timeout=0.01),
+    )
+
+    identity = ClientIdentity(["noisy", "other", "a", "b"])
+
+    async def scenario():
+        async with StubUpstream(latency=0.2) as stub:
+            async with app_client(stub, admission=admission, client_identity=identity) as client:
+                noisy = [await client.get("/api/genres", headers={"x-api-key": "noisy"}) for _ in range(4)]
+                other = await client.get("/api/genres", headers={"x-api-key": "other"})
+                ready = [await client.get("/api/ready", headers={"x-api-key": "noisy"}) for _ in range(3)]
+                # One slot: the second uncached search queues, times out and is shed.
+                slow, shed = await asyncio.gather(
+                    client.get("/api/stations/search", params={"name": "a"}, headers={"x-api-key": "a"}),
+                    client.get("/api/stations/search", params={"name": "b"}, headers={"x-api-key": "b"}),
+                )
+                status = (await client.get("/api/admission/status")).json()
+                metrics = (await client.get("/metrics")).text
+                return noisy, other, ready, slow, shed, status, metrics
+
+    noisy, other, ready, slow, shed, status, metrics = asyncio.run(scenario())
+    assert [r.status_code for r in noisy] == [200, 200, 200, 429]
+    assert noisy[3].headers["retry-after"] == "1"
+    assert other.status_code == 200
+    assert all(r.status_code != 429 for r in ready)
+    assert slow.status_code == 200
+    assert shed.status_code == 503 and shed.headers["retry-after"] == "1"
+    assert status["clients"]["rejected"] == 1 and status["concurrency"]["shed"] == 1
+    assert "radio_requests_shed_total 1.0" in metrics
+
+
+def test_upstream_budget_caps_calls_and_returns_retry_after():
+    admission = Admission(upstream=RateLimiter(rate=0.1, burst=1), upstream_max_wait=0.0)
+
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                # Installed after startup so aggregate refreshes don't spend it.
+                await asyncio.sleep(0.1)
+                server.admission = admission
+                first = await client.get("/api/stations/search", params={"name": "a"})
+                second = await client.get("/api/stations/search", params={"name": "b"})
+                return first, second, stub.paths["/json/stations/search"]
+
+    first, second, searches = asyncio.run(scenario())
+    assert first.status_code == 200
+    assert second.status_code == 503
+    assert 1 <= int(second.headers["retry-after"]) <= 10
+    assert searches == 1
+
+
+def test_spoofed_keys_and_forwarded_for_do_not_bypass_client_limits():
+    async def scenario(identity, headers):
+        async with StubUpstream() as stub:
+            admission = Admission(clients=RateLimiter(rate=1, burst=2))
+            async with app_client(stub, admission=admission, client_identity=identity) as client:
+                return [(await client.get("/api/genres", headers=headers(i))).status_code for i in range(10)]
+
+    spoofed = lambda i: {"x-api-key": f"random-{i}", "x-forwarded-for": f"198.51.100.{i}"}
+    # Direct clients: unknown keys and X-Forwarded-For are ignored.
+    direct = asyncio.run(scenario(ClientIdentity(["real"]), spoofed))
+    # Behind a trusted proxy only the address it appended counts.
+    proxied = asyncio.run(scenario(
+        ClientIdentity(trusted_proxies=["127.0.0.0/8"]),
+        lambda i: {"x-forwarded-for": f"198.51.100.{i}, 203.0.113.7"},
+    ))
+    assert direct.count(200) == 2 and proxied.count(200) == 2
+    identity = ClientIdentity(["real"], ["10.0.0.0/8"])
+    headers = {"x-forwarded-for": "1.2.3.4, 203.0.113.7, 10.0.0.2"}
+    assert identity(Headers(headers), "10.0.0.1") == "203.0.113.7"
+    assert identity(Headers(headers), "192.0.2.1") == "192.0.2.1"
+    assert identity(Headers({"x-api-key": "real"}), "192.0.2.1") == "key:real"
+
+
+def test_adaptive_limit_follows_loop_lag_not_request_latency():
+    limiter = AdaptiveLimiter(initial=20, min_limit=4, max_limit=40)
+
+    async def scenario():
+        # Slow upstream: requests stay in flight, but the loop keeps up.
+        held = [await limiter.acquire() for _ in range(15)]
+        for _ in range(20):
+            limiter.observe_lag(0.001)
+            limiter.release()
+            await limiter.acquire()
+        grown = limiter.limit
+        for _ in range(30):
+            limiter.observe_lag(0.2)
+        backed_off = limiter.limit
+        # Still full at the lower limit: a newcomer queues for a released slot.
+        for _ in range(limiter.inflight - int(limiter.limit)):
+            limiter.release()
+        waiting = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release()
+        admitted = await waiting
+        return held, grown, backed_off, admitted
+
+    held, grown, backed_off, admitted = asyncio.run(scenario())
+    assert grown > 20
+    assert backed_off == 4
+    assert all(held) and admitted
+    assert limiter.inflight == 4
+
+
+def test_shared_mode_counts_across_workers_and_falls_back_locally():
+    redis = FakeRedis()
+    workers = [RateLimiter(rate=1, burst=3, redis=redis, wall_clock=lambda: 1000.5) for _ in range(2)]
+
+    async def scenario():
+        shared = [(await workers[i % 2].allow("client"))[0] for i in range(4)]
+        redis.fail = True
+        local = [(await workers[0].allow("client"))[0] for _ in range(4)]
+        return shared, local
+
+    shared, local = asyncio.run(scenario())
+    assert shared == [True, True, True, False]
+    assert local == [True, True, True, False]
+    assert workers[0].status()["redis_errors"] == 4
+
+
+def test_cancelled_waiters_do_not_leak_slots():
+    limiter = AdaptiveLimiter(initial=8, min_limit=8, max_limit=8, queue_timeout=1.0)
+
+    async def scenario():
+        for _ in range(8):
+            await limiter.acquire()
+        # One waiter is cancelled while queued, another right after being
+        # handed a slot but before it resumed.
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        queued.cancel()
+        handed = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release()
+        handed.cancel()
+        for task in (queued, handed):
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        for _ in range(7):
+            limiter.release()
+
+    asyncio.run(scenario())
+    assert limiter.inflight == 0 and not limiter._waiters
@@ -0,0 +1,100 @@
+import asyncio
+import gzip
+import json
+import threading
+
+from benchmarks.stub_upstream import StubUpstream
+from radio.aggregates import Aggregate, AggregateStore
+from radio.httpcache import etag_matches
+from tests.helpers import app_client
+
+
+def test_aggregate_is_sorted_once_with_prepared_top_n():
+    items = [{"name": n, "stationcount": c} for n, c in [("a", 1), ("b", 30), ("c", 7)]]
+    aggregate = Aggregate("tags", items, top_n=2)
+    assert [i["name"] for i in aggregate.items] == ["b", "c", "a"]
+    top = aggregate.body(2)
+    assert json.loads(top.body) == {"tags": [items[1], items[2]]}
+    assert gzip.decompress(top.gzipped) == top.body
+    assert aggregate.body(2) is top
+    # Limits past the end share the full body.
+    assert aggregate.body(10) is aggregate.body(None)
+    assert top.etag != aggregate.body(None).etag
+
+
+def test_new_limits_are_prepared_off_the_loop_and_kept_in_an_lru():
+    items = [{"name": str(n), "stationcount": n} for n in range(100)]
+    threads = []
+
+    async def fetch(name):
+        return items
+
+    async def scenario():
+        store = AggregateStore(fetch, interval=60, top_n=10)
+        aggregate = await store.get("tags")
+        prepare = aggregate.prepare
+        aggregate.prepare = lambda limit: threads.append(threading.current_thread()) or prepare(limit)
+        first = await store.body("tags", 1)
+        for limit in range(2, Aggregate.max_bodies + 2):
+            await store.body("tags", limit)
+        return aggregate, first
+
+    aggregate, first = asyncio.run(scenario())
+    assert threads and threading.main_thread() not in threads
+    assert json.loads(first.body) == {"tags": [items[99]]}
+    # Least recently used limits are evicted; recent ones stay prepared.
+    assert aggregate.cached(1) is None
+    assert aggregate.cached(Aggregate.max_bodies + 1) is not None
+    assert aggregate.cached(500) is aggregate.body(None)
+
+
+def test_concurrent_first_requests_share_one_fetch():
+    calls = []
+
+    async def fetch(name):
+        calls.append(name)
+        await asyncio.sleep(0.01)
+        return [{"name": "x", "stationcount": 1}]
+
+    async def scenario():
+        store = AggregateStore(fetch, interval=60)
+        await asyncio.gather(*(store.body("countries") for _ in range(5)))
+
+    asyncio.run(scenario())
+    assert calls == ["countries"]
+
+
+def test_etag_matching():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_aggregate_endpoints_answer_304_to_matching_etags():
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                first = await client.get("/api/tags", params={"limit": 5})
+                repeat = await client.get(
+                    "/api/tags", params={"limit": 5}, headers={"If-None-Match": first.headers["etag"]}
+                )
+                countries = await client.get("/api/countries", headers={"Accept-Encoding": "identity"})
+                languages = await client.get("/api/languages")
+                await client.get("/api/countries")
+            return first, repeat, countries, languages, stub.paths
+
+    first, repeat, countries, languages, paths = asyncio.run(scenario())
+    tags = first.json()["tags"]
+    assert len(tags) == 5
+    assert [t["stationcount"] for t in tags] == sorted((t["stationcount"] for t in tags), reverse=True)
+    assert repeat.status_code == 304
+    assert repeat.content == b""
+    assert repeat.headers["etag"] == first.headers["etag"]
+    assert "content-encoding" not in countries.headers
+    assert countries.json()["countries"][0]["stationcount"] >= countries.json()["countries"][-1]["stationcount"]
+    assert languages.headers["content-encoding"] == "gzip"
+    # Loaded once (at startup or on first use), not per request.
+    assert paths["/json/countries"] == 1
+    assert paths["/json/tags"] == 1
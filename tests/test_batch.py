@@ -0,0 +1,72 @@
+import asyncio
+
+import server
+from benchmarks.stub_upstream import StubUpstream
+from radio.search_index import SearchIndex
+from tests.helpers import app_client
+
+
+UNKNOWN = "ffffffff-ffff-4fff-8fff-ffffffffffff"
+
+
+def test_batch_keeps_input_order_and_chunks_upstream_calls(monkeypatch):
+    monkeypatch.setattr(server, "BATCH_URL_BUDGET", 400)
+
+    async def scenario():
+        async with StubUpstream() as stub:
+            wanted = [s["stationuuid"] for s in stub.stations[:60]][::-1]
+            body = {"uuids": [wanted[0], UNKNOWN, *wanted, wanted[1]]}
+            async with app_client(stub) as client:
+                first = (await client.post("/api/stations/batch", json=body, params={"fields": "stationuuid,name"})).json()
+                byuuid_calls = stub.paths["/json/stations/byuuid"]
+                second = (await client.post("/api/stations/batch", json=body, params={"fields": "stationuuid,name"})).json()
+                single = await client.get(f"/api/station/{wanted[5]}")
+                return body, first, second, single, byuuid_calls, stub.paths["/json/stations/byuuid"]
+
+    body, first, second, single, byuuid_calls, total_calls = asyncio.run(scenario())
+    uuids = [s and s["stationuuid"] for s in first["stations"]]
+    assert uuids == [u if u != UNKNOWN else None for u in body["uuids"]]
+    assert set(first["stations"][0]) == {"stationuuid", "name"}
+    assert first["missing"] == [UNKNOWN] and not first["partial"]
+    # 61 distinct uuids at 39 encoded characters each fit 10 to a 400-character chunk.
+    assert byuuid_calls == 7
+    # The second batch and the single lookup come from the per-station cache;
+    # only the unknown uuid is asked for again.
+    assert second == first
+    assert single.json()["station"]["stationuuid"] == body["uuids"][7]
+    assert total_calls == byuuid_calls + 1
+
+
+def test_batch_served_from_index_without_upstream():
+    async def scenario():
+        async with StubUpstream() as stub:
+            wanted = [s["stationuuid"] for s in stub.stations[:20]]
+            async with app_client(stub, search_index=SearchIndex(stub.stations, 1)) as client:
+                stub.reset_counters()
+                response = (await client.post("/api/stations/batch", json={"uuids": wanted})).json()
+                return wanted, response, stub.paths["/json/stations/byuuid"]
+
+    wanted, response, byuuid_calls = asyncio.run(scenario())
+    assert [s["stationuuid"] for s in response["stations"]] == wanted
+    assert byuuid_calls == 0
+
+
+def test_batch_flags_failed_chunks_and_validates_input(monkeypatch):
+    monkeypatch.setattr(server, "BATCH_MAX", 5)
+
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                stub.route("/json/stations/byuuid", lambda path, params: (503, b"{}"))
+                ids = [f"{i:08d}-ffff-4fff-8fff-ffffffffffff" for i in range(6)]
+                down = await client.post("/api/stations/batch", json={"uuids": ids[:2]})
+                empty = await client.post("/api/stations/batch", json={"uuids": []})
+                too_many = await client.post("/api/stations/batch", json={"uuids": ids})
+                # A comma would turn one entry into several upstream uuids.
+                joined = await client.post("/api/stations/batch", json={"uuids": [",".join(ids[:2])]})
+                garbage = await client.post("/api/stations/batch", json={"uuids": ["no-such-station"]})
+                return down, empty, too_many, joined, garbage
+
+    down, empty, too_many, joined, garbage = asyncio.run(scenario())
+    assert down.status_code == 503
+    assert empty.status_code == too_many.status_code == joined.status_code == garbage.status_code == 400
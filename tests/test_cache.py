@@ -0,0 +1,181 @@
+import asyncio
+
+from benchmarks.stub_upstream import StubUpstream
+from radio.cache import _MISSING, CacheStats, LRUCache, TieredCache, cache_key
+from radio.responses import RawJSON
+from tests.helpers import FakeRedis, app_client
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_key_is_normalized():
+    a = cache_key("/Stations/Search", {"limit": 50, "tag": "rock", "name": None})
+    b = cache_key("stations/search", {"tag": "rock", "limit": "50"})
+    assert a == b
+
+
+def test_lru_evicts_least_recently_used():
+    stats = CacheStats()
+    lru = LRUCache(2, stats)
+    lru.set("a", 1, 60)
+    lru.set("b", 2, 60)
+    assert lru.get("a") == (1, True)
+    lru.set("c", 3, 60)
+    assert lru.get("b") is _MISSING
+    assert lru.get("a") == (1, True)
+    assert stats.evictions == 1
+
+
+def test_entries_expire_per_endpoint_ttl():
+    clock = FakeClock()
+    cache = TieredCache(ttls={"stations/search": 10, "countries": 100}, stale_ttl=0, clock=clock)
+    assert cache.ttl_for("stations/search") == 10
+    assert cache.ttl_for("countries") == 100
+    assert cache.ttl_for("url/abc") is None
+
+    async def scenario():
+        await cache.set("k", [1], cache.ttl_for("stations/search"))
+        assert await cache.get("k") == [1]
+        clock.now += 11
+        assert await cache.get("k") is None
+
+    asyncio.run(scenario())
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+    assert cache.stats.expirations == 1
+
+
+def test_redis_tier_shares_entries_between_workers():
+    redis = FakeRedis()
+    worker_a = TieredCache(redis=redis)
+    worker_b = TieredCache(redis=redis)
+
+    async def scenario():
+        await worker_a.set("k", {"stations": [1, 2]}, 60)
+        assert await worker_b.get("k") == {"stations": [1, 2]}
+        # Promoted into worker B's LRU, so Redis is not consulted again.
+        assert await worker_b.get("k") == {"stations": [1, 2]}
+
+    asyncio.run(scenario())
+    assert worker_b.stats.redis_hits == 1
+    assert worker_b.stats.hits == 2
+
+
+def test_redis_tier_keeps_raw_bodies_as_bytes():
+    redis = FakeRedis()
+    worker_a = TieredCache(redis=redis)
+    worker_b = TieredCache(redis=redis)
+
+    async def scenario():
+        await worker_a.set("k", b'[{"name": "Radio \xc3\xa9"}]', 60)
+        await worker_a.set("page", RawJSON(b'[{"name": "x"}]'), 60)
+        return await worker_b.get("k"), await worker_b.get("page")
+
+    body, page = asyncio.run(scenario())
+    assert body == b'[{"name": "Radio \xc3\xa9"}]'
+    assert isinstance(page, RawJSON) and page.data == b'[{"name": "x"}]' and page.digest == RawJSON(page.data).digest
+
+
+def test_redis_failures_degrade_to_local_cache():
+    redis = FakeRedis()
+    redis.fail = True
+    cache = TieredCache(redis=redis)
+
+    async def scenario():
+        await cache.set("k", [1], 60)
+        assert await cache.get("k") == [1]
+        assert await cache.get("missing") is None
+
+    asyncio.run(scenario())
+    assert cache.stats.redis_errors == 2
+
+
+def test_station_endpoints_are_served_from_cache():
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub, cache=TieredCache(redis=FakeRedis())) as client:
+                for _ in range(3):
+                    response = await client.get("/api/stations/popular", params={"limit": 10})
+                    assert response.status_code == 200
+                    assert len(response.json()["stations"]) == 10
+                await client.get("/api/stations/by-country/de")
+                await client.get("/api/stations/by-country/DE")
+                stats = (await client.get("/api/cache/stats")).json()["cache"]
+            return stub.paths["/json/stations/search"], stats
+
+    upstream_calls, stats = asyncio.run(scenario())
+    assert upstream_calls == 2
+    assert stats["hits"] == 3
+    assert stats["misses"] == 2
+    assert stats["hit_ratio"] == 0.6
+    assert stats["redis_enabled"] is True
+
+
+def test_concurrent_misses_share_one_upstream_fetch():
+    async def scenario():
+        async with StubUpstream(latency=0.05) as stub:
+            async with app_client(stub) as client:
+                responses = await asyncio.gather(*(
+                    client.get("/api/stations/popular") for _ in range(50)
+                ))
+                stats = (await client.get("/api/cache/stats")).json()["cache"]
+            return responses, stub.paths["/json/stations/search"], stats
+
+    responses, upstream_calls, stats = asyncio.run(scenario())
+    assert all(r.status_code == 200 for r in responses)
+    assert len({r.content for r in responses}) == 1
+    assert upstream_calls == 1
+    assert stats["coalesced"] == 49
+
+
+def test_stale_entry_is_served_while_one_refresh_runs():
+    clock = FakeClock()
+    cache = TieredCache(stale_ttl=100, clock=clock)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def scenario():
+        assert await cache.get_or_fetch("k", 10, fetch) == 1
+        clock.now += 15
+        # Expired but within the stale window: old value comes back at once
+        # and every caller shares the single background refresh.
+        stale = await asyncio.gather(*(cache.get_or_fetch("k", 10, fetch) for _ in range(5)))
+        assert stale == [1] * 5
+        await asyncio.sleep(0.05)
+        assert await cache.get_or_fetch("k", 10, fetch) == 2
+        clock.now += 500
+        assert await cache.get_or_fetch("k", 10, fetch) == 3
+
+    asyncio.run(scenario())
+    assert len(calls) == 3
+    assert cache.stats.stale_hits == 5
+    assert cache.stats.refreshes == 1
+
+
+def test_failed_refresh_keeps_serving_stale_value():
+    clock = FakeClock()
+    cache = TieredCache(stale_ttl=100, clock=clock)
+
+    async def failing():
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        await cache.set("k", "old", 10)
+        clock.now += 15
+        assert await cache.get_or_fetch("k", 10, failing) == "old"
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert await cache.get_or_fetch("k", 10, failing) == "old"
+
+    asyncio.run(scenario())
+    assert cache.stats.refresh_errors >= 1
@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+import httpx
+
+from benchmarks.stub_upstream import StubUpstream, synthetic_stations
+from radio.catalog import StationCatalog
+from radio.query import StationQuery
+from tests.helpers import app_client
+
+
+def make_fetch(client, stub):
+    async def fetch(endpoint, params=None):
+        response = await client.get(f"{stub.url}/json/{endpoint}", params=params)
+        response.raise_for_status()
+        return response.json()
+    return fetch
+
+
+def expected(stub, predicate, limit):
+    """Clickcounts of the top matches (ties may come back in any order)."""
+    matching = [s["clickcount"] for s in stub.stations if predicate(s)]
+    return sorted(matching, reverse=True)[:limit]
+
+
+def clicks(stations):
+    return [s["clickcount"] for s in stations]
+
+
+def test_full_sync_and_indexed_queries(tmp_path):
+    catalog = StationCatalog(f"sqlite:///{tmp_path / 'catalog.db'}")
+    assert not catalog.ready
+
+    async def scenario():
+        async with StubUpstream() as stub, httpx.AsyncClient() as client:
+            count = await catalog.full_sync(make_fetch(client, stub))
+            assert count == len(stub.stations)
+            by_country = await catalog.search(StationQuery(countrycode="de", limit=5))
+            by_tag = await catalog.search(StationQuery(tag="Rock", limit=10))
+            by_name = await catalog.search(StationQuery(name="smooth", limit=100))
+            first = stub.stations[0]
+            by_uuid = await catalog.by_uuids([first["stationuuid"]])
+            return stub, by_country, by_tag, by_name, by_uuid
+
+    stub, by_country, by_tag, by_name, by_uuid = asyncio.run(scenario())
+    assert catalog.ready
+    assert clicks(by_country) == expected(stub, lambda s: s["countrycode"] == "DE", 5)
+    assert clicks(by_tag) == expected(stub, lambda s: "rock" in s["tags"].split(","), 10)
+    assert clicks(by_name) == expected(stub, lambda s: "smooth" in s["name"].lower(), 100)
+    assert by_uuid[0]["name"] == stub.stations[0]["name"]
+    assert catalog.status()["stations"] == len(stub.stations)
+
+    # A fresh process on the same file starts out ready.
+    assert StationCatalog(f"sqlite:///{tmp_path / 'catalog.db'}").ready
+
+
+def test_incremental_sync_applies_changed_stations(tmp_path):
+    catalog = StationCatalog(f"sqlite:///{tmp_path / 'catalog.db'}")
+
+    async def scenario():
+        async with StubUpstream() as stub, httpx.AsyncClient() as client:
+            fetch = make_fetch(client, stub)
+            await catalog.full_sync(fetch)
+            changed = dict(stub.stations[3], name="Renamed FM", lastchangetime="2030-01-01 00:00:00")
+            added = dict(stub.stations[4], stationuuid="ffffffff-0000-4000-8000-000000000000",
+                         lastchangetime="2030-01-02 00:00:00")
+            stub.stations[3] = changed
+            stub.stations.append(added)
+            applied = await catalog.incremental_sync(fetch)
+            renamed = await catalog.by_uuids([changed["stationuuid"]])
+            # Nothing changed since: the stations at the watermark are refetched
+            # but not re-applied.
+            again = await catalog.incremental_sync(fetch)
+            return applied, renamed, again
+
+    applied, renamed, again = asyncio.run(scenario())
+    assert applied == 2
+    assert again == 0
+    assert renamed[0]["name"] == "Renamed FM"
+    assert catalog.count() == 201
+
+
+def test_endpoints_are_served_from_the_catalog(tmp_path):
+    catalog = StationCatalog(f"sqlite:///{tmp_path / 'catalog.db'}")
+    searches = []
+
+    async def scenario():
+        async with StubUpstream() as stub, httpx.AsyncClient() as client:
+            await catalog.full_sync(make_fetch(client, stub))
+
+            def recording_search(path, params):
+                searches.append(params)
+                return 200, json.dumps(stub._search(params)).encode()
+
+            stub.route("/json/stations/search", recording_search)
+            async with app_client(stub, catalog=catalog) as api:
+                popular = await api.get("/api/stations/popular", params={"limit": 3})
+                genre = await api.get("/api/stations/by-genre", params={"genre": "news"})
+                details = await api.get(f"/api/station/{stub.stations[0]['stationuuid']}")
+            return stub, popular.json(), genre.json(), details.json()
+
+    stub, popular, genre, details = asyncio.run(scenario())
+    assert clicks(popular["stations"]) == expected(stub, lambda s: True, 3)
+    assert genre["stations"]
+    assert details["station"]["stationuuid"] == stub.stations[0]["stationuuid"]
+    # Only the background incremental sync may talk to upstream.
+    assert all(p.get("order") == "changetimestamp" for p in searches)
+
+
+
+def test_unknown_station_is_404():
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                return await client.get("/api/station/no-such-uuid")
+
+    assert asyncio.run(scenario()).status_code == 404
+
+
+def test_like_wildcards_in_filters_match_literally(tmp_path):
+    stations = synthetic_stations(3, seed=4)
+    for station, name in zip(stations, ("100% Hits", "Rock_FM", "Plain \\ Radio")):
+        station.update(name=name, lastcheckok=1)
+    catalog = StationCatalog(f"sqlite:///{tmp_path / 'catalog.db'}")
+
+    async def fetch(endpoint, params=None):
+        return stations if endpoint == "stations" else []
+
+    async def scenario():
+        await catalog.full_sync(fetch)
+        return [[s["name"] for s in await catalog.search(StationQuery(name=name))] for name in ("%", "_", "\\", "k_f")]
+
+    assert asyncio.run(scenario()) == [["100% Hits"], ["Rock_FM"], ["Plain \\ Radio"], ["Rock_FM"]]
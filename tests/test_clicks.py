@@ -0,0 +1,98 @@
+import asyncio
+
+import server
+from benchmarks.stub_upstream import StubUpstream
+from radio.admission import ClientIdentity
+from radio.clicks import ClickReporter
+from radio.ratelimit import TokenBucket
+from tests.helpers import app_client
+
+
+def test_token_bucket_refills_at_rate():
+    now = [0.0]
+    bucket = TokenBucket(rate=2, burst=2, clock=lambda: now[0])
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.wait_time() == 0.5
+    now[0] = 0.5
+    assert bucket.try_acquire()
+
+
+def test_clicks_are_acknowledged_then_deduplicated_and_flushed():
+    async def scenario():
+        async with StubUpstream() as stub:
+            uuid = stub.stations[0]["stationuuid"]
+            async with app_client(stub, client_identity=ClientIdentity(["a", "b"])) as client:
+                for api_key in ("a", "a", "b"):
+                    response = await client.post(f"/api/station/{uuid}/click", headers={"X-API-Key": api_key})
+                    assert response.json() == {"success": True}
+            # Shutdown drained the queue before the app stopped.
+            reporter = server.clicks
+            return stub.paths[f"/json/url/{uuid}"], reporter.station_clicks(uuid), reporter.snapshot()
+
+    sent, local, stats = asyncio.run(scenario())
+    assert sent == 2
+    assert local == 2
+    assert stats["accepted"] == 3
+    assert stats["deduplicated"] == 1
+    assert stats["sent"] == 2
+    assert stats["queue_depth"] == 0
+
+
+def test_full_queue_sheds_clicks():
+    async def report(uuid):
+        pass
+
+    async def scenario():
+        reporter = ClickReporter(report, maxsize=2)
+        accepted = [reporter.submit("s", str(i)) for i in range(3)]
+        return accepted, reporter.snapshot()
+
+    accepted, stats = asyncio.run(scenario())
+    assert accepted == [True, True, False]
+    assert stats["dropped"] == 1
+    assert stats["queue_utilization"] == 1.0
+
+
+def test_dedupe_entries_expire_oldest_first():
+    now = [0.0]
+
+    async def report(uuid):
+        pass
+
+    async def scenario():
+        reporter = ClickReporter(report, maxsize=10, dedupe_window=10, clock=lambda: now[0])
+        first = [reporter._is_duplicate(f"s{i}", "c") for i in range(5)]
+        now[0] = 5
+        repeat = [reporter._is_duplicate("s0", "c"), reporter._is_duplicate("s5", "c")]
+        now[0] = 12
+        # s0..s4 expired and are pruned; s5's window is still open.
+        late = [reporter._is_duplicate("s5", "c"), reporter._is_duplicate("s9", "c")]
+        return reporter, first, repeat, late
+
+    reporter, first, repeat, late = asyncio.run(scenario())
+    assert first == [False] * 5 and repeat == [True, False]
+    assert late == [True, False]
+    assert list(reporter._seen) == [("c", "s5"), ("c", "s9")]
+
+
+def test_failed_reports_are_retried():
+    calls = []
+
+    async def report(uuid):
+        calls.append(uuid)
+        if len(calls) < 3:
+            raise ConnectionError("upstream down")
+
+    async def scenario():
+        reporter = ClickReporter(report, retry_delay=0.001)
+        reporter.start()
+        reporter.submit("s", "client")
+        await reporter.aclose()
+        return reporter.snapshot()
+
+    stats = asyncio.run(scenario())
+    assert calls == ["s", "s", "s"]
+    assert stats["retries"] == 2
+    assert stats["sent"] == 1
+    assert stats["failed"] == 0
@@ -0,0 +1,44 @@
+import json
+
+from benchmarks.stub_upstream import synthetic_stations
+from radio.columnar import FIELDS, STRING_FIELDS, ColumnarStations
+
+
+def test_rows_round_trip_through_columns():
+    stations = synthetic_stations(50, seed=1)
+    stations[0]["geo_lat"] = None
+    stations[1]["name"] = "Rádio Ñandú 📻"
+    store = ColumnarStations.from_dicts(stations)
+    assert len(store) == 50
+    for i, station in enumerate(stations):
+        assert store.row(i) == {field: station[field] for field in FIELDS}
+
+
+def test_repeated_strings_are_stored_once():
+    stations = synthetic_stations(1000)
+    store = ColumnarStations.from_dicts(stations)
+    assert len(set(store.columns["country"])) == len({s["country"] for s in stations})
+    assert len(set(store.columns["codec"])) == len({s["codec"] for s in stations})
+    assert len(store.strings) < len(stations) * len(STRING_FIELDS)
+    assert store.nbytes < len(json.dumps(stations))
+
+
+def test_views_decode_lazily():
+    store = ColumnarStations.from_dicts(synthetic_stations(3))
+    view = store.view(2)
+    assert view["stationuuid"] == store.row(2)["stationuuid"]
+    assert dict(view) == store.row(2)
+
+
+def test_decoded_rows_are_reused_but_handed_out_as_copies():
+    stations = synthetic_stations(20, seed=2)
+    store = ColumnarStations.from_dicts(stations)
+    store.decoded_rows = 4
+    first = store.rows([3, 1, 3])
+    first[0]["distance_km"] = 1.0
+    again = store.rows([3, 1])
+    assert "distance_km" not in again[0]
+    assert again == [store.row(3), store.row(1)]
+    # More rows than the cache holds still come back complete and in order.
+    assert [s["stationuuid"] for s in store.rows(range(10))] == [s["stationuuid"] for s in stations[:10]]
+    assert len(store._decoded) == 4
@@ -0,0 +1,88 @@
+import asyncio
+
+from benchmarks.stub_upstream import StubUpstream
+from radio.fanout import fan_out, joined_chunks, top_stations
+from tests.helpers import app_client
+
+
+def test_fan_out_runs_concurrently_within_limit():
+    running = []
+    peak = []
+
+    async def fetch(item):
+        running.append(item)
+        peak.append(len(running))
+        await asyncio.sleep(0.02)
+        running.remove(item)
+        return item * 2
+
+    results, failed = asyncio.run(fan_out(fetch, [1, 2, 3, 4, 5, 6], concurrency=3, deadline=1))
+    assert results == [2, 4, 6, 8, 10, 12]
+    assert failed == []
+    assert max(peak) == 3
+
+
+def test_fan_out_returns_partial_results_at_deadline():
+    async def fetch(item):
+        if item == "slow":
+            await asyncio.sleep(5)
+        if item == "broken":
+            raise RuntimeError("boom")
+        return item
+
+    results, failed = asyncio.run(
+        fan_out(fetch, ["a", "slow", "broken", "b"], concurrency=4, deadline=0.05)
+    )
+    assert results == ["a", "b"]
+    assert failed == ["slow", "broken"]
+
+
+def test_top_stations_dedupes_and_orders_by_clickcount():
+    a = [{"stationuuid": "1", "clickcount": 5}, {"stationuuid": "2", "clickcount": 50}]
+    b = [{"stationuuid": "2", "clickcount": 50}, {"stationuuid": "3", "clickcount": 20}]
+    merged = top_stations([a, b], 2)
+    assert [s["stationuuid"] for s in merged] == ["2", "3"]
+
+
+def test_multi_tag_genre_queries_each_tag():
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                response = await client.get("/api/stations/by-genre", params={"genre": "electronic", "limit": 20})
+                christian = await client.get("/api/stations/christian", params={"limit": 10})
+            return response.json(), christian.json(), stub.paths["/json/stations/search"]
+
+    genre, christian, upstream_calls = asyncio.run(scenario())
+    assert upstream_calls == 4 + 6
+    assert genre["partial"] is False
+    stations = genre["stations"]
+    assert 0 < len(stations) <= 20
+    assert len({s["stationuuid"] for s in stations}) == len(stations)
+    assert all({"electronic", "dance", "techno", "house"} & set(s["tags"].split(",")) for s in stations)
+    clicks = [s["clickcount"] for s in stations]
+    assert clicks == sorted(clicks, reverse=True)
+    assert len(christian["stations"]) == 10
+
+
+def test_multi_tag_endpoints_fail_when_every_tag_fails():
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                stub.route("/json/stations/search", lambda path, params: (503, b"{}"))
+                genre = await client.get("/api/stations/by-genre", params={"genre": "electronic"})
+                christian = await client.get("/api/stations/christian")
+            return genre, christian
+
+    genre, christian = asyncio.run(scenario())
+    assert genre.status_code == christian.status_code == 503
+    assert genre.headers["cache-control"] == christian.headers["cache-control"] == "no-store"
+
+
+def test_joined_chunks_respect_encoded_length_and_order():
+    values = [f"uuid-{i:02d}" for i in range(20)]
+    chunks = joined_chunks(values, 40)
+    # 7 characters per value plus 3 for each encoded comma.
+    assert all(len(chunk.replace(",", "%2C")) <= 40 for chunk in chunks)
+    assert [v for chunk in chunks for v in chunk.split(",")] == values
+    assert len(chunks[0].split(",")) == 4
+    assert joined_chunks([], 40) == []
@@ -0,0 +1,80 @@
+import asyncio
+import math
+
+import numpy as np
+
+from benchmarks.stub_upstream import StubUpstream, synthetic_stations
+from radio.geo import EARTH_RADIUS_KM, GeoIndex, NearbyQuery
+from radio.search_index import SearchIndex
+from tests.helpers import app_client
+
+# Paris, near the antimeridian, near the north pole, the south pole itself.
+POINTS = [(48.85, 2.35), (10.0, 179.9), (-20.0, -179.5), (88.0, 40.0), (-90.0, 0.0)]
+
+
+def brute_force(lat, lon, lats, lons):
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def random_points(count, seed=0):
+    rng = np.random.default_rng(seed)
+    lats = np.degrees(np.arcsin(rng.uniform(-1, 1, count)))
+    lons = rng.uniform(-180, 180, count)
+    return lats, lons
+
+
+def test_radius_and_knn_queries_match_brute_force():
+    lats, lons = random_points(5000)
+    index = GeoIndex(lats, lons)
+    for lat, lon in POINTS:
+        distances = brute_force(lat, lon, lats, lons)
+        for radius in (50, 800, 5000, 19000):
+            docs, found = index.within(lat, lon, radius)
+            assert set(docs.tolist()) == set(np.flatnonzero(distances <= radius).tolist())
+            assert np.allclose(found, distances[docs])
+        docs, found = index.nearest(lat, lon, 25)
+        assert np.allclose(np.sort(found), np.sort(distances)[:25])
+
+
+def test_order_by_distance_or_popularity_and_skip_missing_coordinates():
+    lats = np.array([0.0, 0.1, np.nan, 0.2, 5.0])
+    lons = np.array([0.0, 0.0, 0.0, 0.0, 0.0])
+    ok = np.array([True, True, True, True, False])
+    index = GeoIndex(lats, lons, ok)
+    assert len(index) == 3
+    by_distance, _ = index.query(NearbyQuery.parse(0.25, 0.0, radius=100))
+    assert by_distance.tolist() == [3, 1, 0]
+    by_clicks, _ = index.query(NearbyQuery.parse(0.25, 0.0, radius=100, order="clickcount"))
+    assert by_clicks.tolist() == [0, 1, 3]
+    nearest, _ = index.query(NearbyQuery.parse(0.0, 0.0, limit=2))
+    assert nearest.tolist() == [0, 1]
+
+
+def test_nearby_endpoint_from_index_and_upstream():
+    stations = synthetic_stations(2000)
+
+    async def scenario():
+        async with StubUpstream(stations) as stub:
+            async with app_client(stub, search_index=SearchIndex(stub.stations, 1)) as client:
+                stub.reset_counters()
+                indexed = (await client.get("/api/stations/nearby", params={"lat": 48.85, "lon": 2.35, "radius": 1500})).json()
+                nearest = (await client.get("/api/stations/nearby", params={"lat": 48.85, "lon": 2.35, "limit": 5})).json()
+                bad = [
+                    (await client.get("/api/stations/nearby", params=params)).status_code
+                    for params in ({"lat": 91, "lon": 0}, {"lat": 0, "lon": 0, "order": "votes"}, {"lat": 0, "lon": 0, "radius": -1})
+                ]
+                upstream_calls = stub.paths["/json/stations/search"]
+            async with app_client(stub) as client:
+                fallback = (await client.get("/api/stations/nearby", params={"lat": 48.85, "lon": 2.35, "radius": 1500})).json()
+            return indexed, nearest, bad, upstream_calls, fallback
+
+    indexed, nearest, bad, upstream_calls, fallback = asyncio.run(scenario())
+    distances = [s["distance_km"] for s in indexed["stations"]]
+    assert distances and distances == sorted(distances) and distances[-1] <= 1500
+    assert len(nearest["stations"]) == 5 and nearest["stations"][0]["distance_km"] == distances[0]
+    assert bad == [400, 400, 400]
+    assert upstream_calls == 0
+    # Upstream filters by distance; the exact order is ours either way.
+    assert [s["stationuuid"] for s in fallback["stations"]] == [s["stationuuid"] for s in indexed["stations"]]
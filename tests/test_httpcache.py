@@ -0,0 +1,136 @@
+import asyncio
+import json
+
+from benchmarks.caching_proxy import CachingProxy
+from benchmarks.stub_upstream import StubUpstream
+from radio.httpcache import CachePolicy, coded_etag, digest, make_etag, not_modified_since
+from radio.responses import RawJSON
+from tests.helpers import app_client
+
+
+def test_cache_policy_headers():
+    assert CachePolicy(60, 300).header == "public, max-age=60, stale-while-revalidate=300"
+    assert CachePolicy(10, public=False).header == "private, max-age=10"
+    assert CachePolicy(no_store=True).header == "no-store"
+
+
+def test_raw_bodies_carry_their_digest():
+    data = b'[{"stationuuid": "a"}]'
+    assert RawJSON(data).digest == digest(data) == digest(bytes(bytearray(data)))
+    assert make_etag("abc") == '"abc"'
+    assert make_etag("abc", "x") != make_etag("abc", "y")
+
+
+def test_if_modified_since_comparison():
+    assert not_modified_since("Tue, 01 Oct 2024 10:00:00 GMT", "Tue, 01 Oct 2024 09:00:00 GMT")
+    assert not not_modified_since("Tue, 01 Oct 2024 08:00:00 GMT", "Tue, 01 Oct 2024 09:00:00 GMT")
+    assert not not_modified_since("garbage", "Tue, 01 Oct 2024 09:00:00 GMT")
+
+
+def test_routes_carry_policies_etags_and_answer_304():
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                popular = await client.get("/api/stations/popular", params={"limit": 5})
+                again = await client.get(
+                    "/api/stations/popular", params={"limit": 5}, headers={"If-None-Match": popular.headers["etag"]}
+                )
+                genres = await client.get("/api/genres")
+                genres_again = await client.get("/api/genres", headers={"If-None-Match": genres.headers["etag"]})
+                countries = await client.get("/api/countries")
+                since = await client.get("/api/countries", headers={"If-Modified-Since": countries.headers["last-modified"]})
+                mirrors = await client.get("/api/mirrors")
+                clicked = await client.post(f"/api/station/{stub.stations[0]['stationuuid']}/click")
+        return popular, again, genres, genres_again, countries, since, mirrors, clicked
+
+    popular, again, genres, genres_again, countries, since, mirrors, clicked = asyncio.run(scenario())
+    assert popular.headers["cache-control"] == "public, max-age=60, stale-while-revalidate=300"
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == popular.headers["etag"]
+    assert again.headers["cache-control"] == popular.headers["cache-control"]
+    assert genres.headers["cache-control"] == "public, max-age=86400"
+    assert genres_again.status_code == 304
+    assert countries.headers["cache-control"].startswith("public, max-age=3600")
+    assert since.status_code == 304
+    assert mirrors.headers["cache-control"] == "no-store"
+    assert "etag" not in mirrors.headers
+    assert "cache-control" not in clicked.headers
+
+
+def test_compressed_representations_get_their_own_etag():
+    assert coded_etag('"abc"', "gzip") == '"abc-gzip"'
+    assert coded_etag('W/"abc"', "br") == 'W/"abc"'
+
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                params = {"limit": 100}
+                plain = await client.get("/api/stations/popular", params=params, headers={"Accept-Encoding": "identity"})
+                gzipped = await client.get("/api/stations/popular", params=params, headers={"Accept-Encoding": "gzip"})
+                revalidated = await client.get(
+                    "/api/stations/popular", params=params,
+                    headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]},
+                )
+                tags = await client.get("/api/tags", headers={"Accept-Encoding": "identity"})
+                tags_gzipped = await client.get("/api/tags", headers={"Accept-Encoding": "gzip"})
+        return plain, gzipped, revalidated, tags, tags_gzipped
+
+    plain, gzipped, revalidated, tags, tags_gzipped = asyncio.run(scenario())
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["etag"] == coded_etag(plain.headers["etag"], "gzip")
+    assert revalidated.status_code == 304 and revalidated.headers["etag"] == gzipped.headers["etag"]
+    assert tags_gzipped.headers["etag"] == coded_etag(tags.headers["etag"], "gzip")
+
+
+def test_error_responses_are_never_cacheable():
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                missing = await client.get("/api/station/does-not-exist/stream")
+                bad = await client.get("/api/stations/popular", params={"fields": "!"})
+        return missing, bad
+
+    missing, bad = asyncio.run(scenario())
+    assert missing.status_code == 404 and bad.status_code == 400
+    assert missing.headers["cache-control"] == bad.headers["cache-control"] == "no-store"
+    assert "etag" not in missing.headers
+
+
+def test_partial_station_lists_are_not_cached():
+    async def scenario():
+        async with StubUpstream() as stub:
+            def search(path, params):
+                if params.get("tag") == "gospel":
+                    return 503, b"{}"
+                return 200, json.dumps(stub._search(params)).encode()
+
+            async with app_client(stub) as client:
+                stub.route("/json/stations/search", search)
+                return await client.get("/api/stations/christian")
+
+    partial = asyncio.run(scenario())
+    assert partial.status_code == 200 and partial.json()["partial"] is True
+    assert partial.headers["cache-control"] == "no-store"
+
+
+def test_shared_cache_cuts_repeat_traffic_reaching_python():
+    now = [0.0]
+
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                proxy = CachingProxy(client, clock=lambda: now[0])
+                for _ in range(3):
+                    for _ in range(10):
+                        await proxy.get("/api/stations/by-country/de")
+                        await proxy.get("/api/countries")
+                    # Past every max-age involved: the next round revalidates.
+                    now[0] += 4000
+                return proxy.stats
+
+    stats = asyncio.run(scenario())
+    assert stats.requests == 60
+    # First fetch of each URL, then one revalidation per URL per round.
+    assert stats.upstream_requests == 6
+    assert stats.not_modified == 4
@@ -0,0 +1,25 @@
+import asyncio
+
+from benchmarks import load_test
+
+
+def test_load_test_covers_every_route_without_failures():
+    args = load_test.parser().parse_args(
+        ["--requests", "4", "--concurrency", "2", "--stations", "100", "--alloc-samples", "1"]
+    )
+    results = asyncio.run(load_test.run(args))
+    assert results["failed_routes"] == []
+    assert len(results["routes"]) == len(load_test.routes("uuid", 10))
+    popular = results["routes"]["popular"]
+    assert popular["status"] == {"200": 4}
+    assert popular["rps"] > 0 and popular["p99_ms"] >= popular["p50_ms"]
+    assert popular["alloc_peak_kib_p50"] > 0
+
+
+def test_load_test_reports_injected_upstream_errors():
+    args = load_test.parser().parse_args(
+        ["--requests", "10", "--routes", "search", "--error-rate", "1.0", "--stations", "50", "--alloc-samples", "0"]
+    )
+    results = asyncio.run(load_test.run(args))
+    assert results["failed_routes"] == ["search"]
+    assert results["routes"]["search"]["error_rate"] == 1.0
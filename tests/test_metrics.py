@@ -0,0 +1,44 @@
+import asyncio
+
+from benchmarks.stub_upstream import StubUpstream
+from tests.helpers import app_client
+
+
+def sample(text, name, **labels):
+    """Value of the first exposition line for ``name`` carrying ``labels``."""
+    for line in text.splitlines():
+        if line.startswith(name) and all(f'{k}="{v}"' in line for k, v in labels.items()):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_metrics_cover_routes_upstream_stages_and_state():
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                await client.get("/api/stations/christian", params={"limit": 5})
+                await client.get("/api/stations/by-country/de")
+                await client.get("/api/stations/by-country/de")
+                response = await client.get("/metrics")
+            return stub.url, response
+
+    mirror, response = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert sample(
+        text, "radio_http_request_duration_seconds_count",
+        route="/api/stations/by-country/{country_code}", status="200",
+    ) >= 2
+    assert sample(
+        text, "radio_upstream_request_duration_seconds_count",
+        mirror=mirror, endpoint="stations/search", outcome="200",
+    ) >= 7
+    for stage in ("upstream_fetch", "dedupe_sort", "serialization"):
+        assert sample(text, "radio_stage_duration_seconds_count", operation="christian_stations", stage=stage) >= 1
+    assert sample(text, "radio_stage_duration_seconds_count", operation="stations/search", stage="json_decode") >= 7
+    assert sample(text, "radio_cache_hit_ratio") > 0
+    assert sample(text, "radio_mirror_failovers_total") == 0
+    assert sample(text, "radio_mirror_up", mirror=mirror) == 1
+    assert sample(text, "radio_pool_utilization") == 0
+    assert "radio_event_loop_lag_seconds" in text
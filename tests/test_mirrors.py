@@ -0,0 +1,163 @@
+import asyncio
+import random
+
+import httpx
+
+from benchmarks.stub_upstream import StubUpstream
+from radio import mirrors as mirrors_module
+from radio.mirrors import CLOSED, HALF_OPEN, OPEN, MirrorPool, MirrorsUnavailable, discover_mirrors
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fetcher(client):
+    async def attempt(base_url):
+        response = await client.get(f"{base_url}/json/countries")
+        response.raise_for_status()
+        return base_url
+    return attempt
+
+
+def test_failover_skips_a_failing_mirror():
+    async def scenario():
+        async with StubUpstream(error_rate=1.0) as bad, StubUpstream() as good, httpx.AsyncClient() as client:
+            pool = MirrorPool([bad.url, good.url], hedging=False, rng=random.Random(1))
+            served = [await pool.request(fetcher(client)) for _ in range(20)]
+            return pool, bad, good, served
+
+    pool, bad, good, served = asyncio.run(scenario())
+    assert set(served) == {good.url}
+    assert pool.failovers >= 1
+    # Error-weighted scoring plus the breaker keep traffic off the bad mirror.
+    assert bad.requests <= pool.failure_threshold
+
+
+def test_circuit_half_opens_after_cooldown_and_closes_on_success():
+    clock = FakeClock()
+
+    async def scenario():
+        async with StubUpstream(error_rate=1.0) as flaky, StubUpstream() as good, httpx.AsyncClient() as client:
+            pool = MirrorPool([flaky.url], failure_threshold=2, cooldown=10,
+                              hedging=False, clock=clock, rng=random.Random(2))
+            attempt = fetcher(client)
+            for _ in range(2):
+                try:
+                    await pool.request(attempt)
+                except MirrorsUnavailable:
+                    pass
+            pool.set_urls([flaky.url, good.url])
+            for _ in range(5):
+                assert await pool.request(attempt) == good.url
+            flaky_mirror = pool.mirrors[0]
+            assert flaky_mirror.state == OPEN
+            before = flaky.requests
+            clock.now += 11
+            # Past the cooldown the circuit half-opens: eligible for one probe.
+            assert pool._available(flaky_mirror) and flaky_mirror.state == HALF_OPEN
+            flaky.error_rate = 0.0
+            # Probe requests keep going until the half-open mirror is picked.
+            for _ in range(20):
+                await pool.request(attempt)
+                if flaky.requests > before:
+                    break
+            return flaky_mirror, flaky.requests - before
+
+    mirror, probes = asyncio.run(scenario())
+    assert probes == 1
+    assert mirror.state == CLOSED
+
+
+def test_power_of_two_choices_prefers_the_faster_mirror():
+    async def scenario():
+        async with StubUpstream(latency=0.03) as slow, StubUpstream() as fast, httpx.AsyncClient() as client:
+            pool = MirrorPool([slow.url, fast.url], hedging=False, rng=random.Random(3))
+            served = [await pool.request(fetcher(client)) for _ in range(40)]
+            return served.count(fast.url)
+
+    assert asyncio.run(scenario()) >= 35
+
+
+def test_hedged_request_beats_a_stalled_mirror():
+    async def scenario():
+        async with StubUpstream(latency=1.0) as stalled, StubUpstream() as fast, httpx.AsyncClient() as client:
+            pool = MirrorPool([stalled.url, fast.url], min_hedge_delay=0.01, max_hedge_delay=0.05)
+            # Force the first pick onto the stalled mirror.
+            pool.mirrors[1].latency_ewma = 10.0
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            served = await pool.request(fetcher(client))
+            return served, loop.time() - start, pool, fast
+
+    served, elapsed, pool, fast = asyncio.run(scenario())
+    assert served == fast.url
+    assert elapsed < 0.5
+    assert pool.hedges == 1
+    assert pool.hedge_wins == 1
+    assert pool.mirrors[0].inflight == 0
+
+
+def test_all_mirrors_down_raises():
+    async def scenario():
+        async with StubUpstream(error_rate=1.0) as a, StubUpstream(error_rate=1.0) as b, \
+                httpx.AsyncClient() as client:
+            pool = MirrorPool([a.url, b.url], hedging=False)
+            try:
+                await pool.request(fetcher(client))
+            except MirrorsUnavailable:
+                return True
+            return False
+
+    assert asyncio.run(scenario())
+
+
+def test_discovery_falls_back_to_static_list(monkeypatch):
+    async def broken():
+        raise OSError("no network")
+
+    monkeypatch.setattr(mirrors_module, "_srv_mirrors", broken)
+    monkeypatch.setattr(mirrors_module, "_reverse_dns_mirrors", broken)
+    assert asyncio.run(discover_mirrors()) == mirrors_module.STATIC_MIRRORS
+
+
+def test_discovery_keeps_stats_for_known_mirrors(monkeypatch):
+    async def found():
+        return ["https://b.example", "https://a.example"]
+
+    monkeypatch.setattr(mirrors_module, "_srv_mirrors", found)
+    pool = MirrorPool(["https://a.example"])
+    pool.mirrors[0].record(0.1, ok=True)
+    pool.set_urls(asyncio.run(discover_mirrors()))
+    assert pool.urls == ["https://a.example", "https://b.example"]
+    assert pool.mirrors[0].requests == 1
+
+
+def test_admit_is_paid_per_request_sent_and_refusal_spares_the_mirror():
+    admitted = []
+
+    async def admit():
+        if len(admitted) == 2:
+            raise RuntimeError("out of budget")
+        admitted.append(True)
+
+    async def scenario():
+        async with StubUpstream(error_rate=1.0) as bad, StubUpstream() as good, httpx.AsyncClient() as client:
+            pool = MirrorPool([bad.url, good.url], hedging=False, rng=random.Random(1))
+            # Fails over once: both sends are paid for.
+            while not await pool.request(fetcher(client), admit=admit) == good.url:
+                pass
+            try:
+                await pool.request(fetcher(client), admit=admit)
+            except RuntimeError as e:
+                refused = e
+            return pool, refused
+
+    pool, refused = asyncio.run(scenario())
+    assert str(refused) == "out of budget"
+    assert len(admitted) == 2
+    assert all(m.requests == 1 for m in pool.mirrors)
@@ -0,0 +1,121 @@
+import asyncio
+import base64
+from collections import OrderedDict
+
+import server
+from benchmarks.stub_upstream import StubUpstream, synthetic_stations
+from radio.pagination import MAX_OFFSET, Cursor, count_stations
+from radio.responses import RawJSON
+from radio.search_index import SearchIndex
+from tests.helpers import app_client
+
+
+async def collect_pages(client, path, params):
+    pages = []
+    cursor = None
+    while True:
+        response = await client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        pages.append(body["stations"])
+        cursor = body["next_cursor"]
+        if cursor is None or len(pages) > 20:
+            return pages
+
+
+def test_cursor_round_trips_and_rejects_garbage():
+    cursor = Cursor(40, "index:3", "abc123")
+    assert Cursor.decode(cursor.encode()) == cursor
+    # Unsigned (forged) tokens, negative or too-deep offsets, bad snapshots.
+    forged = base64.urlsafe_b64encode(b"2|40|index:3|abc123|0123456789abcdef01234567").decode()
+    for token in ("", "not-a-cursor", forged, Cursor(-1, "upstream", "x").encode(),
+                  Cursor(MAX_OFFSET + 1, "upstream", "x").encode(), Cursor(0, "index:abc", "x").encode()):
+        try:
+            Cursor.decode(token)
+        except ValueError:
+            continue
+        raise AssertionError(f"{token!r} decoded")
+
+
+def test_count_stations_in_raw_upstream_json():
+    raw = RawJSON(b'[{"stationuuid": "a", "name": "say \\"stationuuid\\""}, {"stationuuid":"b"}]')
+    assert count_stations(raw) == 2
+    assert count_stations(RawJSON(b"[]")) == 0
+
+
+def test_upstream_pages_follow_offsets_without_overlap():
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                pages = await collect_pages(client, "/api/stations/by-country/de", {"limit": 8})
+                bad = await client.get("/api/stations/popular", params={"cursor": "garbage"})
+                first = (await client.get("/api/stations/by-country/de", params={"limit": 8})).json()
+                foreign = await client.get("/api/stations/by-country/fr", params={"cursor": first["next_cursor"]})
+        return pages, bad, foreign
+
+    pages, bad, foreign = asyncio.run(scenario())
+    assert [len(p) for p in pages] == [8, 8, 4]
+    uuids = [s["stationuuid"] for page in pages for s in page]
+    assert len(set(uuids)) == 20
+    clicks = [s["clickcount"] for page in pages for s in page]
+    assert clicks == sorted(clicks, reverse=True)
+    assert bad.status_code == 400
+    assert foreign.status_code == 400
+
+
+def test_index_cursor_stays_on_its_snapshot_across_rebuilds():
+    before = synthetic_stations(60, seed=1)
+    after = synthetic_stations(60, seed=2)
+    old, new = SearchIndex(before, version=1), SearchIndex(after, version=2)
+
+    async def scenario():
+        async with StubUpstream() as stub:
+            snapshots = OrderedDict([(1, old)])
+            async with app_client(stub, search_index=old, index_snapshots=snapshots) as client:
+                first = (await client.get("/api/stations/popular", params={"limit": 10})).json()
+                # A catalog sync rebuilt the index underneath the client.
+                server.search_index = new
+                snapshots[2] = new
+                second = (await client.get("/api/stations/popular", params={"limit": 10, "cursor": first["next_cursor"]})).json()
+                fresh = (await client.get("/api/stations/popular", params={"limit": 10})).json()
+            return first, second, fresh, stub.paths["/json/stations/search"]
+
+    first, second, fresh, upstream_requests = asyncio.run(scenario())
+    assert [s["stationuuid"] for s in first["stations"] + second["stations"]] == [
+        s["stationuuid"] for s in old.search(server.StationQuery(limit=20))
+    ]
+    assert fresh["stations"] == new.search(server.StationQuery(limit=10))
+    assert upstream_requests == 0
+
+
+def test_multi_tag_genre_pages_do_not_overlap():
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                return await collect_pages(client, "/api/stations/by-genre", {"genre": "electronic", "limit": 15})
+
+    pages = asyncio.run(scenario())
+    assert len(pages) > 1
+    uuids = [s["stationuuid"] for page in pages for s in page]
+    assert len(uuids) == len(set(uuids))
+
+
+def test_forged_and_deep_cursors_are_rejected_before_any_fetch():
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                first = (await client.get("/api/stations/by-genre", params={"genre": "electronic", "limit": 5})).json()
+                query = Cursor.decode(first["next_cursor"]).query
+                before = stub.paths["/json/stations/search"]
+                responses = [
+                    await client.get("/api/stations/by-genre", params={"genre": "electronic", "cursor": token})
+                    for token in (
+                        base64.urlsafe_b64encode(f"2|10000000|upstream|{query}|x".encode()).decode(),
+                        base64.urlsafe_b64encode(f"1|10000000|upstream|{query}".encode()).decode(),
+                    )
+                ]
+                return responses, stub.paths["/json/stations/search"] - before
+
+    responses, searches = asyncio.run(scenario())
+    assert [r.status_code for r in responses] == [400, 400]
+    assert searches == 0
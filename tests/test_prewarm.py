@@ -0,0 +1,81 @@
+import asyncio
+import random
+
+import server
+from benchmarks.stub_upstream import StubUpstream
+from radio.cache import TieredCache
+from radio.prewarm import CountMinSketch, Prewarmer
+from radio.workers import Warmup
+from tests.helpers import app_client
+
+
+def test_count_min_sketch_never_underestimates_and_decays():
+    sketch = CountMinSketch(width=64, depth=4)
+    rng = random.Random(0)
+    truth = {}
+    for _ in range(5000):
+        key = f"key-{int(rng.paretovariate(1.2)) % 300}"
+        truth[key] = truth.get(key, 0) + 1
+        sketch.add(key)
+    assert all(sketch.estimate(k) >= n for k, n in truth.items())
+    heaviest = max(truth, key=truth.get)
+    assert sketch.estimate(heaviest) <= truth[heaviest] * 1.05
+    before = sketch.estimate(heaviest)
+    sketch.decay()
+    assert sketch.estimate(heaviest) == before // 2
+
+
+def test_refreshes_hot_keys_before_expiry_within_budget():
+    fetched = []
+
+    def fetcher(key):
+        async def fetch():
+            fetched.append(key)
+            return key.upper()
+        return fetch
+
+    async def scenario():
+        cache = TieredCache()
+        prewarmer = Prewarmer(cache, top_k=2, min_hits=2, lead=30, budget_per_minute=1)
+        for key, count in (("hot", 5), ("warm", 3), ("cold", 1)):
+            await cache.set(key, "old", 60)
+            for _ in range(count):
+                prewarmer.observe(key, 60, fetcher(key))
+        assert set(prewarmer.hot) == {"hot", "warm"}
+        assert prewarmer.due() == []
+        # Both hot keys are about to expire; the budget pays for one refresh.
+        await cache.set("hot", "old", 10)
+        await cache.set("warm", "old", 10)
+        await prewarmer.tick()
+        prewarmer.observe("hot", 60, fetcher("hot"))
+        return cache, prewarmer
+
+    cache, prewarmer = asyncio.run(scenario())
+    assert fetched == ["hot"]
+    assert cache.fresh_for("hot") > 30
+    status = prewarmer.status()
+    assert status["refreshes"] == 1 and status["over_budget"] == 1
+    assert status["prewarm_hits"] == 1 and status["lookups"] == 10
+
+
+def test_startup_prewarms_genres_and_top_countries():
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub, warmup=Warmup(server.warmup_loaders())) as client:
+                for _ in range(100):
+                    if server.warmup.ready:
+                        break
+                    await asyncio.sleep(0.05)
+                countries = (await client.get("/api/countries")).json()["countries"]
+                searches = stub.paths["/json/stations/search"]
+                await client.get(f"/api/stations/by-country/{countries[0]['iso_3166_1'].lower()}")
+                await client.get("/api/stations/by-genre", params={"genre": "jazz"})
+                stats = (await client.get("/api/cache/stats")).json()["prewarm"]
+                metrics = (await client.get("/metrics")).text
+                return searches, stub.paths["/json/stations/search"], stats, metrics
+
+    warmed, after, stats, metrics = asyncio.run(scenario())
+    assert warmed == after
+    assert stats["warmed_at_startup"] > len(server.GENRES)
+    assert stats["prewarm_hits"] == 2 and stats["hit_ratio"] == 1.0
+    assert 'radio_prewarm_lookups_total{result="hit"} 2.0' in metrics
@@ -0,0 +1,206 @@
+import asyncio
+
+from benchmarks.stub_streams import StubStreamServer
+from benchmarks.stub_upstream import StubUpstream
+from radio.health import StreamHealthStore
+from radio.prober import ProbeResult, StreamProber, is_public_address, needs_resolving, parse_m3u, parse_pls
+from tests.helpers import app_client
+
+
+def probe(configure, *paths, **prober_args):
+    async def scenario():
+        async with StubStreamServer() as streams:
+            configure(streams)
+            prober = StreamProber(**{"allow_private": True, **prober_args})
+            try:
+                return await prober.probe_many(f"{streams.url}{path}" for path in paths), streams
+            finally:
+                await prober.aclose()
+
+    return asyncio.run(scenario())
+
+
+def test_playlist_parsers():
+    assert parse_pls("[playlist]\nNumberOfEntries=2\nFile1=http://a/1\nTitle1=x\nFile2=http://a/2\n") == [
+        "http://a/1", "http://a/2",
+    ]
+    entries, hls, variant = parse_m3u(
+        '#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=64000,CODECS="mp4a.40.5"\nlow/index.m3u8\n', "http://h/live/master.m3u8"
+    )
+    assert entries == ["http://h/live/low/index.m3u8"]
+    assert hls and variant == (64000, "mp4a.40.5")
+
+
+def test_icy_stream_reports_codec_bitrate_and_ttfb():
+    def configure(streams):
+        streams.stream("/live", headers={"icy-br": "128", "icy-name": "Test FM"})
+        streams.stream("/ogg", content_type="audio/ogg", headers={"ice-audio-info": "channels=2;bitrate=96"})
+
+    (mp3, ogg), _ = probe(configure, "/live", "/ogg")
+    assert mp3.ok and mp3.codec == "MP3" and mp3.bitrate == 128
+    assert mp3.ttfb_ms is not None and mp3.checked_at > 0
+    assert ogg.ok and ogg.codec == "OGG" and ogg.bitrate == 96
+
+
+def test_playlists_are_followed_to_the_stream():
+    def configure(streams):
+        streams.stream("/aac", content_type="audio/aacp", headers={"icy-br": "64,64"})
+        streams.file("/listen.pls", "[playlist]\nFile1={base}/aac\n", content_type="audio/x-scpls")
+        streams.file("/listen.m3u", "#EXTM3U\n#EXTINF:-1,Test\n{base}/listen.pls\n")
+        streams.file(
+            "/hls/master.m3u8",
+            '#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=128000,CODECS="mp4a.40.2"\nmedia.m3u8\n',
+            content_type="application/vnd.apple.mpegurl",
+        )
+        streams.file(
+            "/hls/media.m3u8",
+            "#EXTM3U\n#EXT-X-TARGETDURATION:6\n#EXTINF:6.0,\nseg1.ts\n",
+            content_type="application/vnd.apple.mpegurl",
+        )
+
+    (pls, m3u, hls), streams = probe(configure, "/listen.pls", "/listen.m3u", "/hls/master.m3u8")
+    assert pls.ok and pls.final_url.endswith("/aac") and pls.codec == "AAC+" and pls.bitrate == 64
+    assert m3u.ok and m3u.final_url.endswith("/aac")
+    assert hls.ok and hls.hls and hls.codec == "AAC" and hls.bitrate == 128
+    assert hls.final_url.endswith("/hls/media.m3u8")
+    assert streams.paths["/aac"] == 2
+
+
+def test_dead_streams_and_empty_playlists_fail():
+    def configure(streams):
+        streams.file("/empty.pls", "[playlist]\nNumberOfEntries=0\n", content_type="audio/x-scpls")
+
+    (missing, empty), _ = probe(configure, "/gone", "/empty.pls")
+    assert not missing.ok and missing.status == 404
+    assert not empty.ok and empty.error == "empty playlist"
+
+
+def test_slow_first_byte_times_out():
+    (slow,), _ = probe(lambda s: s.stream("/slow", first_byte_delay=1.0), "/slow", timeout=0.2)
+    assert not slow.ok and slow.error == "timeout"
+
+
+def test_probes_are_rate_limited_per_host():
+    now = [0.0]
+    prober_args = {"host_rate": 1.0, "host_burst": 2.0, "clock": lambda: now[0], "allow_private": True}
+
+    async def scenario():
+        async with StubStreamServer() as streams:
+            streams.stream("/live")
+            prober = StreamProber(**prober_args)
+            tasks = [asyncio.create_task(prober.probe(f"{streams.url}/live")) for _ in range(3)]
+            await asyncio.sleep(0.3)
+            probed_before_refill = streams.paths["/live"]
+            now[0] = 1.0
+            await asyncio.gather(*tasks)
+            await prober.aclose()
+            return probed_before_refill, streams.paths["/live"]
+
+    before, after = asyncio.run(scenario())
+    assert before == 2
+    assert after == 3
+
+
+def test_rate_limit_waits_are_not_counted_against_the_probe_timeout():
+    # Six probes of one host at 5/s: the last waits ~1s for its token, well
+    # past the 0.5s timeout, but only the fetch itself is timed.
+    (*results,), _ = probe(
+        lambda s: s.stream("/live"), *["/live"] * 6, host_rate=5.0, host_burst=1.0, timeout=0.5, concurrency=2,
+    )
+    assert all(r.ok for r in results), [r.error for r in results]
+
+
+def test_station_lists_filter_and_rank_by_stream_health():
+    async def scenario():
+        async with StubUpstream() as stub:
+            store = StreamHealthStore()
+            async with app_client(stub, health_store=store) as client:
+                plain = (await client.get("/api/stations/popular", params={"limit": 3})).json()
+                first, second, third = (s["stationuuid"] for s in plain["stations"])
+                await store.record([
+                    (first, ProbeResult("u", ok=False, error="HTTP 404", checked_at=1.0)),
+                    (third, ProbeResult("u", ok=True, codec="MP3", bitrate=128, ttfb_ms=12.0, checked_at=1.0)),
+                ])
+                filtered = (await client.get("/api/stations/popular", params={"limit": 3, "health": "filter"})).json()
+                ranked = (await client.get("/api/stations/popular", params={"limit": 3, "health": "rank"})).json()
+                bad = await client.get("/api/stations/popular", params={"health": "fastest"})
+            return (first, second, third), plain, filtered, ranked, bad.status_code
+
+    (first, second, third), plain, filtered, ranked, bad = asyncio.run(scenario())
+    assert "health" not in plain["stations"][0]
+    assert [s["stationuuid"] for s in filtered["stations"]] == [second, third]
+    assert [s["stationuuid"] for s in ranked["stations"]] == [third, second]
+    assert ranked["stations"][0]["health"]["codec"] == "MP3"
+    assert ranked["stations"][1]["health"] is None
+    assert bad == 400
+
+
+def test_health_store_persists(tmp_path):
+    url = f"sqlite:///{tmp_path / 'health.db'}"
+
+    async def scenario():
+        await StreamHealthStore(url).record([("s1", ProbeResult("u", ok=True, bitrate=64, checked_at=5.0))])
+
+    asyncio.run(scenario())
+    reloaded = StreamHealthStore(url)
+    assert reloaded.summary("s1")["bitrate"] == 64
+    assert reloaded.status() == {"persistent": True, "stations": 1, "ok": 1, "dead": 0}
+
+
+def test_stream_endpoint_resolves_playlists_and_caches():
+    async def scenario():
+        async with StubStreamServer() as streams, StubUpstream() as stub:
+            streams.stream("/aac", content_type="audio/aac", headers={"icy-br": "48"})
+            streams.file("/listen.pls", "[playlist]\nFile1={base}/aac\n", content_type="audio/x-scpls")
+            station = stub.stations[0]
+            station["url_resolved"] = f"{streams.url}/listen.pls"
+            async with app_client(stub) as client:
+                first = await client.get(f"/api/station/{station['stationuuid']}/stream")
+                second = await client.get(f"/api/station/{station['stationuuid']}/stream")
+                missing = await client.get("/api/station/does-not-exist/stream")
+            return streams, first, second, missing
+
+    streams, first, second, missing = asyncio.run(scenario())
+    stream = first.json()["stream"]
+    assert stream["ok"] and stream["url"] == f"{streams.url}/aac"
+    assert stream["codec"] == "AAC" and stream["bitrate"] == 48
+    assert "max-age=60" in first.headers["cache-control"]
+    assert second.json() == first.json()
+    assert streams.paths["/listen.pls"] == 1
+    assert missing.status_code == 404
+
+
+def test_probes_never_reach_private_addresses():
+    async def scenario():
+        async with StubStreamServer() as streams:
+            streams.stream("/live")
+            by_name = streams.url.replace("127.0.0.1", "localhost")
+            prober = StreamProber()
+            try:
+                return await prober.probe_many([f"{streams.url}/live", f"{by_name}/live"]), streams
+            finally:
+                await prober.aclose()
+
+    (literal, named), streams = asyncio.run(scenario())
+    assert literal.error == "blocked address" and named.error == "blocked address"
+    assert streams.paths["/live"] == 0
+    assert not any(map(is_public_address, ("10.1.2.3", "169.254.169.254", "::1", "::ffff:127.0.0.1", "100.64.0.1")))
+    assert is_public_address("93.184.216.34")
+
+
+def test_stream_endpoint_hands_out_direct_streams_without_probing():
+    async def scenario():
+        async with StubStreamServer() as streams, StubUpstream() as stub:
+            streams.stream("/live")
+            station = stub.stations[0]
+            station["url_resolved"] = f"{streams.url}/live"
+            async with app_client(stub) as client:
+                response = await client.get(f"/api/station/{station['stationuuid']}/stream")
+            return streams, response
+
+    streams, response = asyncio.run(scenario())
+    stream = response.json()["stream"]
+    assert stream["url"] == f"{streams.url}/live" and stream["ok"] is None
+    assert streams.paths["/live"] == 0
+    assert needs_resolving("http://h/a.m3u8?x=1") and needs_resolving("http://h/live", hls=True)
+    assert not needs_resolving("http://h/stream.mp3")
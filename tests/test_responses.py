@@ -0,0 +1,95 @@
+import asyncio
+import json
+import math
+
+from benchmarks.stub_upstream import StubUpstream
+from radio.compression import negotiate
+from radio.responses import ORJSONResponse, RawJSON, StationFormat, envelope
+from tests.helpers import app_client
+
+
+def test_envelope_splices_raw_json_verbatim():
+    response = envelope("stations", RawJSON(b'[{"a": 1}]'), partial=False)
+    assert response.body == b'{"stations":[{"a": 1}],"partial":false}'
+    assert json.loads(response.body) == {"stations": [{"a": 1}], "partial": False}
+    assert response.media_type == "application/json"
+
+
+def test_envelope_serializes_python_values_with_orjson():
+    response = envelope("stations", [{"geo_lat": math.nan}])
+    assert isinstance(response, ORJSONResponse)
+    assert json.loads(response.body) == {"stations": [{"geo_lat": None}]}
+
+
+def test_upstream_station_lists_pass_through_undecoded():
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                passthrough = await client.get("/api/stations/by-country/de", params={"limit": 5})
+                genre = await client.get("/api/stations/by-genre", params={"genre": "rock", "limit": 5})
+            expected = stub._search({"countrycode": "DE", "limit": "5", "order": "clickcount", "reverse": "true"})
+            return passthrough, genre, expected
+
+    passthrough, genre, expected = asyncio.run(scenario())
+    assert passthrough.headers["content-type"] == "application/json"
+    assert passthrough.json()["stations"] == expected
+    assert genre.json()["partial"] is False
+    assert len(genre.json()["stations"]) == 5
+
+
+def test_fields_projection_and_columnar_format():
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                projected = await client.get(
+                    "/api/stations/popular", params={"limit": 3, "fields": "stationuuid,name,bitrate"}
+                )
+                columnar = await client.get(
+                    "/api/stations/christian", params={"limit": 3, "fields": "name,clickcount", "format": "columnar"}
+                )
+                bad = await client.get("/api/stations/popular", params={"format": "xml"})
+        return projected.json(), columnar.json(), bad
+
+    projected, columnar, bad = asyncio.run(scenario())
+    assert [set(s) for s in projected["stations"]] == [{"stationuuid", "name", "bitrate"}] * 3
+    assert columnar["format"] == "columnar"
+    assert set(columnar["stations"]) == {"name", "clickcount"}
+    assert len(columnar["stations"]["name"]) == columnar["count"]
+    assert columnar["stations"]["clickcount"] == sorted(columnar["stations"]["clickcount"], reverse=True)
+    assert "partial" in columnar
+    assert bad.status_code == 400
+
+
+def test_station_format_rejects_malformed_fields():
+    assert StationFormat.parse("name, url ,name").fields == ("name", "url")
+    for fields in (",", "name;drop", "Name"):
+        try:
+            StationFormat.parse(fields)
+        except ValueError:
+            continue
+        raise AssertionError(f"{fields!r} was accepted")
+
+
+def test_large_responses_are_compressed_when_accepted():
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                big = await client.get("/api/stations/popular", params={"limit": 50}, headers={"Accept-Encoding": "gzip"})
+                small = await client.get("/", headers={"Accept-Encoding": "gzip"})
+                identity = await client.get("/api/stations/popular", params={"limit": 50}, headers={"Accept-Encoding": "identity"})
+        return big, small, identity
+
+    big, small, identity = asyncio.run(scenario())
+    assert big.headers["content-encoding"] == "gzip"
+    assert int(big.headers["content-length"]) < len(identity.content) / 3
+    assert big.json() == identity.json()
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in identity.headers
+    assert "Accept-Encoding" in identity.headers["vary"]
+
+
+def test_accept_encoding_negotiation_honours_q_values():
+    assert negotiate("gzip, br", ("br", "gzip")) == "br"
+    assert negotiate("br;q=0.5, gzip", ("br", "gzip")) == "gzip"
+    assert negotiate("br;q=0, gzip;q=0", ("br", "gzip")) is None
+    assert negotiate("*", ("gzip",)) == "gzip"
@@ -0,0 +1,116 @@
+import asyncio
+
+import httpx
+
+from benchmarks.stub_upstream import StubUpstream, synthetic_stations
+from radio.catalog import StationCatalog
+from radio.query import StationQuery
+from radio.search_index import SearchIndex
+from tests.helpers import app_client
+
+
+def station(uuid, name, clickcount, tags="", language="english", countrycode="US",
+            country="United States", votes=0, lastcheckok=1):
+    return {"stationuuid": uuid, "name": name, "clickcount": clickcount, "votes": votes,
+            "tags": tags, "language": language, "countrycode": countrycode,
+            "country": country, "lastcheckok": lastcheckok}
+
+
+STATIONS = [
+    station("a", "Smooth Jazz Florida", 10, tags="jazz,smooth jazz"),
+    station("b", "Smooth Radio London", 500, tags="pop", countrycode="GB", country="United Kingdom"),
+    station("c", "Jazz FM", 300, tags="jazz", language="english,french"),
+    station("d", "Radio Swiss Jazz", 300, votes=9, tags="jazz", language="german", countrycode="CH",
+            country="Switzerland"),
+    station("e", "Dead Jazz Stream", 900, tags="jazz", lastcheckok=0),
+]
+
+
+def uuids(stations):
+    return [s["stationuuid"] for s in stations]
+
+
+def test_filters_intersect_and_rank_by_clickcount_then_votes():
+    index = SearchIndex(STATIONS)
+    assert uuids(index.search(StationQuery(tag="jazz"))) == ["d", "c", "a"]
+    assert uuids(index.search(StationQuery(tag="jazz", language="english"))) == ["c", "a"]
+    assert uuids(index.search(StationQuery(countrycode="gb"))) == ["b"]
+    assert uuids(index.search(StationQuery(country="switz"))) == ["d"]
+    assert uuids(index.search(StationQuery(tag="jazz", limit=1, offset=1))) == ["c"]
+
+
+def test_name_tokens_match_by_prefix_for_type_ahead():
+    index = SearchIndex(STATIONS)
+    assert uuids(index.search(StationQuery(name="smo"))) == ["b", "a"]
+    assert uuids(index.search(StationQuery(name="smooth ja"))) == ["a"]
+    assert uuids(index.search(StationQuery(name="radio", tag="jazz"))) == ["d"]
+
+
+def test_misspelled_names_fall_back_to_trigram_matching():
+    index = SearchIndex(STATIONS)
+    assert uuids(index.search(StationQuery(name="smoth"))) == ["b", "a"]
+    assert uuids(index.search(StationQuery(name="londn"))) == ["b"]
+    assert index.search(StationQuery(name="zzzzqqq")) == []
+
+
+def test_index_agrees_with_catalog_on_synthetic_data(tmp_path):
+    stations = synthetic_stations(500, seed=3)
+    index = SearchIndex(stations)
+    catalog = StationCatalog(f"sqlite:///{tmp_path / 'catalog.db'}")
+
+    async def scenario():
+        async with StubUpstream(stations=stations) as stub, httpx.AsyncClient() as client:
+            async def fetch(endpoint, params=None):
+                return (await client.get(f"{stub.url}/json/{endpoint}", params=params)).json()
+            await catalog.full_sync(fetch)
+            results = []
+            for query in (StationQuery(tag="rock", limit=20), StationQuery(countrycode="FR", limit=20),
+                          StationQuery(language="span", tag="pop", limit=20)):
+                results.append((await catalog.search(query), index.search(query)))
+            return results
+
+    for from_catalog, from_index in asyncio.run(scenario()):
+        assert [s["clickcount"] for s in from_index] == [s["clickcount"] for s in from_catalog]
+
+
+def test_search_endpoint_uses_index_built_after_sync(tmp_path):
+    catalog = StationCatalog(f"sqlite:///{tmp_path / 'catalog.db'}")
+
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub, catalog=catalog) as api:
+                for _ in range(100):
+                    if (await api.get("/api/catalog/status")).json()["catalog"]["ready"]:
+                        break
+                    await asyncio.sleep(0.02)
+                import server
+                for _ in range(100):
+                    if server.search_index is not None:
+                        break
+                    await asyncio.sleep(0.02)
+                assert server.search_index is not None
+                response = await api.get("/api/stations/search", params={"name": "smoth", "limit": 5})
+            return response.json()["stations"]
+
+    stations = asyncio.run(scenario())
+    assert stations
+    assert all("smooth" in s["name"].lower() for s in stations)
+
+
+def test_limit_and_offset_are_validated_and_clamped():
+    index = SearchIndex(STATIONS)
+    # Clamped in StationQuery, so neither the index slice nor SQLite's
+    # ``LIMIT -1`` (unlimited) ever sees a negative value.
+    assert StationQuery(limit=-1, offset=-5) == StationQuery(limit=0, offset=0)
+    assert index.search(StationQuery(tag="jazz", limit=-1)) == []
+    assert uuids(index.search(StationQuery(tag="jazz", limit=2, offset=-1))) == ["d", "c"]
+
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                return [
+                    (await client.get("/api/stations/search", params={"name": "a", "limit": limit})).status_code
+                    for limit in (-1, 0, 501, 500)
+                ]
+
+    assert asyncio.run(scenario()) == [422, 422, 422, 200]
@@ -0,0 +1,91 @@
+import asyncio
+
+import numpy as np
+
+import server
+from benchmarks.stub_upstream import StubUpstream, synthetic_stations
+from radio.search_index import SearchIndex
+from radio.similar import SimilarityIndex, SimilarStations
+from tests.helpers import app_client
+from tests.test_search_index import STATIONS, station, uuids
+
+
+def dense_cosine(index: SimilarityIndex) -> np.ndarray:
+    matrix = np.zeros((index.size, len(index.vocab)))
+    for doc in range(index.size):
+        start, end = index.indptr[doc], index.indptr[doc + 1]
+        matrix[doc, index.indices[start:end]] = index.values[start:end]
+    return matrix @ matrix.T
+
+
+def test_sparse_scores_match_dense_cosine():
+    index = SimilarityIndex.from_stations(synthetic_stations(300))
+    dense = dense_cosine(index)
+    for doc in (0, 17, 299):
+        assert np.allclose(index.scores(doc), dense[doc])
+    assert np.allclose(np.diag(dense), 1.0)
+
+
+def test_top_k_ranks_shared_tags_first_and_skips_self_and_broken():
+    stations = STATIONS + [station("f", "Jazz Radio Lyon", 5, tags="jazz,smooth jazz", language="french",
+                                   countrycode="FR", country="France")]
+    search = SearchIndex(stations, 1)
+    index = SimilarityIndex.from_search_index(search)
+    rows = search.store.rows(d for d, _ in index.top_k(search.by_uuid["a"], 10))
+    # "f" shares both tags; the broken "e" is never returned.
+    assert uuids(rows)[0] == "f"
+    assert "a" not in uuids(rows) and "e" not in uuids(rows)
+    assert set(uuids(rows)) >= {"c", "d"}
+    scores = [s for _, s in index.top_k(search.by_uuid["a"], 10)]
+    assert scores == sorted(scores, reverse=True)
+    assert len(index.top_k(search.by_uuid["a"], 2)) == 2
+
+
+def test_similar_served_from_index_and_cached(monkeypatch):
+    monkeypatch.setattr(server, "SIMILAR_REBUILD_INTERVAL", 0.01)
+
+    async def scenario():
+        async with StubUpstream() as stub:
+            index = SearchIndex(stub.stations, 1)
+            similar = SimilarStations()
+            async with app_client(stub, search_index=index, similar=similar) as client:
+                for _ in range(200):
+                    if similar.index is not None:
+                        break
+                    await asyncio.sleep(0.01)
+                stub.reset_counters()
+                uuid = stub.stations[3]["stationuuid"]
+                first = (await client.get(f"/api/station/{uuid}/similar", params={"limit": 5})).json()
+                second = (await client.get(f"/api/station/{uuid}/similar", params={"limit": 5})).json()
+                status = (await client.get("/api/similar/status")).json()
+                station_requests = stub.paths["/json/stations/search"] + stub.paths["/json/stations/byuuid"]
+                return uuid, first, second, status, station_requests
+
+    uuid, first, second, status, station_requests = asyncio.run(scenario())
+    assert station_requests == 0
+    assert len(first["stations"]) == 5 and uuid not in uuids(first["stations"])
+    assert first == second
+    assert first["stations"][0]["similarity"] >= first["stations"][-1]["similarity"] > 0
+    assert status["similar"]["version"] == 1 and status["similar"]["cache_hit_ratio"] == 0.5
+
+
+def test_similar_without_index_ranks_an_upstream_pool():
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub) as client:
+                source = stub.stations[0]
+                similar = await client.get(f"/api/station/{source['stationuuid']}/similar", params={"limit": 10})
+                missing = await client.get("/api/station/does-not-exist/similar")
+                out_of_range = [
+                    (await client.get(f"/api/station/{source['stationuuid']}/similar", params={"limit": limit})).status_code
+                    for limit in (0, 101)
+                ]
+                return source, similar, missing, out_of_range
+
+    source, similar, missing, out_of_range = asyncio.run(scenario())
+    assert out_of_range == [422, 422]
+    assert similar.status_code == 200
+    stations = similar.json()["stations"]
+    assert stations and source["stationuuid"] not in uuids(stations)
+    assert set(source["tags"].split(",")) & set(stations[0]["tags"].split(","))
+    assert missing.status_code == 404
@@ -0,0 +1,79 @@
+import asyncio
+import os
+
+import server
+from benchmarks.stub_upstream import StubUpstream, synthetic_stations
+from radio.query import StationQuery
+from radio.search_index import SearchIndex
+from radio.snapshot import SnapshotStore, load_snapshot, write_snapshot
+from tests.helpers import app_client
+
+QUERIES = [
+    StationQuery(limit=50),
+    StationQuery(tag="jazz", limit=20, offset=5),
+    StationQuery(name="smoth", limit=20),
+    StationQuery(language="engl", country="germ", limit=10),
+    StationQuery(countrycode="DE", limit=10),
+]
+
+
+def test_mapped_snapshot_answers_like_the_built_index(tmp_path):
+    stations = synthetic_stations(500)
+    built = SearchIndex(stations, 1)
+    path = str(tmp_path / "index.snap")
+    write_snapshot(built, path, 3)
+    loaded, _ = load_snapshot(path)
+    assert loaded.version == 3
+    for query in QUERIES:
+        assert loaded.search(query) == built.search(query)
+    station = loaded.get(stations[42]["stationuuid"])
+    assert station == built.get(stations[42]["stationuuid"])
+    assert type(station["clickcount"]) is int
+    assert loaded.get("missing") is None
+    assert os.listdir(tmp_path) == ["index.snap"]
+
+
+def test_store_versions_and_detects_replacement(tmp_path):
+    store = SnapshotStore(str(tmp_path / "index.snap"))
+    assert store.version() == 0 and not store.changed()
+    first = store.rebuild(synthetic_stations(50))
+    assert first.version == 1 and not store.changed()
+    # Another process publishes the next version.
+    write_snapshot(SearchIndex(synthetic_stations(60), 2), store.path, 2)
+    assert store.changed()
+    assert store.load().size == 60
+    # The replaced mapping stays readable.
+    assert first.search(StationQuery(limit=5))
+
+
+def test_workers_hot_swap_to_new_snapshots(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "SNAPSHOT_POLL_INTERVAL", 0.01)
+    path = str(tmp_path / "index.snap")
+
+    async def wait_for_version(version):
+        for _ in range(200):
+            if server.search_index is not None and server.search_index.version == version:
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError(f"snapshot {version} not loaded")
+
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub, snapshots=SnapshotStore(path)) as client:
+                write_snapshot(SearchIndex(stub.stations, 1), path, 1)
+                await wait_for_version(1)
+                stub.reset_counters()
+                first = (await client.get("/api/stations/search", params={"name": "radio", "limit": 5})).json()
+                renamed = [dict(s, name="Renamed " + s["name"]) for s in stub.stations]
+                write_snapshot(SearchIndex(renamed, 2), path, 2)
+                await wait_for_version(2)
+                second = (await client.get("/api/station/" + first["stations"][0]["stationuuid"])).json()
+                status = (await client.get("/api/catalog/status")).json()
+                station_requests = stub.paths["/json/stations/search"] + stub.paths["/json/stations/byuuid"]
+                return station_requests, first, second, status
+
+    station_requests, first, second, status = asyncio.run(scenario())
+    assert station_requests == 0
+    assert first["stations"] and first["next_cursor"]
+    assert second["station"]["name"].startswith("Renamed ")
+    assert status["snapshot"]["version"] == 2
@@ -0,0 +1,50 @@
+import asyncio
+
+from benchmarks.stub_upstream import StubUpstream
+from radio.upstream import UpstreamClient
+
+
+def test_pooled_client_reuses_connections():
+    async def scenario():
+        async with StubUpstream() as stub:
+            client = UpstreamClient(per_host_connections=4)
+            await client.start()
+            try:
+                url = f"{stub.url}/json/stations/search"
+                for _ in range(10):
+                    response = await client.get(url, params={"limit": 5})
+                    assert response.status_code == 200
+                    assert len(response.json()) == 5
+            finally:
+                await client.aclose()
+            return stub.connections, stub.requests
+
+    connections, requests = asyncio.run(scenario())
+    assert requests == 10
+    assert connections == 1
+
+
+def test_per_host_cap_bounds_concurrent_connections():
+    async def scenario():
+        async with StubUpstream(latency=0.02) as stub:
+            client = UpstreamClient(per_host_connections=3)
+            try:
+                url = f"{stub.url}/json/countries"
+                await asyncio.gather(*(client.get(url) for _ in range(12)))
+            finally:
+                await client.aclose()
+            return stub.connections
+
+    assert asyncio.run(scenario()) <= 3
+
+
+def test_aclose_is_idempotent():
+    async def scenario():
+        client = UpstreamClient()
+        await client.start()
+        assert client.started
+        await client.aclose()
+        await client.aclose()
+        assert not client.started
+
+    asyncio.run(scenario())
@@ -0,0 +1,111 @@
+import asyncio
+import os
+
+import httpx
+
+import server
+from benchmarks.stub_upstream import StubUpstream
+from radio.catalog import StationCatalog
+from radio.workers import Warmup, WriterLock
+from tests.helpers import app_client
+from tests.test_catalog import make_fetch
+
+
+def test_only_one_process_holds_the_writer_lock(tmp_path):
+    path = str(tmp_path / "writer.lock")
+    first, second = WriterLock(path), WriterLock(path)
+    assert first.acquire() and first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+    second.release()
+    assert WriterLock().acquire()
+
+
+def test_readiness_turns_ready_after_warmup():
+    async def scenario():
+        async with StubUpstream() as stub:
+            async with app_client(stub, warmup=Warmup(server.warmup_loaders())) as client:
+                for _ in range(100):
+                    response = await client.get("/api/ready")
+                    if response.status_code == 200:
+                        break
+                    await asyncio.sleep(0.05)
+                searches = stub.paths["/json/stations/search"]
+                # Warm-up filled the cache behind the landing screens.
+                await client.get("/api/stations/popular")
+                await client.get("/api/stations/by-genre", params={"genre": "electronic"})
+                return response, searches, stub.paths["/json/stations/search"], stub.paths["/json/countries"]
+
+    response, warmed, after, countries = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert response.json()["ready"] and response.json()["pending"] == []
+    assert response.headers["cache-control"] == "no-store"
+    assert warmed == after
+    assert countries >= 1
+
+
+def test_readiness_is_503_while_a_loader_fails():
+    async def failing():
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        async with StubUpstream() as stub:
+            warmup = Warmup({"popular": failing}, retry_delay=10)
+            async with app_client(stub, warmup=warmup) as client:
+                await asyncio.sleep(0.05)
+                return await client.get("/api/ready")
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 503
+    assert response.json()["pending"] == ["popular"]
+    assert response.json()["errors"] == {"popular": "upstream down"}
+
+
+def test_followers_pick_up_syncs_by_the_writer(tmp_path):
+    url = f"sqlite:///{tmp_path / 'catalog.db'}"
+    writer, follower = StationCatalog(url), StationCatalog(url)
+    changes = []
+
+    async def on_change():
+        changes.append(follower.version)
+
+    follower.subscribe(on_change)
+
+    async def scenario():
+        async with StubUpstream() as stub, httpx.AsyncClient() as client:
+            following = asyncio.create_task(follower.follow(interval=0.01))
+            await asyncio.sleep(0.05)
+            assert not follower.ready
+            await writer.full_sync(make_fetch(client, stub))
+            await asyncio.sleep(0.1)
+            following.cancel()
+            await asyncio.gather(following, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert follower.ready
+    # One rebuild per actual change, not per poll.
+    assert changes == [1]
+
+
+def test_readiness_waits_for_every_worker(tmp_path):
+    async def noop():
+        pass
+
+    async def scenario():
+        async with StubUpstream() as stub:
+            warmup = Warmup({"popular": noop}, ready_dir=str(tmp_path), workers=2)
+            async with app_client(stub, warmup=warmup) as client:
+                await asyncio.sleep(0.05)
+                alone = await client.get("/api/ready")
+                # A second live worker (here: our parent process) warms up;
+                # a dead one's leftover mark doesn't count.
+                (tmp_path / "999999999").touch()
+                (tmp_path / str(os.getppid())).touch()
+                both = await client.get("/api/ready")
+                return alone, both
+
+    alone, both = asyncio.run(scenario())
+    assert alone.status_code == 503
+    assert alone.json()["worker_ready"] and alone.json()["workers_ready"] == 1
+    assert both.status_code == 200 and both.json()["workers_ready"] == 2